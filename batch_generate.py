@@ -0,0 +1,289 @@
+#!/usr/bin/env python3
+"""
+台本の一括生成スクリプト
+
+複数のテーマについて台本を並列に生成する。リクエスト数（毎分）とトークン数の上限を守り、
+応答は (モデル, プロンプト, パラメータ) のハッシュをキーにディスクへキャッシュするため、
+同じ条件での再生成は API を呼ばない。
+
+OpenAI互換エンドポイントであれば --base-url（または OPENAI_BASE_URL）で接続先を変更でき、
+ローカルのスタブサーバーに対してもテストできる。
+
+使用方法:
+    python batch_generate.py themes.txt --out-dir generated --concurrency 4 --rpm 60 --token-budget 500000
+"""
+
+import argparse
+import json
+import os
+import re
+import threading
+import time
+from dataclasses import dataclass, asdict
+from typing import Dict, List, Optional
+
+import generate_test_script as gen
+
+
+@dataclass
+class GenerationResult:
+    """1テーマ分の生成結果を格納するデータクラス"""
+    theme: str
+    script: str = ""
+    cached: bool = False
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    latency: float = 0.0
+    error: str = ""
+
+
+class ResponseCache:
+    """プロンプトのハッシュをキーにした応答のディスクキャッシュ"""
+
+    def __init__(self, cache_dir: str = ".generation_cache"):
+        self.cache_dir = cache_dir
+        os.makedirs(cache_dir, exist_ok=True)
+
+    @staticmethod
+    def make_key(model: str, messages: List[Dict], params: Dict) -> str:
+        import hashlib
+
+        payload = json.dumps(
+            {"model": model, "messages": messages, "params": params},
+            ensure_ascii=False, sort_keys=True
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], f"{key}.json")
+
+    def get(self, key: str) -> Optional[Dict]:
+        try:
+            with open(self._path(key), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    def put(self, key: str, value: Dict):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(value, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+
+class RateLimiter:
+    """毎分のリクエスト数を一定間隔に均して制限する"""
+
+    def __init__(self, requests_per_minute: float = 0):
+        self.interval = 60.0 / requests_per_minute if requests_per_minute else 0.0
+        self._next = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            wait = self._next - now
+            self._next = max(now, self._next) + self.interval
+        if wait > 0:
+            time.sleep(wait)
+
+
+class TokenBudget:
+    """
+    全体のトークン使用量の上限（実行中のリクエストは max_tokens 分を予約する）
+
+    予約の合計が上限を超える場合は、実行中のリクエストが終わって実際の使用量が確定するまで待つ。
+    不足として断るのは、確定した使用量だけで上限を超える場合に限る（同時実行数やタイミングには左右されない）。
+    """
+
+    def __init__(self, limit: int = 0):
+        self.limit = limit
+        self.used = 0
+        self._reserved = 0
+        self._cond = threading.Condition()
+
+    def reserve(self, tokens: int) -> bool:
+        """tokens 分を予約する（上限に達していて予約できない場合は False）"""
+        with self._cond:
+            while self.limit and self.used + self._reserved + tokens > self.limit:
+                if self.used + tokens > self.limit:
+                    return False
+                # 実行中のリクエストの予約が実際の使用量に置き換わるのを待つ
+                self._cond.wait()
+            self._reserved += tokens
+            return True
+
+    def commit(self, reserved: int, actual: int):
+        with self._cond:
+            self._reserved -= reserved
+            self.used += actual
+            self._cond.notify_all()
+
+
+class BatchGenerator:
+    """テーマの一覧から台本を並列に生成するクラス"""
+
+    def __init__(
+        self,
+        client=None,
+        model: str = gen.MODEL,
+        temperature: float = gen.TEMPERATURE,
+        max_tokens: int = gen.MAX_TOKENS,
+        concurrency: int = 4,
+        requests_per_minute: float = 0,
+        token_budget: int = 0,
+        cache_dir: Optional[str] = ".generation_cache"
+    ):
+        """
+        Args:
+            client: OpenAI互換クライアント（Noneで generate_test_script.get_client()）
+            model: モデル名
+            temperature: 温度
+            max_tokens: 1リクエストの最大出力トークン数
+            concurrency: 同時リクエスト数
+            requests_per_minute: 毎分のリクエスト上限（0で無制限）
+            token_budget: 全体のトークン上限（0で無制限）
+            cache_dir: 応答キャッシュのディレクトリ（Noneでキャッシュしない）
+        """
+        self.client = client
+        self.model = model
+        self.temperature = temperature
+        self.max_tokens = max_tokens
+        self.concurrency = concurrency
+        self.rate_limiter = RateLimiter(requests_per_minute)
+        self.budget = TokenBudget(token_budget)
+        self.cache = ResponseCache(cache_dir) if cache_dir else None
+
+    def _messages(self, theme: str, user_prompt: str = None) -> List[Dict]:
+        return [
+            {"role": "system", "content": gen.SYSTEM_PROMPT},
+            {"role": "user", "content": user_prompt or gen.build_user_prompt(theme)}
+        ]
+
+    def generate_one(self, theme: str, user_prompt: str = None, variant: int = 0) -> GenerationResult:
+        """
+        1テーマ分の台本を生成する
+
+        Args:
+            theme: テーマ
+            user_prompt: ユーザープロンプト（Noneでテーマから作成）
+            variant: 同じ条件で別の候補を得たいときに変える番号（キャッシュキーに含まれる）
+        """
+        messages = self._messages(theme, user_prompt)
+        params = {"temperature": self.temperature, "max_tokens": self.max_tokens}
+        if variant:
+            params["variant"] = variant
+        key = ResponseCache.make_key(self.model, messages, params)
+
+        if self.cache:
+            cached = self.cache.get(key)
+            if cached is not None:
+                return GenerationResult(theme=theme, cached=True, **cached)
+
+        # プロンプト分は文字数で概算して予約する
+        reserve = self.max_tokens + sum(len(m["content"]) for m in messages)
+        if not self.budget.reserve(reserve):
+            return GenerationResult(theme=theme, error="token budget exhausted")
+
+        usage_tokens = 0
+        try:
+            self.rate_limiter.acquire()
+            client = self.client or gen.get_client()
+            start = time.monotonic()
+            response = client.chat.completions.create(
+                model=self.model,
+                messages=messages,
+                temperature=self.temperature,
+                max_tokens=self.max_tokens
+            )
+            latency = time.monotonic() - start
+            usage = response.usage
+            prompt_tokens = usage.prompt_tokens if usage else 0
+            completion_tokens = usage.completion_tokens if usage else 0
+            usage_tokens = prompt_tokens + completion_tokens
+            script = response.choices[0].message.content or ""
+        except Exception as e:
+            return GenerationResult(theme=theme, error=str(e)[:500])
+        finally:
+            self.budget.commit(reserve, usage_tokens)
+
+        result = GenerationResult(
+            theme=theme,
+            script=script,
+            prompt_tokens=prompt_tokens,
+            completion_tokens=completion_tokens,
+            latency=latency
+        )
+        if self.cache:
+            cached = asdict(result)
+            del cached["theme"], cached["cached"], cached["error"]
+            self.cache.put(key, cached)
+        return result
+
+    def generate(self, themes: List[str]) -> List[GenerationResult]:
+        """テーマの一覧を並列に生成する（結果はテーマの順）"""
+        from concurrent.futures import ThreadPoolExecutor
+
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            return list(executor.map(self.generate_one, themes))
+
+
+def _slugify(text: str, limit: int = 40) -> str:
+    return re.sub(r'[^\w-]+', '_', text)[:limit].strip('_') or "theme"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="複数テーマの台本を並列に生成する")
+    parser.add_argument("themes", help="テーマ一覧ファイル（1行1テーマ、#でコメント）")
+    parser.add_argument("--out-dir", default="generated", help="台本の出力先")
+    parser.add_argument("--concurrency", type=int, default=4, help="同時リクエスト数")
+    parser.add_argument("--rpm", type=float, default=0, help="毎分のリクエスト上限（0で無制限）")
+    parser.add_argument("--token-budget", type=int, default=0, help="全体のトークン上限（0で無制限）")
+    parser.add_argument("--cache-dir", default=".generation_cache", help="応答キャッシュのディレクトリ")
+    parser.add_argument("--base-url", default=None, help="OpenAI互換エンドポイントのURL")
+    parser.add_argument("--model", default=gen.MODEL, help="モデル名")
+    args = parser.parse_args()
+
+    with open(args.themes, "r", encoding="utf-8") as f:
+        themes = [line.strip() for line in f if line.strip() and not line.startswith("#")]
+
+    client = None
+    if args.base_url:
+        from openai import OpenAI
+        client = OpenAI(base_url=args.base_url, api_key=os.environ.get("OPENAI_API_KEY", "local"))
+
+    generator = BatchGenerator(
+        client=client,
+        model=args.model,
+        concurrency=args.concurrency,
+        requests_per_minute=args.rpm,
+        token_budget=args.token_budget,
+        cache_dir=args.cache_dir
+    )
+
+    start = time.monotonic()
+    results = generator.generate(themes)
+    elapsed = time.monotonic() - start
+
+    os.makedirs(args.out_dir, exist_ok=True)
+    for i, result in enumerate(results, 1):
+        if result.error:
+            print(f"  [{i}/{len(results)}] ✗ {result.theme}: {result.error}")
+            continue
+        path = os.path.join(args.out_dir, f"{i:03d}_{_slugify(result.theme)}.txt")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(result.script)
+        source = "cache" if result.cached else f"{result.latency:.1f}s"
+        print(f"  [{i}/{len(results)}] ✓ {result.theme} ({len(result.script)}字, {source})")
+
+    succeeded = len([r for r in results if not r.error])
+    print(f"\n完了: {succeeded}/{len(results)}  経過: {elapsed:.1f}s  "
+          f"使用トークン: {generator.budget.used}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+import時間のベンチマーク
+
+各モジュールを新しいインタープリタで import し、`python -X importtime` の累積時間と、
+import しただけで読み込まれてしまった重い依存ライブラリを確認する。
+予算を超えたモジュールや重い依存ライブラリを読み込んだモジュールがあれば終了コード1を返すため、
+遅延 import が崩れていないかの確認に使える。
+
+使用方法:
+    python bench_imports.py
+    python bench_imports.py --budget-ms 20 --repeat 7
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+# 確認対象のモジュール
+MODULES = [
+    "cli",
+    "youtube_transcript_fetcher",
+    "fetch_scheduler",
+    "channel_watcher",
+    "pipeline",
+    "parse_videos",
+    "transcript_corpus",
+    "transcript_index",
+    "transcript_store",
+    "transcript_manifest",
+    "transcript_tracks",
+    "video_metadata",
+    "hedging",
+    "phrase_matcher",
+    "phrase_miner",
+    "quality_check",
+    "style_similarity",
+    "generate_test_script",
+    "batch_generate",
+    "best_of_n",
+    "gladia_transcribe",
+]
+
+# import 時に読み込まれてはいけない依存ライブラリ（初回使用時に読み込む）
+HEAVY_MODULES = ["youtube_transcript_api", "yt_dlp", "openai", "requests", "numpy", "yaml"]
+
+# 使う機能（並列取得・メモリ計測・ストア・シャーディングなど）でだけ読み込む標準ライブラリ
+LAZY_STDLIB = {
+    "youtube_transcript_fetcher": ["concurrent.futures", "tracemalloc", "hashlib", "difflib"],
+}
+
+# 起動時間を計測するコマンド
+COMMANDS = [
+    ["cli.py", "status", "--output-dir", "."],
+    ["cli.py", "list", "target_video_ids.txt"],
+]
+
+_ROOT = os.path.dirname(os.path.abspath(__file__))
+
+
+def measure_import(module: str) -> dict:
+    """新しいインタープリタで module を import し、累積時間（ミリ秒）と読み込まれた重い依存
+    （LAZY_STDLIB に挙げた標準ライブラリを含む）を返す"""
+    watched = HEAVY_MODULES + LAZY_STDLIB.get(module, [])
+    code = (
+        f"import sys, json, {module}\n"
+        f"print(json.dumps([m for m in {watched!r} if m in sys.modules]))"
+    )
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=_ROOT, capture_output=True, text=True
+    )
+    if proc.returncode != 0:
+        return {"module": module, "error": proc.stderr.strip().splitlines()[-1]}
+
+    cumulative_us = 0
+    for line in proc.stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        parts = line.split("|")
+        if len(parts) == 3 and parts[2].strip() == module:
+            cumulative_us = int(parts[1])
+    return {
+        "module": module,
+        "ms": cumulative_us / 1000,
+        "heavy": json.loads(proc.stdout.strip().splitlines()[-1]),
+    }
+
+
+def measure_command(argv) -> float:
+    """コマンドの実行時間（ミリ秒、インタープリタの起動を含む）"""
+    start = time.perf_counter()
+    subprocess.run([sys.executable] + argv, cwd=_ROOT, capture_output=True)
+    return (time.perf_counter() - start) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="各モジュールのimport時間を計測する")
+    parser.add_argument("--budget-ms", type=float, default=30.0,
+                        help="1モジュールあたりのimport時間の上限（計測の揺れを見込んだ値）")
+    parser.add_argument("--repeat", type=int, default=5, help="計測回数（最小値を採用）")
+    parser.add_argument("--json", default=None, help="結果の保存先")
+    args = parser.parse_args()
+
+    results = []
+    failed = False
+    print(f"{'module':<28}{'import [ms]':>12}  heavy deps")
+    for module in MODULES:
+        runs = [measure_import(module) for _ in range(args.repeat)]
+        errors = [r for r in runs if "error" in r]
+        if errors:
+            print(f"{module:<28}{'error':>12}  {errors[0]['error']}")
+            results.append(errors[0])
+            failed = True
+            continue
+        best = min(runs, key=lambda r: r["ms"])
+        over = best["ms"] > args.budget_ms
+        failed = failed or over or bool(best["heavy"])
+        mark = " ✗" if over or best["heavy"] else ""
+        print(f"{module:<28}{best['ms']:>12.1f}  {', '.join(best['heavy']) or '-'}{mark}")
+        results.append(best)
+
+    print()
+    for argv in COMMANDS:
+        ms = min(measure_command(argv) for _ in range(args.repeat))
+        print(f"{' '.join(argv):<40}{ms:>8.1f} ms (wall)")
+        results.append({"command": " ".join(argv), "wall_ms": ms})
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+
+    print("\nOK" if not failed else "\nFAILED: import budget exceeded or heavy dependency loaded at import time")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+"""
+Best-of-N 台本生成スクリプト
+
+1回の反復で N 本の候補を並列に生成し、quality_check でプロセスプール上で採点して最良の1本を残す。
+最良スコアがしきい値に届かない間は、未検出フレーズや低スコア項目を指摘するフィードバックを
+プロンプトに加えて再生成する。反復ごとの所要時間・トークン数・費用を記録するため、
+N とスループットのバランスを調整できる。
+
+使用方法:
+    python best_of_n.py --theme "2025年に起きる魂の大覚醒と日本人の使命" -n 4 --threshold 85
+"""
+
+import argparse
+import json
+import os
+import time
+from dataclasses import dataclass, asdict, field
+from typing import Dict, List, Optional
+
+import generate_test_script as gen
+import quality_check
+from batch_generate import BatchGenerator, GenerationResult
+
+# gpt-4.1-mini の料金（USD / 100万トークン）
+DEFAULT_INPUT_PRICE = 0.40
+DEFAULT_OUTPUT_PRICE = 1.60
+
+
+@dataclass
+class IterationStats:
+    """1反復分の計測結果を格納するデータクラス"""
+    iteration: int
+    candidates: int
+    succeeded: int
+    best_score: float
+    scores: List[float] = field(default_factory=list)
+    generation_seconds: float = 0.0
+    scoring_seconds: float = 0.0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    cost_usd: float = 0.0
+    feedback: str = ""
+
+
+def _score(script: str) -> Dict:
+    """プロセスプールで実行する採点処理（生成した台本は見出し付きのためセクション構成も採点する）"""
+    return quality_check.score_script(script, "<candidate>", sections=True)
+
+
+def build_feedback(report: Dict, max_phrases: int = 10) -> str:
+    """採点結果から再生成用のフィードバック文を作成する"""
+    lines = []
+    missing = quality_check.summarize_results(report)["missing"]
+    if missing:
+        lines.append(f"- 次の表現を必ず含めてください: {'、'.join(missing[:max_phrases])}")
+
+    for check in report["checks"]:
+        if check["category"] == "文字数" and check["status"] != "適切":
+            lines.append(f"- 全体の文字数を{check['target_range']}字にしてください（現在{check['char_count']}字）")
+        elif check["category"] == "トーン（語尾）" and check["score"] < 80:
+            lines.append(f"- 文末に「〜のです」「〜なのです」「〜ください」をもっと使ってください（現在{check['ratio']}）")
+        elif check["category"] == "セクション構成":
+            for section in check["sections"]:
+                if not section["found"]:
+                    lines.append(f"- 【{section['section']}】の見出しとセクションを入れてください")
+                elif section["score"] < 80:
+                    lines.append(f"- 【{section['section']}】は約{section['budget']}字にしてください"
+                                 f"（現在{section['char_count']}字）")
+    return "\n".join(lines)
+
+
+class BestOfNGenerator:
+    """N本並列生成 → 採点 → 最良選択 → フィードバック付き再生成 を繰り返すクラス"""
+
+    def __init__(
+        self,
+        generator: BatchGenerator,
+        n: int = 4,
+        threshold: float = 85.0,
+        max_iterations: int = 3,
+        scoring_workers: int = None,
+        input_price: float = DEFAULT_INPUT_PRICE,
+        output_price: float = DEFAULT_OUTPUT_PRICE
+    ):
+        """
+        Args:
+            generator: 候補生成に使う BatchGenerator
+            n: 1反復あたりの候補数
+            threshold: これ以上のスコアが得られたら終了する
+            max_iterations: 最大反復回数
+            scoring_workers: 採点プロセス数（Noneでコア数）
+            input_price: 入力トークンの料金（USD / 100万トークン）
+            output_price: 出力トークンの料金（USD / 100万トークン）
+        """
+        self.generator = generator
+        self.n = n
+        self.threshold = threshold
+        self.max_iterations = max_iterations
+        self.scoring_workers = scoring_workers
+        self.input_price = input_price
+        self.output_price = output_price
+        self.stats: List[IterationStats] = []
+
+    def _generate_candidates(self, theme: str, user_prompt: str, iteration: int) -> List[GenerationResult]:
+        from concurrent.futures import ThreadPoolExecutor
+
+        with ThreadPoolExecutor(max_workers=self.n) as executor:
+            futures = [
+                executor.submit(self.generator.generate_one, theme, user_prompt, iteration * self.n + k)
+                for k in range(self.n)
+            ]
+            return [f.result() for f in futures]
+
+    def run(self, theme: str) -> Optional[Dict]:
+        """
+        テーマについて最良の台本を探す
+
+        Returns:
+            {"script", "report", "iteration"}（1本も生成できなければ None）
+        """
+        # multiprocessing の読み込みは重いため使用時に import する
+        from concurrent.futures import ProcessPoolExecutor
+
+        best = None
+        feedback = ""
+        self.stats = []
+
+        with ProcessPoolExecutor(max_workers=self.scoring_workers, initializer=quality_check.set_phrase_lists,
+                                 initargs=(quality_check.phrase_lists(),)) as scorer:
+            for iteration in range(self.max_iterations):
+                user_prompt = gen.build_user_prompt(theme)
+                if feedback:
+                    user_prompt += f"\n\n【前回の台本の改善点】\n{feedback}"
+
+                start = time.monotonic()
+                candidates = self._generate_candidates(theme, user_prompt, iteration)
+                generated = time.monotonic()
+
+                ok = [c for c in candidates if not c.error and c.script]
+                reports = list(scorer.map(_score, [c.script for c in ok]))
+                scored = time.monotonic()
+
+                prompt_tokens = sum(c.prompt_tokens for c in candidates if not c.cached)
+                completion_tokens = sum(c.completion_tokens for c in candidates if not c.cached)
+                stats = IterationStats(
+                    iteration=iteration + 1,
+                    candidates=len(candidates),
+                    succeeded=len(ok),
+                    best_score=max((r["total_score"] for r in reports), default=0.0),
+                    scores=[r["total_score"] for r in reports],
+                    generation_seconds=generated - start,
+                    scoring_seconds=scored - generated,
+                    prompt_tokens=prompt_tokens,
+                    completion_tokens=completion_tokens,
+                    cost_usd=(prompt_tokens * self.input_price + completion_tokens * self.output_price) / 1e6,
+                    feedback=feedback
+                )
+                self.stats.append(stats)
+                print(f"[{stats.iteration}] 候補 {stats.succeeded}/{stats.candidates}  "
+                      f"最高 {stats.best_score:.1f}  生成 {stats.generation_seconds:.1f}s  "
+                      f"採点 {stats.scoring_seconds:.2f}s  ${stats.cost_usd:.4f}")
+
+                for candidate, report in zip(ok, reports):
+                    if best is None or report["total_score"] > best["report"]["total_score"]:
+                        best = {"script": candidate.script, "report": report, "iteration": iteration + 1}
+
+                if best is None:
+                    continue
+                if best["report"]["total_score"] >= self.threshold:
+                    break
+                feedback = build_feedback(best["report"])
+
+        return best
+
+    def summary(self) -> Dict:
+        """全反復の合計"""
+        return {
+            "iterations": len(self.stats),
+            "candidates": sum(s.candidates for s in self.stats),
+            "seconds": sum(s.generation_seconds + s.scoring_seconds for s in self.stats),
+            "prompt_tokens": sum(s.prompt_tokens for s in self.stats),
+            "completion_tokens": sum(s.completion_tokens for s in self.stats),
+            "cost_usd": sum(s.cost_usd for s in self.stats),
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="N本の候補から最良の台本を選ぶ")
+    parser.add_argument("--theme", default=gen.THEME, help="テーマ")
+    parser.add_argument("-n", type=int, default=4, help="1反復あたりの候補数")
+    parser.add_argument("--threshold", type=float, default=85.0, help="目標スコア")
+    parser.add_argument("--max-iterations", type=int, default=3, help="最大反復回数")
+    parser.add_argument("--output", default="best_script.txt", help="最良台本の保存先")
+    parser.add_argument("--report", default="best_of_n_report.json", help="計測結果の保存先")
+    parser.add_argument("--cache-dir", default=".generation_cache", help="応答キャッシュのディレクトリ")
+    parser.add_argument("--base-url", default=None, help="OpenAI互換エンドポイントのURL")
+    parser.add_argument("--phrases", default=None,
+                        help="フレーズ一覧のJSON（phrase_miner.py の出力など）")
+    parser.add_argument("--input-price", type=float, default=DEFAULT_INPUT_PRICE,
+                        help="入力トークンの料金（USD / 100万トークン）")
+    parser.add_argument("--output-price", type=float, default=DEFAULT_OUTPUT_PRICE,
+                        help="出力トークンの料金（USD / 100万トークン）")
+    args = parser.parse_args()
+
+    if args.phrases:
+        quality_check.load_phrase_lists(args.phrases)
+
+    client = None
+    if args.base_url:
+        from openai import OpenAI
+        client = OpenAI(base_url=args.base_url, api_key=os.environ.get("OPENAI_API_KEY", "local"))
+
+    loop = BestOfNGenerator(
+        BatchGenerator(client=client, concurrency=args.n, cache_dir=args.cache_dir),
+        n=args.n,
+        threshold=args.threshold,
+        max_iterations=args.max_iterations,
+        input_price=args.input_price,
+        output_price=args.output_price
+    )
+    best = loop.run(args.theme)
+    summary = loop.summary()
+
+    with open(args.report, "w", encoding="utf-8") as f:
+        json.dump({
+            "theme": args.theme,
+            "best_score": best["report"]["total_score"] if best else None,
+            "summary": summary,
+            "iterations": [asdict(s) for s in loop.stats],
+        }, f, ensure_ascii=False, indent=2)
+
+    if best is None:
+        print("台本を生成できませんでした")
+        return
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        f.write(best["script"])
+    print(f"\n最良スコア: {best['report']['total_score']:.1f}（{best['iteration']}回目）")
+    print(f"合計: {summary['candidates']}候補  {summary['seconds']:.1f}s  ${summary['cost_usd']:.4f}")
+    print(f"台本を保存しました: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
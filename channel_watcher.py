@@ -0,0 +1,483 @@
+#!/usr/bin/env python3
+"""
+チャンネル監視デーモン
+
+登録したチャンネルを常駐して監視し、新しく投稿された動画の文字起こしを取得する。
+
+- チャンネルごとに次回の確認時刻を持ち、投稿間隔（一覧の投稿日）と確認結果に応じて
+  確認間隔を調整する（新着があれば短く、なければ長く）
+- 一覧は新しい順に先頭の window 本だけを読むため、確認1回あたりのリクエストは少ない
+- 一覧の確認と文字起こしの取得は全チャンネルで共有するスレッドプールで行う
+- 取得結果はメモリに溜めず、flush_interval ごとに {prefix}.jsonl・{prefix}_summary.csv・
+  {prefix}_combined.txt に追記する（長時間動かしてもメモリが増えず、異常終了しても書き出し済みの結果は残る）
+- 一覧の確認に失敗したチャンネルは、連続した失敗の回数に応じて次の確認を遅らせる
+- SIGINT / SIGTERM を受けると新しい確認を止め、実行中の取得を待ってから結果と状態を保存する
+- http://127.0.0.1:{port}/status で各チャンネルとプールの状態をJSONで返す
+
+状態（既知の動画ID・確認間隔・次回の確認時刻）は --state のファイルに保存され、
+再起動しても既知の動画を取得し直さない。
+
+使用方法:
+    python channel_watcher.py --channel https://www.youtube.com/@example 名前 --port 8765
+    curl http://127.0.0.1:8765/status
+"""
+
+import argparse
+import csv
+import itertools
+import json
+import os
+import signal
+import threading
+import time
+from dataclasses import dataclass, asdict, field
+from datetime import datetime
+from typing import TYPE_CHECKING, Dict, List, Optional, Set, Tuple
+
+from youtube_transcript_fetcher import (
+    SUMMARY_HEADER, TranscriptResult, VideoInfo, YouTubeTranscriptFetcher, combined_entry, summary_row
+)
+
+if TYPE_CHECKING:
+    from concurrent.futures import ThreadPoolExecutor
+
+
+@dataclass
+class ChannelSchedule:
+    """チャンネルごとの監視状態を格納するデータクラス"""
+    url: str
+    name: str
+    interval: float  # 確認間隔（秒）
+    next_poll: float = 0.0  # 次回の確認時刻（UNIX時刻）
+    last_poll: float = 0.0
+    polls: int = 0
+    new_videos: int = 0
+    errors: int = 0
+    failures: int = 0  # 連続して一覧の確認に失敗した回数
+    last_error: str = ""
+    known: Set[str] = field(default_factory=set)
+
+    def to_dict(self) -> Dict:
+        return dict(asdict(self), known=sorted(self.known))
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "ChannelSchedule":
+        return cls(**dict(data, known=set(data.get("known", []))))
+
+
+def upload_interval(videos: List[VideoInfo]) -> Optional[float]:
+    """一覧の投稿日から投稿間隔の中央値（秒）を求める（投稿日が2本未満ならNone）"""
+    days = sorted(
+        datetime.strptime(v.upload_date, "%Y%m%d").toordinal()
+        for v in videos if v.upload_date
+    )
+    gaps = [b - a for a, b in zip(days, days[1:])]
+    if not gaps:
+        return None
+    import statistics
+    return max(statistics.median(gaps), 0.5) * 86400
+
+
+class ChannelWatcher:
+    """複数チャンネルを監視して新着動画の文字起こしを取得するデーモン"""
+
+    def __init__(
+        self,
+        fetcher: YouTubeTranscriptFetcher,
+        max_workers: int = 4,
+        min_interval: float = 15 * 60,
+        max_interval: float = 24 * 3600,
+        window: int = 30,
+        backfill: int = 0,
+        languages: List[str] = ['ja'],
+        delay: float = 1.0,
+        state_path: Optional[str] = None,
+        output_prefix: Optional[str] = None,
+        flush_interval: float = 60.0
+    ):
+        """
+        Args:
+            fetcher: 文字起こしの取得に使うフェッチャー
+            max_workers: 一覧の確認と文字起こしの取得に共有するワーカー数
+            min_interval: 確認間隔の下限（秒）
+            max_interval: 確認間隔の上限（秒）
+            window: 1回の確認で読む一覧の先頭の本数
+            backfill: 初回の確認で取得する既存動画の本数（残りは既知として扱う）
+            languages: 取得する言語のリスト
+            delay: ワーカーごとのリクエスト間の遅延（秒）
+            state_path: 監視状態の保存先（Noneで保存しない）
+            output_prefix: 取得結果を追記する出力ファイルの接頭辞（fetcher.output_dir に
+                {prefix}.jsonl・{prefix}_summary.csv・{prefix}_combined.txt を作る。Noneで書き出さない）
+            flush_interval: 取得結果を書き出す間隔（秒）
+        """
+        self.fetcher = fetcher
+        self.max_workers = max_workers
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.window = window
+        self.backfill = backfill
+        self.languages = languages
+        self.delay = delay
+        self.state_path = state_path
+        self.output_prefix = output_prefix
+        self.flush_interval = flush_interval
+
+        self.channels: Dict[str, ChannelSchedule] = {}
+        if state_path and os.path.exists(state_path):
+            with open(state_path, "r", encoding="utf-8") as f:
+                for data in json.load(f)["channels"]:
+                    schedule = ChannelSchedule.from_dict(data)
+                    self.channels[schedule.url] = schedule
+
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._executor: Optional["ThreadPoolExecutor"] = None
+        self._polling: Set[str] = set()  # 確認中のチャンネルURL
+        self._inflight: Set[str] = set()  # 取得中の動画ID
+        self._pending: List[TranscriptResult] = []  # まだ書き出していない取得結果
+        self._started = 0.0
+        self.stats = {"polls": 0, "fetched": 0, "succeeded": 0, "failed": 0, "written": 0}
+        self._server = None
+
+    def add_channel(self, url: str, name: str):
+        """監視するチャンネルを追加する（保存済みの状態があればそれを使う）"""
+        with self._lock:
+            if url in self.channels:
+                self.channels[url].name = name
+            else:
+                self.channels[url] = ChannelSchedule(url=url, name=name, interval=self.min_interval)
+        self._wake.set()
+
+    # ---- 確認と取得 ----
+
+    def _adapt(self, schedule: ChannelSchedule, videos: List[VideoInfo], found: int):
+        """確認結果から次回の確認間隔を決める"""
+        if found:
+            interval = schedule.interval / 2
+        else:
+            interval = schedule.interval * 1.5
+        # 投稿間隔の1/4より長くは待たない
+        cadence = upload_interval(videos)
+        if cadence is not None:
+            interval = min(interval, cadence / 4)
+        schedule.interval = min(max(interval, self.min_interval), self.max_interval)
+
+    def _poll(self, schedule: ChannelSchedule):
+        """チャンネルの一覧の先頭を確認し、新着動画の取得をプールに追加する"""
+        try:
+            with self.fetcher.stage("listing"):
+                videos = list(itertools.islice(self.fetcher.iter_channel_videos(schedule.url), self.window))
+        except Exception as e:
+            with self._lock:
+                schedule.errors += 1
+                schedule.failures += 1
+                schedule.last_error = str(e)[:200]
+                # 失敗が続くほど次の確認を遅らせる（確認間隔そのものは変えない）
+                backoff = min(schedule.interval * 2 ** schedule.failures, self.max_interval)
+                schedule.next_poll = time.time() + backoff
+                self._polling.discard(schedule.url)
+            print(f"  ✗ {schedule.name}: {e} (retry in {backoff / 60:.0f} min)")
+            self._wake.set()
+            return
+
+        with self._lock:
+            first = not schedule.polls
+            new = [
+                v for v in videos
+                if v.video_id not in schedule.known and v.video_id not in self._inflight
+                and not self.fetcher.is_saved(v.video_id)
+            ]
+            if first:
+                # 初回は新しい順に backfill 本だけ取得し、残りは既知とする
+                schedule.known.update(v.video_id for v in new[self.backfill:])
+                new = new[:self.backfill]
+            for video in new:
+                video.channel_name = schedule.name
+            schedule.polls += 1
+            schedule.failures = 0
+            schedule.new_videos += 0 if first else len(new)
+            schedule.last_poll = time.time()
+            self._adapt(schedule, videos, 0 if first else len(new))
+            schedule.next_poll = schedule.last_poll + schedule.interval
+            self.stats["polls"] += 1
+            self._polling.discard(schedule.url)
+
+        print(f"  {schedule.name}: {len(new)} new (next in {schedule.interval / 60:.0f} min)")
+        for video in new:
+            with self._lock:
+                self._inflight.add(video.video_id)
+            if not self._submit(self._fetch, schedule, video):
+                # 停止中は既知にせず、次回の起動時に取得する
+                with self._lock:
+                    self._inflight.discard(video.video_id)
+        self._save_state()
+        self._wake.set()
+
+    def _fetch(self, schedule: ChannelSchedule, video: VideoInfo):
+        """新着動画の文字起こしを取得する"""
+        result = self.fetcher.fetch_transcript(video, self.languages)
+        if result.status == "success":
+            print(f"  ✓ {video.video_id} {schedule.name} ({len(result.full_text)} chars)")
+        else:
+            print(f"  ✗ {video.video_id} {result.status}: {result.error_message[:100]}")
+        # 結果は fetcher.results に溜めず、次の書き出しまで _pending に置く
+        self.fetcher.record_result(result, keep=False)
+        with self._lock:
+            self._pending.append(result)
+            self._inflight.discard(video.video_id)
+            self.stats["fetched"] += 1
+            self.stats["succeeded" if result.status == "success" else "failed"] += 1
+            # 一時的なエラーは既知にせず、次回の確認で取得し直す
+            if result.status != "error":
+                schedule.known.add(video.video_id)
+        # レート制限対策（ワーカーごと）
+        if self.delay:
+            time.sleep(self.delay)
+
+    def _submit(self, fn, *args) -> bool:
+        """共有プールにタスクを追加する（停止中は追加しない）"""
+        if self._stop.is_set():
+            return False
+        try:
+            self._executor.submit(self._run_task, fn, *args)
+        except RuntimeError:
+            return False
+        return True
+
+    def _run_task(self, fn, *args):
+        try:
+            fn(*args)
+        except Exception as e:
+            print(f"  Worker error: {e}")
+
+    def _due(self) -> Tuple[List[ChannelSchedule], float]:
+        """確認時刻を過ぎたチャンネルと、次に確認時刻が来るまでの秒数"""
+        now = time.time()
+        with self._lock:
+            idle = [s for s in self.channels.values() if s.url not in self._polling]
+            due = [s for s in idle if s.next_poll <= now]
+            for schedule in due:
+                self._polling.add(schedule.url)
+            waiting = [s.next_poll - now for s in idle if s.next_poll > now]
+        return due, min(waiting, default=self.max_interval)
+
+    # ---- 実行と停止 ----
+
+    def run(self):
+        """stop() が呼ばれるまで監視を続け、実行中の取得を待ってから戻る"""
+        from concurrent.futures import ThreadPoolExecutor
+
+        self._started = time.time()
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers)
+        last_flush = time.time()
+        try:
+            while not self._stop.is_set():
+                due, wait_seconds = self._due()
+                for schedule in due:
+                    if not self._submit(self._poll, schedule):
+                        with self._lock:
+                            self._polling.discard(schedule.url)
+                self._wake.wait(timeout=min(max(wait_seconds, 1.0), self.flush_interval))
+                self._wake.clear()
+                if time.time() - last_flush >= self.flush_interval:
+                    self.flush_results()
+                    last_flush = time.time()
+        finally:
+            print("Draining in-flight work...")
+            self._executor.shutdown(wait=True)
+            self.flush_results()
+            self._save_state()
+
+    def stop(self, *_):
+        """新しい確認と取得を止める（シグナルハンドラとしても使える）"""
+        self._stop.set()
+        self._wake.set()
+
+    def flush_results(self) -> int:
+        """まだ書き出していない取得結果を出力ファイルに追記する（書き出した件数を返す）"""
+        with self._lock:
+            pending, self._pending = self._pending, []
+        if not pending or not self.output_prefix:
+            return 0
+        base = os.path.join(self.fetcher.output_dir, self.output_prefix)
+        new_csv = not os.path.exists(f"{base}_summary.csv")
+        with open(f"{base}.jsonl", "a", encoding="utf-8") as f:
+            for r in pending:
+                f.write(json.dumps(asdict(r), ensure_ascii=False) + "\n")
+        with open(f"{base}_summary.csv", "a", encoding="utf-8", newline="") as f:
+            writer = csv.writer(f)
+            if new_csv:
+                writer.writerow(SUMMARY_HEADER)
+            writer.writerows(summary_row(r) for r in pending)
+        with open(f"{base}_combined.txt", "a", encoding="utf-8") as f:
+            for r in pending:
+                if r.status == "success":
+                    f.write(combined_entry(r))
+        with self._lock:
+            self.stats["written"] += len(pending)
+        return len(pending)
+
+    def _save_state(self):
+        if not self.state_path:
+            return
+        with self._lock:
+            data = {
+                "saved_at": datetime.now().isoformat(),
+                "channels": [s.to_dict() for s in self.channels.values()],
+            }
+        tmp_path = f"{self.state_path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp_path, self.state_path)
+
+    # ---- 状態の公開 ----
+
+    def status(self) -> Dict:
+        """監視状態（/status の内容）"""
+        now = time.time()
+        with self._lock:
+            return {
+                "uptime": round(now - self._started, 1) if self._started else 0.0,
+                "stopping": self._stop.is_set(),
+                "in_flight": sorted(self._inflight),
+                "unwritten": len(self._pending),
+                "polling": sorted(self.channels[url].name for url in self._polling),
+                "stats": dict(self.stats),
+                "hedging": self.fetcher.hedger.stats() if self.fetcher.hedger is not None else None,
+                "channels": [
+                    {
+                        "name": s.name,
+                        "url": s.url,
+                        "interval": round(s.interval),
+                        "next_poll_in": round(max(s.next_poll - now, 0.0)),
+                        "last_poll": datetime.fromtimestamp(s.last_poll).isoformat() if s.last_poll else None,
+                        "polls": s.polls,
+                        "known": len(s.known),
+                        "new_videos": s.new_videos,
+                        "errors": s.errors,
+                        "failures": s.failures,
+                        "last_error": s.last_error,
+                    }
+                    for s in sorted(self.channels.values(), key=lambda s: s.next_poll)
+                ],
+            }
+
+    def serve_status(self, port: int, host: str = "127.0.0.1"):
+        """状態を返すHTTPサーバーをバックグラウンドで起動する"""
+        # http.server は読み込みに時間がかかるため、使うときに import する
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+        watcher = self
+
+        class StatusHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.rstrip("/") not in ("", "/status"):
+                    self.send_error(404)
+                    return
+                body = json.dumps(watcher.status(), ensure_ascii=False, indent=2).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), StatusHandler)
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self._server
+
+    def close(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+
+def read_channels_file(path: str) -> List[Tuple[str, str]]:
+    """「URL 名前」形式のチャンネル一覧を読み込む（# で始まる行は無視）"""
+    channels = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            url, _, name = line.partition(" ")
+            channels.append((url, name.strip() or url))
+    return channels
+
+
+def main():
+    parser = argparse.ArgumentParser(description="チャンネルを常駐監視して新着動画の文字起こしを取得する")
+    parser.add_argument("--channel", nargs=2, action="append", default=[], metavar=("URL", "NAME"),
+                        help="監視するチャンネル（複数指定可）")
+    parser.add_argument("--channels-file", default=None, help="「URL 名前」形式のチャンネル一覧")
+    parser.add_argument("--workers", type=int, default=4, help="共有ワーカー数")
+    parser.add_argument("--min-interval", type=float, default=900, help="確認間隔の下限（秒）")
+    parser.add_argument("--max-interval", type=float, default=86400, help="確認間隔の上限（秒）")
+    parser.add_argument("--window", type=int, default=30, help="1回の確認で読む一覧の本数")
+    parser.add_argument("--backfill", type=int, default=0, help="初回に取得する既存動画の本数")
+    parser.add_argument("--delay", type=float, default=1.5, help="ワーカーごとのリクエスト間の遅延（秒）")
+    parser.add_argument("--languages", default="ja", help="取得する言語（カンマ区切り、優先順）")
+    parser.add_argument("--port", type=int, default=8765, help="状態を返すHTTPポート（0で無効）")
+    parser.add_argument("--output-dir", default="./transcripts", help="出力ディレクトリ")
+    parser.add_argument("--prefix", default="watched_transcripts",
+                        help="取得結果を追記する出力ファイル名の接頭辞（{prefix}.jsonl / _summary.csv / _combined.txt）")
+    parser.add_argument("--flush-interval", type=float, default=60, help="取得結果を書き出す間隔（秒）")
+    parser.add_argument("--state", default=None, help="監視状態の保存先（省略時は {output-dir}/watcher_state.json）")
+    parser.add_argument("--store", default=None, help="内容ハッシュ付きで保存するストアのディレクトリ")
+    parser.add_argument("--memory-budget-mb", type=float, default=None,
+                        help="メモリに保持する本文の上限（MB）。超えた分はディスクに退避する")
+    args = parser.parse_args()
+
+    channels = list(map(tuple, args.channel))
+    if args.channels_file:
+        channels += read_channels_file(args.channels_file)
+    if not channels:
+        parser.error("no channels (use --channel or --channels-file)")
+
+    from transcript_store import TranscriptStore
+
+    fetcher = YouTubeTranscriptFetcher(
+        output_dir=args.output_dir,
+        memory_budget_mb=args.memory_budget_mb,
+        store=TranscriptStore(args.store) if args.store else None
+    )
+    watcher = ChannelWatcher(
+        fetcher,
+        max_workers=args.workers,
+        min_interval=args.min_interval,
+        max_interval=args.max_interval,
+        window=args.window,
+        backfill=args.backfill,
+        languages=args.languages.split(","),
+        delay=args.delay,
+        state_path=args.state or os.path.join(args.output_dir, "watcher_state.json"),
+        output_prefix=args.prefix,
+        flush_interval=args.flush_interval
+    )
+    for url, name in channels:
+        watcher.add_channel(url, name)
+
+    signal.signal(signal.SIGINT, watcher.stop)
+    signal.signal(signal.SIGTERM, watcher.stop)
+    if args.port:
+        watcher.serve_status(args.port)
+        print(f"Status: http://127.0.0.1:{args.port}/status")
+
+    print(f"Watching {len(channels)} channels with {args.workers} workers (Ctrl+C to stop)")
+    try:
+        watcher.run()
+    finally:
+        watcher.close()
+        fetcher.close()
+        stats = watcher.stats
+        print(f"Fetched {stats['fetched']} ({stats['succeeded']} succeeded, {stats['failed']} failed), "
+              f"wrote {stats['written']} to {os.path.join(args.output_dir, args.prefix)}.jsonl")
+        if fetcher.hedger is not None:
+            fetcher.hedger.print_stats()
+
+
+if __name__ == "__main__":
+    main()
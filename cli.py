@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+統合コマンドラインツール
+
+各スクリプトの main() をサブコマンドとして呼び出す。サブコマンドのモジュールは
+実行時に初めて import するため、status / list のような確認用コマンドは
+標準ライブラリだけで数十ミリ秒で起動する。
+
+使用方法:
+    python cli.py status --output-dir transcripts
+    python cli.py list target_video_ids.txt
+    python cli.py fetch --ids-file target_video_ids.txt --workers 4
+    python cli.py quality generated/ --phrases mined_phrases.json
+"""
+
+import argparse
+import csv
+import glob
+import importlib
+import os
+import sys
+from collections import Counter
+
+# サブコマンド → (モジュール, 説明)
+COMMANDS = {
+    "fetch": ("youtube_transcript_fetcher", "YouTube動画の文字起こしを取得する"),
+    "schedule": ("fetch_scheduler", "全チャンネルの動画を優先度順に締め切りまで取得する"),
+    "watch": ("channel_watcher", "チャンネルを常駐監視して新着動画の文字起こしを取得する"),
+    "pipeline": ("pipeline", "設定ファイルでパイプラインを実行する"),
+    "analyze": ("parse_videos", "チャンネル動画一覧のダンプを解析する"),
+    "metadata": ("video_metadata", "動画の再生回数・長さ・投稿日を一括で更新する"),
+    "corpus": ("transcript_corpus", "既存の文字起こしファイルを読み込む"),
+    "store": ("transcript_store", "差分保存ストアの内容を表示する"),
+    "manifest": ("transcript_manifest", "個別ファイルのマニフェストを表示・再構築する"),
+    "index": ("transcript_index", "文字起こしを時刻で検索する"),
+    "mine": ("phrase_miner", "コーパスから頻出フレーズを抽出する"),
+    "style": ("style_similarity", "コーパスとの文体類似度で台本を評価する"),
+    "quality": ("quality_check", "台本の品質を検証する"),
+    "generate": ("batch_generate", "複数テーマの台本を並列に生成する"),
+    "best-of-n": ("best_of_n", "N本の候補から最良の台本を選ぶ"),
+}
+
+
+def run_status(args):
+    """出力ディレクトリの取得状況を表示する"""
+    summaries = sorted(glob.glob(os.path.join(args.output_dir, "*_summary.csv")))
+    if not summaries:
+        print(f"No results in {args.output_dir}")
+        return 1
+
+    for path in summaries:
+        prefix = os.path.basename(path)[:-len("_summary.csv")]
+        with open(path, "r", encoding="utf-8", newline="") as f:
+            rows = list(csv.DictReader(f))
+        statuses = Counter(row["status"] for row in rows)
+        channels = Counter(row["channel_name"] for row in rows if row["status"] == "success")
+        last = max((row["fetched_at"] for row in rows), default="-")
+        indexed = os.path.exists(os.path.join(args.output_dir, f"{prefix}_index.json"))
+
+        print(f"{prefix}: {len(rows)} videos  (last fetched {last})")
+        for status, count in statuses.most_common():
+            print(f"  {status}: {count}")
+        for channel, count in channels.most_common():
+            print(f"  - {channel}: {count}")
+        print(f"  time index: {'yes' if indexed else 'no'}")
+
+    individual = os.path.join(args.output_dir, "individual")
+    if os.path.exists(os.path.join(individual, "manifest.jsonl")):
+        # シャーディング配置ではディレクトリを走査せずマニフェストで数える
+        from transcript_manifest import TranscriptManifest
+
+        print(f"individual/: {len(TranscriptManifest(individual))} files (manifest)")
+    elif os.path.isdir(individual):
+        count = sum(1 for name in os.listdir(individual) if name.endswith(".txt"))
+        print(f"individual/: {count} files")
+    return 0
+
+
+def run_list(args):
+    """動画IDファイルまたはサマリーCSVの動画を一覧表示する"""
+    shown = 0
+    for path in args.files:
+        if path.endswith(".csv"):
+            with open(path, "r", encoding="utf-8", newline="") as f:
+                for row in csv.DictReader(f):
+                    if args.status and row["status"] != args.status:
+                        continue
+                    print(f"{row['video_id']}\t{row['status']}\t{row['channel_name']}\t{row['title']}")
+                    shown += 1
+        else:
+            from youtube_transcript_fetcher import iter_video_id_file
+
+            for video in iter_video_id_file(path):
+                print(f"{video.video_id}\t{video.view_count}\t{video.channel_name}\t{video.title}")
+                shown += 1
+    print(f"{shown} videos", file=sys.stderr)
+    return 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        description="YouTube文字起こし・台本生成ツール",
+        epilog="その他のサブコマンド（引数は各スクリプトと同じ）:\n" + "\n".join(
+            f"  {name:<10} {description}" for name, (_, description) in COMMANDS.items()
+        ),
+        formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    sub = parser.add_subparsers(dest="command")
+
+    status = sub.add_parser("status", help="出力ディレクトリの取得状況を表示する")
+    status.add_argument("--output-dir", default="./transcripts", help="出力ディレクトリ")
+    status.set_defaults(func=run_status)
+
+    listing = sub.add_parser("list", help="動画IDファイル・サマリーCSVの動画を一覧表示する")
+    listing.add_argument("files", nargs="+", help="動画IDファイルまたは {prefix}_summary.csv")
+    listing.add_argument("--status", default=None, help="CSVの場合、このステータスの動画だけ表示する")
+    listing.set_defaults(func=run_list)
+    return parser
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+
+    # 他のスクリプトへの委譲（引数はそのまま渡す）
+    if argv and argv[0] in COMMANDS:
+        module_name, _ = COMMANDS[argv[0]]
+        sys.argv = [f"{os.path.basename(sys.argv[0])} {argv[0]}"] + argv[1:]
+        return importlib.import_module(module_name).main()
+
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.command is None:
+        parser.print_help()
+        return 1
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+"""
+長時間クロール用のメモリ管理
+
+- ResultSpool: 取得済みの文字起こし結果をJSONLファイルに書き出し、必要なときに1件ずつ（または順に全件）読み戻す
+- MemoryProfiler: 処理段階（一覧取得・字幕取得・セグメント構築・出力）ごとのピークメモリを計測する
+
+YouTubeTranscriptFetcher(memory_budget_mb=..., profiler=...) から使われる。
+"""
+
+import json
+import os
+import tempfile
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from dataclasses import asdict
+from typing import Dict, Iterator, Optional
+
+
+def current_rss() -> int:
+    """現在の常駐メモリ（バイト）。/proc が使えない環境ではピーク値で代用する"""
+    try:
+        with open("/proc/self/statm", "r") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux は KB、macOS はバイト単位
+        return peak if os.uname().sysname == "Darwin" else peak * 1024
+
+
+def estimate_result_size(result) -> int:
+    """TranscriptResult が保持する本文・セグメントのおおよそのメモリ量（バイト）"""
+    # str は1文字あたり最大4バイト + ヘッダ、セグメントは辞書とキー・値の分
+    size = 49 + len(result.full_text) * 4
+    for segment in result.transcript_segments:
+        size += 360 + len(segment.get("text", "")) * 4
+    return size
+
+
+class ResultSpool:
+    """
+    文字起こし結果をJSONLに追記し、動画IDで読み戻すディスク退避領域
+
+    ファイルは directory に実行ごとの一意な名前で作り、close() で削除する
+    （同じ出力先を使う他の実行の退避ファイルを上書きしない）。
+    """
+
+    def __init__(self, directory: str, prefix: str = "results-"):
+        os.makedirs(directory, exist_ok=True)
+        fd, self.path = tempfile.mkstemp(prefix=prefix, suffix=".jsonl", dir=directory)
+        self._file = os.fdopen(fd, "w+b")
+        # 動画ID → (ファイル内の位置, バイト数)
+        self._offsets: Dict[str, tuple] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._offsets)
+
+    def __contains__(self, video_id: str):
+        return video_id in self._offsets
+
+    def write(self, result):
+        line = (json.dumps(asdict(result), ensure_ascii=False) + "\n").encode("utf-8")
+        with self._lock:
+            self._file.seek(0, os.SEEK_END)
+            offset = self._file.tell()
+            self._file.write(line)
+            self._offsets[result.video_id] = (offset, len(line))
+
+    def __iter__(self) -> Iterator[Dict]:
+        """書き込んだ順にすべての結果を辞書として返す"""
+        with self._lock:
+            self._file.flush()
+        with open(self.path, "rb") as f:
+            for line in f:
+                yield json.loads(line)
+
+    def read(self, video_id: str) -> Dict:
+        """退避した結果を辞書として読み戻す"""
+        offset, length = self._offsets[video_id]
+        with self._lock:
+            self._file.flush()
+            self._file.seek(offset)
+            return json.loads(self._file.read(length))
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+            self._offsets.clear()
+        try:
+            os.remove(self.path)
+            os.rmdir(os.path.dirname(self.path))
+        except OSError:
+            # 他の実行の退避ファイルが残っているディレクトリは消さない
+            pass
+
+
+class MemoryProfiler:
+    """
+    処理段階ごとのメモリ使用量を計測する
+
+    各段階の開始・終了時と、sample_interval ごとのバックグラウンドサンプリングで
+    RSS（と trace=True の場合は tracemalloc の確保量）を記録し、段階ごとのピークを報告する。
+    並列実行中は同時に動いている他の段階の確保分も含まれる。
+    """
+
+    def __init__(self, trace: bool = False, sample_interval: float = 0.05):
+        """
+        Args:
+            trace: tracemalloc で Python オブジェクトの確保量も計測する（数割遅くなる）
+            sample_interval: バックグラウンドサンプリングの間隔（秒、0で段階の開始・終了時のみ）
+        """
+        self.trace = trace
+        self.sample_interval = sample_interval
+        self.stats: Dict[str, Dict] = {}
+        self._active: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        if self.trace and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        if self.sample_interval and self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._sample_loop, daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+        if self.trace and tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _sample(self):
+        rss = current_rss()
+        traced = tracemalloc.get_traced_memory()[1] if tracemalloc.is_tracing() else 0
+        with self._lock:
+            for name in self._active:
+                stat = self.stats[name]
+                stat["rss_peak"] = max(stat["rss_peak"], rss)
+                stat["traced_peak"] = max(stat["traced_peak"], traced)
+
+    def _sample_loop(self):
+        while not self._stop.wait(self.sample_interval):
+            self._sample()
+
+    @contextmanager
+    def stage(self, name: str):
+        """with profiler.stage("fetch"): ... の範囲を name の段階として計測する"""
+        with self._lock:
+            stat = self.stats.setdefault(
+                name, {"calls": 0, "seconds": 0.0, "rss_peak": 0, "traced_peak": 0}
+            )
+            stat["calls"] += 1
+            if not self._active:
+                # 他の段階が動いていなければ tracemalloc のピークを段階の開始時点に戻す
+                if tracemalloc.is_tracing():
+                    tracemalloc.reset_peak()
+            self._active[name] = self._active.get(name, 0) + 1
+        self._sample()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self._sample()
+            with self._lock:
+                stat["seconds"] += elapsed
+                self._active[name] -= 1
+                if not self._active[name]:
+                    del self._active[name]
+
+    def report(self) -> Dict[str, Dict]:
+        """段階ごとの {calls, seconds, rss_peak_mb, traced_peak_mb}"""
+        mb = 1024 * 1024
+        return {
+            name: {
+                "calls": stat["calls"],
+                "seconds": round(stat["seconds"], 3),
+                "rss_peak_mb": round(stat["rss_peak"] / mb, 1),
+                "traced_peak_mb": round(stat["traced_peak"] / mb, 1) if self.trace else None,
+            }
+            for name, stat in self.stats.items()
+        }
+
+    def print_report(self):
+        print(f"\n{'stage':<12}{'calls':>8}{'seconds':>10}{'RSS peak':>12}{'traced peak':>14}")
+        for name, stat in self.report().items():
+            traced = f"{stat['traced_peak_mb']:.1f} MB" if stat["traced_peak_mb"] is not None else "-"
+            print(f"{name:<12}{stat['calls']:>8}{stat['seconds']:>10.2f}"
+                  f"{stat['rss_peak_mb']:>9.1f} MB{traced:>14}")
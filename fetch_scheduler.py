@@ -0,0 +1,287 @@
+#!/usr/bin/env python3
+"""
+締め切り付きの優先度スケジューラ
+
+全チャンネルの候補動画を1つの優先度キュー（ヒープ）にまとめ、再生回数・新しさ・任意のスコアの
+高い順に文字起こしを取得する。締め切り時刻とリクエスト数の上限を守り、
+取得できなかった動画を理由とともに報告する。
+
+fetch_from_channels はチャンネルごとに固定本数を一覧の順に処理するため、時間が限られていると
+先頭のチャンネルの低優先度の動画が後ろのチャンネルの高優先度の動画より先に取得されてしまう。
+
+使用方法:
+    python fetch_scheduler.py --deadline 3600 --max-requests 200 --priority views --workers 4
+"""
+
+import argparse
+import heapq
+import json
+import os
+import time
+from dataclasses import dataclass, asdict, field
+from datetime import datetime
+from typing import Callable, Dict, Iterable, List, Optional, Tuple, Union
+
+from youtube_transcript_fetcher import TranscriptResult, VideoInfo, YouTubeTranscriptFetcher
+
+
+def _upload_ordinal(video: VideoInfo) -> int:
+    """投稿日を日数に変換する（不明なら0）"""
+    try:
+        return datetime.strptime(video.upload_date, "%Y%m%d").toordinal()
+    except ValueError:
+        return 0
+
+
+def _views_per_day(video: VideoInfo) -> float:
+    """投稿からの1日あたりの再生回数（投稿日が不明なら再生回数そのもの）"""
+    ordinal = _upload_ordinal(video)
+    if not ordinal:
+        return float(video.view_count)
+    days = max(datetime.now().toordinal() - ordinal, 1)
+    return video.view_count / days
+
+
+# 組み込みの優先度（値が大きいほど先に取得する）
+PRIORITIES: Dict[str, Callable[[VideoInfo], float]] = {
+    "views": lambda video: video.view_count,
+    "recent": _upload_ordinal,
+    "velocity": _views_per_day,
+}
+
+
+@dataclass
+class ScheduleReport:
+    """スケジュール実行の結果を格納するデータクラス"""
+    priority: str
+    stop_reason: str  # completed, deadline, budget
+    requests: int
+    elapsed: float
+    fetched: List[Dict] = field(default_factory=list)
+    unfetched: List[Dict] = field(default_factory=list)
+
+    @property
+    def succeeded(self) -> int:
+        return len([r for r in self.fetched if r["status"] == "success"])
+
+
+class PriorityFetchScheduler:
+    """チャンネル横断の優先度キューで文字起こしを取得するクラス"""
+
+    def __init__(
+        self,
+        fetcher: YouTubeTranscriptFetcher,
+        priority: Union[str, Callable[[VideoInfo], float]] = "views",
+        deadline: Optional[float] = None,
+        max_requests: Optional[int] = None,
+        max_workers: int = 1,
+        delay: float = 1.0,
+        languages: List[str] = ['ja'],
+        save_individual: bool = True
+    ):
+        """
+        Args:
+            fetcher: 文字起こしの取得に使うフェッチャー
+            priority: "views" / "recent" / "velocity" または VideoInfo を受け取りスコアを返す関数
+            deadline: run() 開始からの制限時間（秒、Noneで無制限）
+            max_requests: 文字起こし取得のリクエスト数の上限（Noneで無制限）
+            max_workers: 並列に取得するワーカー数
+            delay: ワーカーごとのリクエスト間の遅延（秒）
+            languages: 取得する言語のリスト
+            save_individual: 個別ファイルに保存するか
+        """
+        if isinstance(priority, str):
+            if priority not in PRIORITIES:
+                raise ValueError(f"Unknown priority: {priority}")
+            self.priority_name, self.score = priority, PRIORITIES[priority]
+        else:
+            self.priority_name, self.score = getattr(priority, "__name__", "custom"), priority
+        self.fetcher = fetcher
+        self.deadline = deadline
+        self.max_requests = max_requests
+        self.max_workers = max_workers
+        self.delay = delay
+        self.languages = languages
+        self.save_individual = save_individual
+
+        # (-スコア, 追加順, 動画) のヒープ
+        self._heap: List[Tuple[float, int, VideoInfo]] = []
+        self._queued = set()
+        self._seq = 0
+        # 1リクエストあたりの所要時間の移動平均（締め切りまでに終わらないリクエストは開始しない）
+        self._latency = 0.0
+
+    def __len__(self):
+        return len(self._heap)
+
+    def add_videos(self, videos: Iterable[VideoInfo], channel_name: str = None) -> int:
+        """
+        候補動画を追加する（取得済み・追加済みの動画は除く）
+
+        Returns:
+            追加した件数
+        """
+        added = 0
+        for video in videos:
+            if video.video_id in self._queued or self.fetcher.is_saved(video.video_id):
+                continue
+            if channel_name and not video.channel_name:
+                video.channel_name = channel_name
+            heapq.heappush(self._heap, (-self.score(video), self._seq, video))
+            self._queued.add(video.video_id)
+            self._seq += 1
+            added += 1
+        return added
+
+    def add_channel(self, channel_url: str, channel_name: str) -> int:
+        """チャンネルの全動画を候補に追加する"""
+        try:
+            with self.fetcher.stage("listing"):
+                videos = list(self.fetcher.iter_channel_videos(channel_url))
+        except Exception as e:
+            print(f"Error fetching channel videos: {e}")
+            return 0
+        for video in videos:
+            video.channel_name = channel_name
+        added = self.add_videos(videos)
+        print(f"  {channel_name}: {added} candidates")
+        return added
+
+    def _fits_deadline(self, end_time: Optional[float]) -> bool:
+        if end_time is None:
+            return True
+        return time.monotonic() + self._latency < end_time
+
+    def _task(self, video: VideoInfo) -> Tuple[TranscriptResult, float]:
+        start = time.monotonic()
+        result = self.fetcher.fetch_transcript(video, self.languages)
+        elapsed = time.monotonic() - start
+        # レート制限対策（ワーカーごと）
+        if self.delay:
+            time.sleep(self.delay)
+        return result, elapsed
+
+    def run(self) -> ScheduleReport:
+        """
+        優先度の高い順に取得する
+
+        締め切りまでに終わらない見込みのリクエストとリクエスト数の上限を超えるリクエストは開始せず、
+        キューに残った動画を unfetched として報告する。
+        """
+        from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+        start = time.monotonic()
+        end_time = start + self.deadline if self.deadline is not None else None
+        requests = 0
+        stop_reason = "completed"
+        fetched: List[TranscriptResult] = []
+        # 進捗は完了した取得の数で表示する（完了数 + 未取得数 = 候補数 になる）
+        total = len(self._heap)
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            pending = {}
+            while self._heap or pending:
+                # 空いているワーカーに優先度の高い動画から割り当てる
+                while self._heap and len(pending) < self.max_workers:
+                    if self.max_requests is not None and requests >= self.max_requests:
+                        stop_reason = "budget"
+                        break
+                    if not self._fits_deadline(end_time):
+                        stop_reason = "deadline"
+                        break
+                    _, _, video = heapq.heappop(self._heap)
+                    self._queued.discard(video.video_id)
+                    pending[executor.submit(self._task, video)] = video
+                    requests += 1
+
+                if not pending:
+                    break
+
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    video = pending.pop(future)
+                    result, elapsed = future.result()
+                    self._latency = elapsed if not self._latency else 0.7 * self._latency + 0.3 * elapsed
+                    fetched.append(result)
+                    progress = f"{len(fetched)}/{total}"
+                    if result.status == "success":
+                        print(f"  [{progress}] ✓ {video.video_id} ({video.view_count:,} views, "
+                              f"{len(result.full_text)} chars)")
+                    else:
+                        print(f"  [{progress}] ✗ {video.video_id} {result.status}: {result.error_message[:100]}")
+                    self.fetcher.record_result(result, self.save_individual)
+
+        unfetched = [video for _, _, video in sorted(self._heap)]
+        return ScheduleReport(
+            priority=self.priority_name,
+            stop_reason=stop_reason if unfetched else "completed",
+            requests=requests,
+            elapsed=time.monotonic() - start,
+            fetched=[{"video_id": r.video_id, "channel_name": r.channel_name, "status": r.status}
+                     for r in fetched],
+            unfetched=[dict(asdict(v), score=self.score(v)) for v in unfetched]
+        )
+
+
+def print_report(report: ScheduleReport, limit: int = 10):
+    """スケジュール実行の結果を表示する"""
+    print(f"\n{'='*60}")
+    print("SCHEDULE SUMMARY")
+    print(f"{'='*60}")
+    print(f"Priority: {report.priority}  Stop reason: {report.stop_reason}")
+    print(f"Requests: {report.requests}  Success: {report.succeeded}  Elapsed: {report.elapsed:.1f}s")
+    print(f"Unfetched: {len(report.unfetched)}")
+    for video in report.unfetched[:limit]:
+        print(f"  - {video['video_id']} {video['channel_name']} (score {video['score']:,.1f}) {video['title'][:40]}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="全チャンネルの動画を優先度順に締め切りまで取得する")
+    parser.add_argument("--channel", nargs=2, action="append", default=[], metavar=("URL", "NAME"),
+                        help="対象チャンネル（複数指定可）。省略時は既定のチャンネル")
+    parser.add_argument("--ids-file", action="append", default=[], help="候補に加える動画IDファイル")
+    parser.add_argument("--priority", choices=sorted(PRIORITIES), default="views", help="優先度")
+    parser.add_argument("--deadline", type=float, default=None, help="制限時間（秒）")
+    parser.add_argument("--max-requests", type=int, default=None, help="リクエスト数の上限")
+    parser.add_argument("--workers", type=int, default=4, help="並列数")
+    parser.add_argument("--delay", type=float, default=1.5, help="ワーカーごとのリクエスト間の遅延（秒）")
+    parser.add_argument("--languages", default="ja", help="取得する言語（カンマ区切り、優先順）")
+    parser.add_argument("--output-dir", default="./transcripts", help="出力ディレクトリ")
+    parser.add_argument("--prefix", default="scheduled_transcripts", help="出力ファイル名の接頭辞")
+    args = parser.parse_args()
+
+    from youtube_transcript_fetcher import iter_video_id_files
+
+    fetcher = YouTubeTranscriptFetcher(output_dir=args.output_dir)
+    scheduler = PriorityFetchScheduler(
+        fetcher,
+        priority=args.priority,
+        deadline=args.deadline,
+        max_requests=args.max_requests,
+        max_workers=args.workers,
+        delay=args.delay,
+        languages=args.languages.split(",")
+    )
+
+    channels = args.channel or ([] if args.ids_file else [
+        ("https://www.youtube.com/@プレアデスの光アセンションガイド", "プレアデスの光〜アセンション・ガイド〜"),
+        ("https://www.youtube.com/@プレアデスの真理アセンションゲート", "プレアデスの真理~アセンションゲート~"),
+    ])
+    print("Collecting candidates...")
+    for url, name in channels:
+        scheduler.add_channel(url, name)
+    if args.ids_file:
+        print(f"  ID files: {scheduler.add_videos(iter_video_id_files(args.ids_file))} candidates")
+
+    report = scheduler.run()
+    fetcher.save_all_results(args.prefix)
+    print_report(report)
+
+    report_path = os.path.join(fetcher.output_dir, f"{args.prefix}_schedule.json")
+    with open(report_path, "w", encoding="utf-8") as f:
+        json.dump(asdict(report), f, ensure_ascii=False, indent=2)
+    print(f"Saved Report: {report_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,11 +4,24 @@
 改善版YAMLプロンプト設定を使用してテスト台本を生成する
 """
 
+import argparse
 import os
-from openai import OpenAI
 
-# OpenAI クライアントの初期化
-client = OpenAI()
+# OpenAI クライアント（初回使用時に初期化）
+_client = None
+
+def get_client():
+    """OpenAI クライアントを返す（OPENAI_API_KEY / OPENAI_BASE_URL 環境変数を使用）"""
+    global _client
+    if _client is None:
+        from openai import OpenAI
+        _client = OpenAI()
+    return _client
+
+# 生成パラメータ
+MODEL = "gpt-4.1-mini"
+TEMPERATURE = 0.7
+MAX_TOKENS = 10000
 
 # テーマ設定
 THEME = "2025年に起きる魂の大覚醒と日本人の使命"
@@ -64,27 +77,31 @@ SYSTEM_PROMPT = """あなたはプレアデス系スピリチュアルYouTubeチ
 プレアデス高等評議会より深い愛と祝福を込めて。
 また明日、あなたとお話しできることを心よりお待ちしております。"""
 
-USER_PROMPT = f"""テーマ: {THEME}
+def build_user_prompt(theme):
+    """テーマからユーザープロンプトを作成する"""
+    return f"""テーマ: {theme}
 
 上記のテーマで、約7000字のYouTube台本を作成してください。
 台本構成に従い、各セクションの文字数目安を守ってください。
 
 台本のみを出力してください。説明や注釈は不要です。"""
 
+USER_PROMPT = build_user_prompt(THEME)
+
 def generate_script():
     """テスト台本を生成する"""
     print("テスト台本を生成中...")
     print(f"テーマ: {THEME}")
     print("-" * 50)
     
-    response = client.chat.completions.create(
-        model="gpt-4.1-mini",
+    response = get_client().chat.completions.create(
+        model=MODEL,
         messages=[
             {"role": "system", "content": SYSTEM_PROMPT},
             {"role": "user", "content": USER_PROMPT}
         ],
-        temperature=0.7,
-        max_tokens=10000
+        temperature=TEMPERATURE,
+        max_tokens=MAX_TOKENS
     )
     
     script = response.choices[0].message.content
@@ -95,6 +112,54 @@ def generate_script():
     
     return script
 
+def generate_script_streaming(theme=THEME, client=None, checker=None):
+    """
+    台本をストリーミングで生成し、品質検証で明らかに不合格と分かった時点で打ち切る
+    
+    Args:
+        theme: テーマ
+        client: OpenAI互換クライアント（Noneで get_client()）
+        checker: quality_check.IncrementalQualityChecker（Noneで新規作成）
+    
+    Returns:
+        (台本, 打ち切り理由) のタプル。最後まで生成できた場合の理由は None
+    """
+    from quality_check import IncrementalQualityChecker
+    
+    checker = checker or IncrementalQualityChecker()
+    print("テスト台本を生成中（ストリーミング）...")
+    print(f"テーマ: {theme}")
+    print("-" * 50)
+    
+    stream = (client or get_client()).chat.completions.create(
+        model=MODEL,
+        messages=[
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": build_user_prompt(theme)}
+        ],
+        temperature=TEMPERATURE,
+        max_tokens=MAX_TOKENS,
+        stream=True
+    )
+    
+    reason = None
+    try:
+        for chunk in stream:
+            if not chunk.choices:
+                continue
+            reason = checker.feed(chunk.choices[0].delta.content or "")
+            if reason:
+                break
+    finally:
+        # 打ち切った場合は接続を閉じて残りのトークン生成を止める
+        stream.close()
+    
+    if reason:
+        print(f"\n生成を打ち切りました（{checker.char_count}字）: {reason}")
+    else:
+        print(f"\n生成完了！文字数: {checker.char_count}字")
+    return checker.text, reason
+
 def save_script(script, filename="test_script.txt"):
     """生成した台本をファイルに保存する"""
     filepath = os.path.join(os.path.dirname(__file__), filename)
@@ -104,7 +169,17 @@ def save_script(script, filename="test_script.txt"):
     return filepath
 
 def main():
-    script = generate_script()
+    parser = argparse.ArgumentParser(description="テスト台本を生成する")
+    parser.add_argument("--stream", action="store_true",
+                        help="ストリーミングで生成し、品質検証で不合格が確定したら打ち切る")
+    args = parser.parse_args()
+    
+    if args.stream:
+        script, reason = generate_script_streaming()
+        if reason:
+            return
+    else:
+        script = generate_script()
     save_script(script)
     print("\n" + "=" * 50)
     print("生成された台本:")
@@ -1,5 +1,4 @@
 #!/usr/bin/env python3
-import requests
 import json
 import time
 import os
@@ -34,13 +33,13 @@ channel2_videos = [
     "X7TmrrbTyHQ"
 ]
 
-def submit_transcription_request(video_id):
+def submit_transcription_request(video_id, api_key=GLADIA_API_KEY):
     """Gladia APIに文字起こしリクエストを送信"""
     youtube_url = f"https://www.youtube.com/watch?v={video_id}"
     
     headers = {
         "Content-Type": "application/json",
-        "x-gladia-key": GLADIA_API_KEY
+        "x-gladia-key": api_key
     }
     
     payload = {
@@ -59,6 +58,8 @@ def submit_transcription_request(video_id):
         "callback": False
     }
     
+    import requests
+    
     try:
         response = requests.post(GLADIA_URL, headers=headers, json=payload)
         response.raise_for_status()
@@ -77,6 +78,34 @@ def submit_transcription_request(video_id):
             "error": str(e)
         }
 
+def wait_for_transcription(result_url, api_key=GLADIA_API_KEY, poll_interval=5.0, timeout=900.0):
+    """文字起こし結果が完了するまでポーリングし、全文を返す"""
+    import requests
+    
+    headers = {"x-gladia-key": api_key}
+    deadline = time.time() + timeout
+    
+    while True:
+        try:
+            response = requests.get(result_url, headers=headers)
+            response.raise_for_status()
+            result = response.json()
+        except requests.exceptions.RequestException as e:
+            return {"status": "error", "error": str(e)}
+        
+        if result.get("status") == "done":
+            transcription = (result.get("result") or {}).get("transcription") or {}
+            return {
+                "status": "done",
+                "full_text": transcription.get("full_transcript", ""),
+                "utterances": transcription.get("utterances", [])
+            }
+        if result.get("status") == "error":
+            return {"status": "error", "error": str(result.get("error_code", "unknown"))}
+        if time.time() >= deadline:
+            return {"status": "error", "error": f"Timeout waiting for {result_url}"}
+        time.sleep(poll_interval)
+
 def main():
     results = []
     
@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+"""
+ヘッジリクエスト（テールレイテンシ対策）
+
+1本の遅い接続・プロキシに捕まった少数のリクエストが、バッチ全体の所要時間を決めてしまうことがある。
+Hedger は直近の所要時間の分布を記録し、リクエストが分布の指定パーセンタイル（例: p95）を
+超えても終わらない場合に、別の接続（または別のプロキシ）で同じリクエストを追加で送る。
+先に成功した方を採用し、もう一方は取り消す（未開始なら実行しない。実行中なら次の段階に進まない）。
+
+追加のリクエストは「全リクエストに対する割合」と「同時に実行中のヘッジ数」の上限を超えない範囲でだけ送る。
+ヘッジ率・勝率・所要時間のヒストグラムは stats() で取得できる。
+
+YouTubeTranscriptFetcher(hedge=HedgeConfig(...)) から使われる。
+"""
+
+import threading
+import time
+from bisect import bisect_right
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, TimeoutError, FIRST_COMPLETED, wait
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional
+
+# 所要時間のヒストグラムの区切り（秒）
+LATENCY_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.0, 4.0, 8.0, 16.0, 32.0)
+
+
+class LatencyTracker:
+    """直近の所要時間の分布（パーセンタイル）と累積ヒストグラムを記録する"""
+
+    def __init__(self, window: int = 500):
+        """
+        Args:
+            window: パーセンタイルの計算に使う直近の件数
+        """
+        self._recent = deque(maxlen=window)
+        self.histogram = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float):
+        with self._lock:
+            self._recent.append(seconds)
+            # 区切りちょうどの値は上のバケット（ラベルは "<区切り"）に数える
+            self.histogram[bisect_right(LATENCY_BUCKETS, seconds)] += 1
+            self.count += 1
+
+    def percentile(self, p: float) -> Optional[float]:
+        """直近の所要時間の p パーセンタイル（記録がなければNone）"""
+        with self._lock:
+            ordered = sorted(self._recent)
+        if not ordered:
+            return None
+        return ordered[min(int(len(ordered) * p / 100), len(ordered) - 1)]
+
+    def snapshot(self) -> Dict:
+        """{count, p50, p90, p95, p99, histogram}"""
+        labels = [f"<{edge}s" for edge in LATENCY_BUCKETS] + [f">={LATENCY_BUCKETS[-1]}s"]
+        with self._lock:
+            histogram = dict(zip(labels, self.histogram))
+        snapshot = {"count": self.count}
+        for p in (50, 90, 95, 99):
+            value = self.percentile(p)
+            snapshot[f"p{p}"] = round(value, 3) if value is not None else None
+        snapshot["histogram"] = histogram
+        return snapshot
+
+
+@dataclass
+class HedgeConfig:
+    """ヘッジリクエストの設定"""
+    percentile: float = 95.0  # この所要時間を超えたらヘッジを送る
+    min_samples: int = 20  # 分布がこの件数に達するまではヘッジしない
+    min_delay: float = 1.0  # ヘッジを送るまでの最短の待ち時間（秒）
+    max_ratio: float = 0.1  # ヘッジ数の上限（全リクエストに対する割合）
+    max_inflight: int = 4  # 同時に実行中のヘッジ数の上限
+    proxies: List[Optional[str]] = field(default_factory=list)  # ヘッジに順に使うプロキシ（空なら新しい直接接続）
+    window: int = 500  # 分布に使う直近の件数
+    pool_size: int = 64  # 試行を実行するスレッド数（並列ワーカー数の2倍以上にする）
+
+
+class Hedger:
+    """
+    試行関数をヘッジ付きで実行するクラス
+
+    試行関数は attempt(proxy, cancel, hedged) の形で呼ばれる。
+        proxy: 使うプロキシ（Noneなら既定の接続）
+        cancel: 負けた試行に設定される Event（途中で確認して以降のリクエストを省く）
+        hedged: ヘッジとして送られた試行か
+    """
+
+    def __init__(self, config: HedgeConfig = None):
+        self.config = config or HedgeConfig()
+        self.latency = LatencyTracker(self.config.window)
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._proxy_index = 0
+        self._inflight = 0
+        self.counts = {"requests": 0, "hedged": 0, "hedge_wins": 0, "suppressed": 0}
+
+    def _submit(self, attempt: Callable, proxy: Optional[str], cancel: threading.Event, hedged: bool):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.config.pool_size)
+            return self._executor.submit(self._timed, time.monotonic(), attempt, proxy, cancel, hedged)
+
+    def hedge_delay(self) -> Optional[float]:
+        """ヘッジを送るまでの待ち時間（分布が揃うまではNone）"""
+        if self.latency.count < self.config.min_samples:
+            return None
+        return max(self.config.min_delay, self.latency.percentile(self.config.percentile))
+
+    def _acquire_hedge(self) -> bool:
+        with self._lock:
+            if (self._inflight >= self.config.max_inflight
+                    or self.counts["hedged"] + 1 > self.config.max_ratio * self.counts["requests"]):
+                self.counts["suppressed"] += 1
+                return False
+            self._inflight += 1
+            self.counts["hedged"] += 1
+            return True
+
+    def _release_hedge(self, _future=None):
+        with self._lock:
+            self._inflight -= 1
+
+    def _next_proxy(self) -> Optional[str]:
+        proxies = self.config.proxies
+        if not proxies:
+            return None
+        with self._lock:
+            proxy = proxies[self._proxy_index % len(proxies)]
+            self._proxy_index += 1
+        return proxy
+
+    def _timed(self, submitted: float, attempt: Callable, proxy: Optional[str], cancel: threading.Event,
+               hedged: bool):
+        result = attempt(proxy, cancel, hedged)
+        # ヘッジの判定（run の待ち時間）と同じく投入時点から数え、プールの待ち時間も分布に含める。
+        # 負けた試行も遅い段階を終えてから戻るため、分布の裾として記録する
+        self.latency.record(time.monotonic() - submitted)
+        return result
+
+    def run(self, attempt: Callable, accept: Callable = lambda result: True):
+        """
+        attempt をヘッジ付きで実行し、先に accept を満たした結果を返す
+
+        どちらも満たさなかった場合は最初の試行の結果を返す。
+        """
+        with self._lock:
+            self.counts["requests"] += 1
+        cancels = {}
+        primary_cancel = threading.Event()
+        primary = self._submit(attempt, None, primary_cancel, False)
+        cancels[primary] = primary_cancel
+
+        delay = self.hedge_delay()
+        try:
+            return primary.result(timeout=delay)
+        except TimeoutError:
+            pass
+        if not self._acquire_hedge():
+            return primary.result()
+
+        hedge_cancel = threading.Event()
+        hedge = self._submit(attempt, self._next_proxy(), hedge_cancel, True)
+        hedge.add_done_callback(self._release_hedge)
+        cancels[hedge] = hedge_cancel
+
+        results = {}
+        pending = {primary, hedge}
+        winner = None
+        while pending and winner is None:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                results[future] = future.result()
+            winner = next((f for f in (primary, hedge) if f in done and accept(results[f])), None)
+
+        # 負けた試行を取り消す
+        for future in pending:
+            cancels[future].set()
+            future.cancel()
+        if winner is hedge:
+            with self._lock:
+                self.counts["hedge_wins"] += 1
+        return results[winner if winner is not None else primary]
+
+    def stats(self) -> Dict:
+        """ヘッジ率・勝率・現在の閾値・所要時間の分布"""
+        with self._lock:
+            counts = dict(self.counts)
+            inflight = self._inflight
+        delay = self.hedge_delay()
+        return dict(
+            counts,
+            inflight_hedges=inflight,
+            hedge_rate=round(counts["hedged"] / counts["requests"], 4) if counts["requests"] else 0.0,
+            win_rate=round(counts["hedge_wins"] / counts["hedged"], 4) if counts["hedged"] else 0.0,
+            threshold=round(delay, 3) if delay is not None else None,
+            latency=self.latency.snapshot()
+        )
+
+    def print_stats(self):
+        stats = self.stats()
+        latency = stats["latency"]
+        print(f"Hedging: {stats['hedged']}/{stats['requests']} hedged ({stats['hedge_rate']:.1%}), "
+              f"{stats['hedge_wins']} won ({stats['win_rate']:.1%}), {stats['suppressed']} suppressed, "
+              f"threshold {stats['threshold']}s")
+        print(f"Latency: p50 {latency['p50']}s  p90 {latency['p90']}s  p95 {latency['p95']}s  p99 {latency['p99']}s")
+        print("  " + "  ".join(f"{label}:{count}" for label, count in latency["histogram"].items()))
+
+    def close(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
@@ -1,74 +1,348 @@
 #!/usr/bin/env python3
-import json
+"""
+チャンネル動画一覧（yt-dlp JSONダンプ）の解析スクリプト
+
+`yt-dlp --flat-playlist -j` の出力（gzip圧縮にも対応）を1行ずつストリーミングで読み込み、
+1パスで再生回数のヒストグラム・閾値ごとの本数・上位N本を集計する。
+全件をメモリに載せてソートしないため、100万本規模のダンプでも高速に動作する。
+全件のCSVは、一定件数ごとにソートした塊を一時ファイルに書き出してマージする（外部ソート）。
+
+使用方法:
+    python parse_videos.py channel1_all_videos.json channel2_all_videos.json.gz \\
+        --output-dir ./youtube_analysis --top 10
+"""
+
+import argparse
 import csv
+import gzip
+import heapq
+import json
+import os
+from bisect import bisect_right
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+# 集計する再生回数の閾値（降順）
+VIEW_THRESHOLDS = (10000, 5000, 3000)
+
+# ヒストグラムの区切り（各ビンは [edge[i], edge[i+1]) ）
+HISTOGRAM_EDGES = (0, 100, 1000, 3000, 5000, 10000, 30000, 100000, 1000000)
+
+CSV_FIELDS = ['id', 'title', 'view_count', 'duration', 'duration_string', 'url']
+
+
+@dataclass
+class ChannelDumpStats:
+    """1チャンネル分の集計結果を格納するデータクラス"""
+    channel_name: str
+    total: int = 0
+    threshold_counts: Dict[int, int] = field(default_factory=dict)
+    histogram: List[int] = field(default_factory=list)
+    top_videos: List[Dict] = field(default_factory=list)
+    all_videos: Optional["SortedRowSpool"] = None  # keep_all=True のとき全件（再生回数の降順）
+
+
+def open_dump(path: str):
+    """ダンプファイルをテキストモードで開く（.gz または gzip マジックバイトなら展開する）"""
+    with open(path, 'rb') as f:
+        magic = f.read(2)
+    if path.endswith('.gz') or magic == b'\x1f\x8b':
+        return gzip.open(path, 'rt', encoding='utf-8')
+    return open(path, 'r', encoding='utf-8')
+
+
+def iter_dump_records(paths: Iterable[str]) -> Iterator[Tuple[str, Dict]]:
+    """
+    複数のダンプファイルから (ファイルパス, レコード) を順に返す
+
+    壊れた行や空行は読み飛ばす。
+    """
+    for path in paths:
+        with open_dump(path) as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    yield path, json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+
+
+def _to_video_row(data: Dict) -> Dict:
+    """yt-dlpのレコードをCSV出力用の辞書に変換"""
+    video_id = data.get('id', '')
+    return {
+        'id': video_id,
+        'title': data.get('title', ''),
+        'view_count': data.get('view_count', 0),
+        'duration': data.get('duration', 0),
+        'duration_string': data.get('duration_string', ''),
+        'url': f"https://www.youtube.com/watch?v={video_id}"
+    }
+
+
+def _read_run(f) -> Iterator[List]:
+    f.seek(0)
+    for line in f:
+        yield json.loads(line)
+
+
+class SortedRowSpool:
+    """
+    CSV行を再生回数の降順に外部ソートする一時領域
+
+    chunk_size 件ごとにソートして一時ファイルに書き出し、読み出し時に heapq.merge でマージする。
+    メモリに載るのは書き出し前の1塊と、マージ中の各塊の先頭1行だけ。
+    """
+
+    def __init__(self, chunk_size: int = 100000):
+        self.chunk_size = chunk_size
+        self._buffer: List[Tuple[int, int, Dict]] = []
+        self._runs = []
+
+    def add(self, views: int, seq: int, row: Dict):
+        # 同じ再生回数なら先に現れた動画を優先する（上位N本と同じ順）
+        self._buffer.append((-views, seq, row))
+        if len(self._buffer) >= self.chunk_size:
+            self._flush()
+
+    def _flush(self):
+        import tempfile
+
+        self._buffer.sort(key=lambda e: (e[0], e[1]))
+        f = tempfile.TemporaryFile('w+', encoding='utf-8')
+        for entry in self._buffer:
+            f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        self._runs.append(f)
+        self._buffer = []
+
+    def __iter__(self) -> Iterator[Dict]:
+        self._buffer.sort(key=lambda e: (e[0], e[1]))
+        runs = [_read_run(f) for f in self._runs] + [iter(self._buffer)]
+        for _, _, row in heapq.merge(*runs, key=lambda e: (e[0], e[1])):
+            yield row
+
+    def close(self):
+        for f in self._runs:
+            f.close()
+        self._runs = []
+        self._buffer = []
+
+
+class _ChannelAccumulator:
+    """1チャンネル分の1パス集計器（ヒープで上位N本を保持）"""
+
+    def __init__(self, channel_name: str, top_n: Optional[int],
+                 thresholds: Sequence[int], edges: Sequence[int], keep_all: bool = False):
+        self.channel_name = channel_name
+        self.top_n = top_n
+        self.thresholds = sorted(thresholds, reverse=True)
+        self.edges = list(edges)
+        self.total = 0
+        self.threshold_counts = {t: 0 for t in self.thresholds}
+        self.histogram = [0] * len(self.edges)
+        # ヒープ・全件の退避ともCSV用に変換した行だけを持つ（yt-dlpのレコード全体は保持しない）
+        self._heap: List[Tuple[int, int, Dict]] = []
+        self._all = SortedRowSpool() if keep_all else None
+
+    def add(self, data: Dict):
+        views = data.get('view_count') or 0
+        seq = self.total
+        self.total += 1
+
+        bucket = bisect_right(self.edges, views) - 1
+        self.histogram[max(bucket, 0)] += 1
+
+        for threshold in self.thresholds:
+            if views < threshold:
+                break
+            self.threshold_counts[threshold] += 1
 
-def parse_channel_videos(json_file, output_csv, channel_name):
-    videos = []
-    with open(json_file, 'r', encoding='utf-8') as f:
-        for line in f:
-            try:
-                data = json.loads(line.strip())
-                videos.append({
-                    'id': data.get('id', ''),
-                    'title': data.get('title', ''),
-                    'view_count': data.get('view_count', 0),
-                    'duration': data.get('duration', 0),
-                    'duration_string': data.get('duration_string', ''),
-                    'url': f"https://www.youtube.com/watch?v={data.get('id', '')}"
-                })
-            except json.JSONDecodeError:
-                continue
-    
-    # 再生回数でソート（降順）
-    videos.sort(key=lambda x: x['view_count'] if x['view_count'] else 0, reverse=True)
-    
-    # CSVに保存
+        if self._all is not None:
+            self._all.add(views, seq, _to_video_row(data))
+
+        # 同じ再生回数なら先に現れた動画を優先する（元のsortと同じ安定順）
+        if self.top_n is None or len(self._heap) < self.top_n:
+            heapq.heappush(self._heap, (views, -seq, _to_video_row(data)))
+        elif (views, -seq) > self._heap[0][:2]:
+            heapq.heapreplace(self._heap, (views, -seq, _to_video_row(data)))
+
+    def result(self) -> ChannelDumpStats:
+        ranked = sorted(self._heap, key=lambda e: (e[0], e[1]), reverse=True)
+        return ChannelDumpStats(
+            channel_name=self.channel_name,
+            total=self.total,
+            threshold_counts=dict(self.threshold_counts),
+            histogram=list(self.histogram),
+            top_videos=[row for _, _, row in ranked],
+            all_videos=self._all
+        )
+
+
+def analyze_channel_dumps(
+    paths: Iterable[str],
+    top_n: Optional[int] = 10,
+    thresholds: Sequence[int] = VIEW_THRESHOLDS,
+    edges: Sequence[int] = HISTOGRAM_EDGES,
+    channel_name: str = None,
+    keep_all: bool = False
+) -> List[ChannelDumpStats]:
+    """
+    複数のダンプを1パスで解析し、チャンネルごとの集計結果を返す
+
+    Args:
+        paths: ダンプファイルのパス（.gz可）
+        top_n: 保持する上位動画数（Noneで全件）
+        thresholds: 本数を数える再生回数の閾値
+        edges: ヒストグラムの区切り
+        channel_name: 指定すると全レコードを1チャンネルとして集計
+        keep_all: 全件を再生回数順に一時ファイルへ外部ソートする（ChannelDumpStats.all_videos）
+
+    Returns:
+        チャンネルの出現順に並んだ集計結果のリスト
+    """
+    accumulators: Dict[str, _ChannelAccumulator] = {}
+
+    for path, data in iter_dump_records(paths):
+        name = (
+            channel_name
+            or data.get('channel')
+            or data.get('playlist_uploader')
+            or os.path.splitext(os.path.basename(path))[0]
+        )
+        acc = accumulators.get(name)
+        if acc is None:
+            acc = accumulators[name] = _ChannelAccumulator(name, top_n, thresholds, edges, keep_all)
+        acc.add(data)
+
+    return [acc.result() for acc in accumulators.values()]
+
+
+def refresh_top_videos(stats_list: List[ChannelDumpStats], refresher) -> None:
+    """
+    保持している上位動画の再生回数・長さをメタデータで更新して並べ直す
+
+    ダンプの再生回数が古い場合に使う。更新するのは集計で保持した動画だけなので、
+    順位を入れ替えたい範囲より多め（--csv-limit）に保持しておく。
+    全件のCSV（all_videos）では、更新した動画を新しい値で並べ直した位置に差し込む。
+    """
+    from youtube_transcript_fetcher import VideoInfo
+
+    for stats in stats_list:
+        videos = [
+            VideoInfo(video_id=row['id'], title=row['title'], channel_name=stats.channel_name,
+                      view_count=row['view_count'] or 0, duration=int(row['duration'] or 0))
+            for row in stats.top_videos
+        ]
+        report = refresher.refresh(videos)
+        for row, video in zip(stats.top_videos, videos):
+            row['view_count'] = video.view_count
+            row['duration'] = video.duration
+        # 同じ再生回数なら元の順位を保つ（sorted は安定）
+        stats.top_videos = sorted(stats.top_videos, key=lambda row: row['view_count'], reverse=True)
+        print(f"{stats.channel_name}: metadata {report.refreshed} refreshed, "
+              f"{report.cached} cached, {report.failed} failed")
+
+
+def parse_channel_videos(json_file, output_csv, channel_name, top_n=None):
+    """1チャンネル分のダンプを解析してCSVに保存する（上位動画のリストを返す）"""
+    stats = analyze_channel_dumps([json_file], top_n=top_n, channel_name=channel_name)
+    stats = stats[0] if stats else ChannelDumpStats(channel_name=channel_name)
+    write_videos_csv(stats, output_csv)
+    print_channel_stats(stats)
+    return stats.top_videos
+
+
+def _merged_rows(stats: ChannelDumpStats) -> Iterator[Dict]:
+    """全件の行を、上位動画（メタデータで更新済みの場合がある）の値に差し替えて再生回数順に返す"""
+    kept = {row['id'] for row in stats.top_videos}
+    rest = (row for row in stats.all_videos if row['id'] not in kept)
+    return heapq.merge(stats.top_videos, rest, key=lambda row: -(row['view_count'] or 0))
+
+
+def write_videos_csv(stats: ChannelDumpStats, output_csv: str):
+    """上位動画（all_videos があれば全件）をCSVに保存"""
     with open(output_csv, 'w', encoding='utf-8', newline='') as f:
-        writer = csv.DictWriter(f, fieldnames=['id', 'title', 'view_count', 'duration', 'duration_string', 'url'])
+        writer = csv.DictWriter(f, fieldnames=CSV_FIELDS)
         writer.writeheader()
-        writer.writerows(videos)
-    
-    print(f"\n{channel_name}:")
-    print(f"  総動画数: {len(videos)}")
-    print(f"  1万再生以上: {len([v for v in videos if v['view_count'] and v['view_count'] >= 10000])}")
-    print(f"  5000再生以上: {len([v for v in videos if v['view_count'] and v['view_count'] >= 5000])}")
-    print(f"  3000再生以上: {len([v for v in videos if v['view_count'] and v['view_count'] >= 3000])}")
-    
-    print(f"\n  上位10本の動画:")
-    for i, v in enumerate(videos[:10], 1):
+        if stats.all_videos is not None:
+            writer.writerows(_merged_rows(stats))
+        else:
+            writer.writerows(stats.top_videos)
+
+
+def write_target_ids(stats_list: List[ChannelDumpStats], output_path: str, per_channel: int = 10):
+    """分析対象の動画IDを target_video_ids.txt 形式で保存"""
+    with open(output_path, 'w', encoding='utf-8') as f:
+        for i, stats in enumerate(stats_list, 1):
+            if i > 1:
+                f.write("\n")
+            f.write(f"# チャンネル{i}: {stats.channel_name}\n")
+            for v in stats.top_videos[:per_channel]:
+                f.write(f"{v['id']}\n")
+
+
+def print_channel_stats(stats: ChannelDumpStats, top: int = 10):
+    """チャンネルの集計結果を表示"""
+    print(f"\n{stats.channel_name}:")
+    print(f"  総動画数: {stats.total}")
+    for threshold, count in stats.threshold_counts.items():
+        if threshold % 10000 == 0:
+            print(f"  {threshold // 10000}万再生以上: {count}")
+        else:
+            print(f"  {threshold}再生以上: {count}")
+
+    print(f"\n  再生回数の分布:")
+    edges = HISTOGRAM_EDGES if len(stats.histogram) == len(HISTOGRAM_EDGES) else range(len(stats.histogram))
+    for i, count in enumerate(stats.histogram):
+        upper = f"{edges[i + 1]:,}" if i + 1 < len(stats.histogram) else "∞"
+        print(f"    {edges[i]:,}〜{upper}: {count}")
+
+    print(f"\n  上位{top}本の動画:")
+    for i, v in enumerate(stats.top_videos[:top], 1):
         print(f"    {i}. {v['title'][:50]}... ({v['view_count']}回)")
-    
-    return videos
-
-# チャンネル1
-videos1 = parse_channel_videos(
-    '/home/ubuntu/youtube_analysis/channel1_all_videos.json',
-    '/home/ubuntu/youtube_analysis/channel1_videos.csv',
-    'プレアデスの光〜アセンション・ガイド〜'
-)
-
-# チャンネル2
-videos2 = parse_channel_videos(
-    '/home/ubuntu/youtube_analysis/channel2_all_videos.json',
-    '/home/ubuntu/youtube_analysis/channel2_videos.csv',
-    'プレアデスの真理~アセンションゲート~'
-)
-
-# 分析対象の動画IDをまとめる
-print("\n\n=== 分析対象の動画（上位10本ずつ） ===")
-print("\nチャンネル1の上位10本:")
-for v in videos1[:10]:
-    print(f"  {v['id']}")
-
-print("\nチャンネル2の上位10本:")
-for v in videos2[:10]:
-    print(f"  {v['id']}")
-
-# 全動画IDをファイルに保存
-with open('/home/ubuntu/youtube_analysis/target_video_ids.txt', 'w') as f:
-    f.write("# チャンネル1: プレアデスの光〜アセンション・ガイド〜\n")
-    for v in videos1[:10]:
-        f.write(f"{v['id']}\n")
-    f.write("\n# チャンネル2: プレアデスの真理~アセンションゲート~\n")
-    for v in videos2[:10]:
-        f.write(f"{v['id']}\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="yt-dlp JSONダンプから再生回数上位の動画を抽出する")
+    parser.add_argument("dumps", nargs="+", help="yt-dlp --flat-playlist -j の出力ファイル（.gz可）")
+    parser.add_argument("--output-dir", default=".", help="CSVとID一覧の出力先")
+    parser.add_argument("--top", type=int, default=10, help="対象として選ぶチャンネルごとの本数")
+    parser.add_argument("--csv-limit", type=int, default=None,
+                        help="CSVに書き出す上位本数（省略時は全件）")
+    parser.add_argument("--refresh-metadata", action="store_true",
+                        help="保持した動画の再生回数・長さを取得し直して並べ直す（キャッシュ付き）")
+    parser.add_argument("--metadata-ttl", type=float, default=86400,
+                        help="メタデータのキャッシュの有効期間（秒）")
+    args = parser.parse_args()
+
+    # 上位はCSVの本数分だけメモリに保持し、全件のCSVは一時ファイル上で外部ソートする
+    keep = args.top if args.csv_limit is None else max(args.csv_limit, args.top)
+    stats_list = analyze_channel_dumps(args.dumps, top_n=keep, keep_all=args.csv_limit is None)
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    if args.refresh_metadata:
+        from video_metadata import MetadataCache, MetadataRefresher
+
+        cache = MetadataCache(os.path.join(args.output_dir, ".metadata_cache.json"), args.metadata_ttl)
+        refresh_top_videos(stats_list, MetadataRefresher(cache=cache))
+
+    for i, stats in enumerate(stats_list, 1):
+        write_videos_csv(stats, os.path.join(args.output_dir, f"channel{i}_videos.csv"))
+        print_channel_stats(stats, args.top)
+        if stats.all_videos is not None:
+            stats.all_videos.close()
+
+    # 分析対象の動画IDをまとめる
+    print(f"\n\n=== 分析対象の動画（上位{args.top}本ずつ） ===")
+    for i, stats in enumerate(stats_list, 1):
+        print(f"\nチャンネル{i}の上位{args.top}本:")
+        for v in stats.top_videos[:args.top]:
+            print(f"  {v['id']}")
+
+    write_target_ids(stats_list, os.path.join(args.output_dir, "target_video_ids.txt"), args.top)
+
+
+if __name__ == "__main__":
+    main()
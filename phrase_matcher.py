@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+複数フレーズの一括検索（Aho-Corasick法）
+
+カテゴリごとのフレーズ一覧から1つのオートマトンを構築し、
+テキストを1回走査するだけで全フレーズの出現回数と出現位置を求める。
+走査コストはテキスト長に比例し、フレーズ数にはほぼ依存しない。
+"""
+
+from collections import deque
+from typing import Dict, Iterable, List, Tuple
+
+
+class PhraseMatcher:
+    """カテゴリ付きフレーズの Aho-Corasick オートマトン"""
+
+    def __init__(self, categories: Dict[str, Iterable[str]]):
+        """
+        Args:
+            categories: カテゴリ名 → フレーズ一覧（同じフレーズが複数カテゴリに属してもよい）
+        """
+        self.categories = {name: list(phrases) for name, phrases in categories.items()}
+
+        # フレーズ → 所属カテゴリ
+        owners: Dict[str, List[str]] = {}
+        for name, phrases in self.categories.items():
+            for phrase in phrases:
+                if phrase:
+                    owners.setdefault(phrase, [])
+                    if name not in owners[phrase]:
+                        owners[phrase].append(name)
+        self._phrases: List[Tuple[str, List[str]]] = list(owners.items())
+
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._output: List[List[int]] = [[]]
+        self._build()
+
+    def _build(self):
+        """トライを作り、BFSで失敗遷移と出力を設定する"""
+        goto, output = self._goto, self._output
+        for phrase_id, (phrase, _) in enumerate(self._phrases):
+            state = 0
+            for ch in phrase:
+                nxt = goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(goto)
+                    goto[state][ch] = nxt
+                    goto.append({})
+                    self._fail.append(0)
+                    output.append([])
+                state = nxt
+            output[state].append(phrase_id)
+
+        fail = self._fail
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in goto[state].items():
+                queue.append(nxt)
+                f = fail[state]
+                while f and ch not in goto[f]:
+                    f = fail[f]
+                fail[nxt] = goto[f].get(ch, 0)
+                output[nxt] = output[nxt] + output[fail[nxt]]
+
+    def iter_matches(self, text: str):
+        """(開始位置, フレーズ) を出現順に返す"""
+        goto, fail, output, phrases = self._goto, self._fail, self._output, self._phrases
+        state = 0
+        for i, ch in enumerate(text):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if output[state]:
+                for phrase_id in output[state]:
+                    phrase = phrases[phrase_id][0]
+                    yield i - len(phrase) + 1, phrase
+
+    def stream(self) -> "MatchStream":
+        """テキストを分割して順に与えるための走査器を返す"""
+        return MatchStream(self)
+
+    def scan(self, text: str) -> Dict[str, Dict[str, List[int]]]:
+        """
+        テキストを1回走査し、カテゴリごとの出現位置を返す
+
+        Returns:
+            {カテゴリ名: {フレーズ: [開始位置, ...]}}（未検出のフレーズは空リスト）
+        """
+        positions: Dict[str, List[int]] = {phrase: [] for phrase, _ in self._phrases}
+        for start, phrase in self.iter_matches(text):
+            positions[phrase].append(start)
+
+        return {
+            name: {phrase: positions.get(phrase, []) for phrase in phrases}
+            for name, phrases in self.categories.items()
+        }
+
+
+class MatchStream:
+    """
+    オートマトンの状態を保持したまま、分割されたテキストを順に走査する
+
+    チャンクの境界をまたぐフレーズも検出できるため、ストリーミング生成の
+    トークンをそのまま与えられる。位置はストリーム先頭からの文字数。
+    """
+
+    def __init__(self, matcher: PhraseMatcher):
+        self.matcher = matcher
+        self.state = 0
+        self.offset = 0
+
+    def feed(self, chunk: str) -> List[Tuple[int, str]]:
+        """チャンクを走査し、新たに見つかった (開始位置, フレーズ) を返す"""
+        m = self.matcher
+        goto, fail, output, phrases = m._goto, m._fail, m._output, m._phrases
+        state = self.state
+        found = []
+        for i, ch in enumerate(chunk, self.offset):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if output[state]:
+                for phrase_id in output[state]:
+                    phrase = phrases[phrase_id][0]
+                    found.append((i - len(phrase) + 1, phrase))
+        self.state = state
+        self.offset += len(chunk)
+        return found
@@ -0,0 +1,331 @@
+#!/usr/bin/env python3
+"""
+頻出フレーズ抽出スクリプト
+
+文字起こしコーパスを連結した文字列の接尾辞配列（SA-IS法）とLCP配列（Kasai法）を作り、
+LCP区間ごとに「何本の動画に現れるか」（文書頻度）を求めて、多くの動画で繰り返される
+フレーズを quality_check 用の候補として出力する。
+
+接尾辞配列とLCPは線形時間、文書頻度はBITを使ったオフライン集計で O(n log n) のため、
+数千万文字規模のコーパスでも現実的な時間とメモリで動作する。
+長さ n の作業領域はすべて array('i')（1要素4バイト）で持ち、Pythonの int のリストは作らない。
+
+使用方法:
+    python phrase_miner.py gladia_transcripts/ --min-df 5 --output mined_phrases.json
+    python quality_check.py generated/ --phrases mined_phrases.json
+"""
+
+import argparse
+import json
+import unicodedata
+from array import array
+from typing import Dict, List, Sequence, Tuple
+
+# 長さ n の作業配列の型（符号付き32ビット整数）
+_INT = "i"
+
+# 文書の区切り（接尾辞配列上では最小の文字として扱い、LCPはここで打ち切る）
+_SEPARATOR = 1
+
+# 文の区切り（フレーズが文をまたがないよう、文書の区切りと同じ扱いにする）
+SENTENCE_BOUNDARIES = "。！？!?"
+
+
+def _filled(value: int, n: int) -> array:
+    return array(_INT, [value]) * n
+
+
+def suffix_array(s: Sequence[int], alphabet_size: int) -> Sequence[int]:
+    """
+    SA-IS法で接尾辞配列を求める
+
+    Args:
+        s: 整数列（末尾は他より小さい一意の番兵 0 であること）
+        alphabet_size: 文字の種類数（s の要素は 0 以上 alphabet_size 未満）
+    """
+    n = len(s)
+    if n == 1:
+        return array(_INT, [0])
+
+    # S型 = True, L型 = False
+    stype = bytearray(n)
+    stype[n - 1] = 1
+    for i in range(n - 2, -1, -1):
+        if s[i] < s[i + 1] or (s[i] == s[i + 1] and stype[i + 1]):
+            stype[i] = 1
+
+    def is_lms(i):
+        return i > 0 and stype[i] and not stype[i - 1]
+
+    counts = [0] * alphabet_size
+    for c in s:
+        counts[c] += 1
+
+    def bucket_heads():
+        heads, total = [0] * alphabet_size, 0
+        for c in range(alphabet_size):
+            heads[c] = total
+            total += counts[c]
+        return heads
+
+    def bucket_tails():
+        tails, total = [0] * alphabet_size, 0
+        for c in range(alphabet_size):
+            total += counts[c]
+            tails[c] = total - 1
+        return tails
+
+    def induce(lms_sorted):
+        sa = _filled(-1, n)
+        tails = bucket_tails()
+        for i in reversed(lms_sorted):
+            c = s[i]
+            sa[tails[c]] = i
+            tails[c] -= 1
+        heads = bucket_heads()
+        for j in range(n):
+            i = sa[j] - 1
+            if i >= 0 and not stype[i]:
+                c = s[i]
+                sa[heads[c]] = i
+                heads[c] += 1
+        tails = bucket_tails()
+        for j in range(n - 1, -1, -1):
+            i = sa[j] - 1
+            if i >= 0 and stype[i]:
+                c = s[i]
+                sa[tails[c]] = i
+                tails[c] -= 1
+        return sa
+
+    lms_positions = array(_INT, (i for i in range(1, n) if stype[i] and not stype[i - 1]))
+    sa = induce(lms_positions)
+
+    # LMS部分文字列に名前を付ける
+    def lms_equal(a, b):
+        if a == n - 1 or b == n - 1:
+            return False
+        j = 0
+        while True:
+            if s[a + j] != s[b + j] or stype[a + j] != stype[b + j]:
+                return False
+            if j > 0 and (is_lms(a + j) or is_lms(b + j)):
+                return is_lms(a + j) and is_lms(b + j)
+            j += 1
+
+    names = _filled(-1, n)
+    name = -1
+    prev = -1
+    for i in sa:
+        if not is_lms(i):
+            continue
+        if prev < 0 or not lms_equal(prev, i):
+            name += 1
+        names[i] = name
+        prev = i
+
+    reduced = array(_INT, (names[i] for i in lms_positions))
+    del names
+    if name + 1 < len(reduced):
+        reduced_sa = suffix_array(reduced, name + 1)
+    else:
+        reduced_sa = _filled(0, len(reduced))
+        for i, c in enumerate(reduced):
+            reduced_sa[c] = i
+
+    return induce(array(_INT, (lms_positions[i] for i in reduced_sa)))
+
+
+def lcp_array(s: Sequence[int], sa: Sequence[int], max_len: int) -> array:
+    """
+    Kasai法でLCP配列を求める（lcp[i] は sa[i-1] と sa[i] の共通接頭辞長）
+
+    区切り文字を越えては一致させず、値は max_len で頭打ちにする。
+    """
+    n = len(s)
+    rank = _filled(0, n)
+    for i, p in enumerate(sa):
+        rank[p] = i
+
+    lcp = _filled(0, n)
+    h = 0
+    for i in range(n):
+        r = rank[i]
+        if r == 0:
+            h = 0
+            continue
+        j = sa[r - 1]
+        while i + h < n and j + h < n and s[i + h] == s[j + h] and s[i + h] > _SEPARATOR:
+            h += 1
+        lcp[r] = min(h, max_len)
+        if h:
+            h -= 1
+    return lcp
+
+
+class _FenwickTree:
+    def __init__(self, n: int):
+        self.n = n
+        self.tree = _filled(0, n + 1)
+
+    def add(self, i: int):
+        i += 1
+        while i <= self.n:
+            self.tree[i] += 1
+            i += i & -i
+
+    def prefix(self, i: int) -> int:
+        """[0, i) の合計"""
+        total = 0
+        while i > 0:
+            total += self.tree[i]
+            i -= i & -i
+        return total
+
+
+def _encode(docs: List[str]) -> Tuple[array, array, int]:
+    """文書を連結して整数列に変換する（0: 番兵, 1: 区切り, 2以降: 文字）"""
+    alphabet = sorted(set().union(*docs) - set(SENTENCE_BOUNDARIES))
+    codes = {ch: i + 2 for i, ch in enumerate(alphabet)}
+    codes.update((ch, _SEPARATOR) for ch in SENTENCE_BOUNDARIES)
+    s, doc_of = array(_INT), array(_INT)
+    for d, text in enumerate(docs):
+        s.extend(codes[ch] for ch in text)
+        s.append(_SEPARATOR)
+        doc_of.extend(_filled(d, len(text) + 1))
+    s.append(0)
+    doc_of.append(-1)
+    return s, doc_of, len(alphabet) + 2
+
+
+def _is_phrase(text: str) -> bool:
+    """句読点・記号・数字だけのフレーズは除く"""
+    return any(unicodedata.category(ch)[0] in "LN" and not ch.isdigit() for ch in text)
+
+
+def mine_phrases(
+    docs: List[str],
+    min_len: int = 4,
+    max_len: int = 20,
+    min_df: int = 2,
+    limit: int = 200
+) -> List[Dict]:
+    """
+    多くの文書に現れる繰り返しフレーズを抽出する
+
+    Args:
+        docs: 文書（動画ごとの文字起こし）
+        min_len: フレーズの最小文字数
+        max_len: フレーズの最大文字数
+        min_df: 最低限現れるべき文書数
+        limit: 返す候補の最大数
+
+    Returns:
+        {"phrase", "df", "count"} のリスト（文書頻度の高い順、同率なら長い順）
+    """
+    if not docs:
+        return []
+    s, doc_of, alphabet_size = _encode(docs)
+    n = len(s)
+    sa = suffix_array(s, alphabet_size)
+    lcp = lcp_array(s, sa, max_len)
+
+    # LCP区間（同じ接頭辞を共有する接尾辞の範囲）を列挙する
+    intervals = []
+    stack = [(0, 0)]
+    for i in range(1, n + 1):
+        value = lcp[i] if i < n else 0
+        lb = i - 1
+        while value < stack[-1][0]:
+            depth, lb = stack.pop()
+            if depth >= min_len and i - lb >= min_df:
+                intervals.append((lb, i - 1, depth))
+        if value > stack[-1][0]:
+            stack.append((value, lb))
+
+    # 各区間の文書頻度 = 区間内で「同じ文書の直前の出現が区間外」の位置の数。
+    # 直前の出現 prev を持つ位置は next_same[prev] の1つだけなので、
+    # 区間の左端 lb まで進めながら「prev < lb」になった位置を順に有効化する
+    tree = _FenwickTree(n)
+    # 番兵の doc_of は -1 なので、末尾の要素をその分に使う
+    last_seen = _filled(-1, len(docs) + 1)
+    next_same = _filled(-1, n)
+    for j, p in enumerate(sa):
+        d = doc_of[p]
+        prev = last_seen[d]
+        last_seen[d] = j
+        if prev < 0:
+            # 文書の最初の出現はどの区間でも数える
+            tree.add(j)
+        else:
+            next_same[prev] = j
+    del last_seen
+
+    intervals.sort()
+    activated = 0
+    candidates = []
+    for lb, rb, depth in intervals:
+        while activated < lb:
+            j = next_same[activated]
+            if j >= 0:
+                tree.add(j)
+            activated += 1
+        df = tree.prefix(rb + 1) - tree.prefix(lb)
+        if df < min_df:
+            continue
+        candidates.append((df, depth, rb - lb + 1, sa[lb]))
+
+    # 文字列に戻して、同じ文書頻度の長いフレーズに含まれるものを除く
+    text = "\x01".join(docs)
+    ranked = sorted(candidates, key=lambda c: (-c[0], -c[1]))
+    kept: List[Dict] = []
+    kept_by_df: Dict[int, List[str]] = {}
+    for df, depth, count, start in ranked:
+        phrase = text[start:start + depth]
+        if not _is_phrase(phrase):
+            continue
+        if any(phrase in longer for longer in kept_by_df.get(df, [])):
+            continue
+        kept_by_df.setdefault(df, []).append(phrase)
+        kept.append({"phrase": phrase, "df": df, "count": count})
+        if len(kept) >= limit:
+            break
+    return kept
+
+
+def normalize(text: str) -> str:
+    """字幕の改行由来の空白を除き、全角・半角の揺れをそろえる"""
+    return "".join(unicodedata.normalize("NFKC", text).split())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="文字起こしコーパスから頻出フレーズを抽出する")
+    parser.add_argument("paths", nargs="+", help="individual/ ディレクトリや *_combined.txt")
+    parser.add_argument("--min-len", type=int, default=4, help="フレーズの最小文字数")
+    parser.add_argument("--max-len", type=int, default=20, help="フレーズの最大文字数")
+    parser.add_argument("--min-df", type=int, default=None,
+                        help="最低限現れるべき動画数（省略時は動画数の半分）")
+    parser.add_argument("--limit", type=int, default=100, help="出力するフレーズ数")
+    parser.add_argument("--output", default="mined_phrases.json", help="出力先")
+    args = parser.parse_args()
+
+    from transcript_corpus import load_corpus
+
+    docs = [normalize(r.full_text) for r in load_corpus(args.paths) if r.full_text]
+    min_df = args.min_df or max(2, len(docs) // 2)
+    print(f"{len(docs)} documents, {sum(len(d) for d in docs):,} chars, min_df={min_df}")
+
+    phrases = mine_phrases(docs, args.min_len, args.max_len, min_df, args.limit)
+    for p in phrases[:30]:
+        print(f"  {p['df']:>4}本 {p['count']:>5}回  {p['phrase']}")
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump({
+            "REQUIRED_PHRASES": [p["phrase"] for p in phrases],
+            "candidates": phrases,
+        }, f, ensure_ascii=False, indent=2)
+    print(f"Saved: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
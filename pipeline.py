@@ -0,0 +1,359 @@
+#!/usr/bin/env python3
+"""
+文字起こしパイプライン実行スクリプト
+
+1つの設定ファイル（JSONまたはYAML）に従って
+    一覧取得 → 対象選定 → 文字起こし取得 → ASRフォールバック → 出力 → 品質検証
+の各ステージを実行する。各ステージはスレッドで並行に動作し、ステージ間は
+サイズ上限付きのキューで接続されるため、上流の処理中でも下流の処理が開始される。
+
+使用方法:
+    python pipeline.py pipeline_config.json
+
+設定例は pipeline_config.json を参照。
+"""
+
+import argparse
+import json
+import os
+import queue
+import threading
+import time
+from collections import defaultdict
+from typing import Any, Callable, Dict, List, Optional
+
+from youtube_transcript_fetcher import TranscriptResult, VideoInfo, YouTubeTranscriptFetcher
+
+# ステージの終了を下流に伝える番兵
+_DONE = object()
+
+DEFAULT_CONFIG = {
+    "output_dir": "./youtube_analysis",
+    "proxy": None,
+    "languages": ["ja"],
+    "delay": 1.0,
+    "queue_size": 32,
+    "channels": [],
+    "select": {"top_n": 10, "min_views": 0},
+    "metadata": {"enabled": False, "ttl": 86400, "workers": 4},
+    "fetch": {"workers": 2},
+    "asr_fallback": {"enabled": False, "api_key_env": "GLADIA_API_KEY",
+                     "poll_interval": 5.0, "timeout": 900.0, "workers": 2},
+    "export": {"prefix": "transcripts", "save_individual": True, "layout": "flat"},
+    "quality_check": {"enabled": True, "report": "quality_report.jsonl"},
+}
+
+
+def load_config(path: str) -> Dict[str, Any]:
+    """設定ファイルを読み込み、既定値とマージする"""
+    with open(path, "r", encoding="utf-8") as f:
+        if path.endswith((".yaml", ".yml")):
+            import yaml
+            user_config = yaml.safe_load(f) or {}
+        else:
+            user_config = json.load(f)
+
+    config = {}
+    for key, default in DEFAULT_CONFIG.items():
+        value = user_config.get(key, default)
+        if isinstance(default, dict):
+            value = {**default, **(value or {})}
+        config[key] = value
+    return config
+
+
+class _Stage:
+    """1つのステージ（ワーカースレッド群と入力キュー）"""
+
+    def __init__(self, name: str, process: Callable, workers: int, queue_size: int):
+        self.name = name
+        self.process = process
+        self.workers = max(1, workers)
+        self.inbox: "queue.Queue" = queue.Queue(maxsize=queue_size)
+        self.upstream_count = 0
+        self.downstream: Dict[str, "_Stage"] = {}
+        self.processed = 0
+        self.failed = 0
+        self._done_seen = 0
+        self._live_workers = 0
+        self._lock = threading.Lock()
+
+
+class StagePipeline:
+    """
+    ステージをDAGとして並行実行する小さなランナー
+
+    各ステージは process(item, emit) を実装し、emit(ステージ名, item) で
+    下流へ値を渡す。上流ステージがすべて終了すると番兵が伝播し、
+    ステージのワーカーが順に終了する。
+    """
+
+    def __init__(self, queue_size: int = 32):
+        self.queue_size = queue_size
+        self.stages: Dict[str, _Stage] = {}
+
+    def add_stage(self, name: str, process: Callable, workers: int = 1,
+                  downstream: List[str] = None):
+        """ステージを追加する（下流ステージは先に追加しておく）"""
+        stage = _Stage(name, process, workers, self.queue_size)
+        for target in downstream or []:
+            stage.downstream[target] = self.stages[target]
+            self.stages[target].upstream_count += 1
+        self.stages[name] = stage
+        return stage
+
+    def run(self, source: str, items):
+        """source ステージに items を投入し、全ステージの完了を待つ"""
+        threads = []
+        for stage in self.stages.values():
+            stage._live_workers = stage.workers
+            for i in range(stage.workers):
+                t = threading.Thread(target=self._worker, args=(stage,),
+                                     name=f"{stage.name}-{i}", daemon=True)
+                t.start()
+                threads.append(t)
+
+        entry = self.stages[source]
+        entry.upstream_count += 1
+        for item in items:
+            entry.inbox.put(item)
+        entry.inbox.put(_DONE)
+
+        for t in threads:
+            t.join()
+
+    def _worker(self, stage: _Stage):
+        def emit(target: str, item):
+            stage.downstream[target].inbox.put(item)
+
+        while True:
+            item = stage.inbox.get()
+            if item is _DONE:
+                with stage._lock:
+                    stage._done_seen += 1
+                    finished = stage._done_seen >= stage.upstream_count
+                if not finished:
+                    continue
+                # 同じステージの他のワーカーにも終了を伝える
+                stage.inbox.put(_DONE)
+                break
+
+            try:
+                stage.process(item, emit)
+                with stage._lock:
+                    stage.processed += 1
+            except Exception as e:
+                with stage._lock:
+                    stage.failed += 1
+                print(f"  [{stage.name}] Error: {e}")
+
+        with stage._lock:
+            stage._live_workers -= 1
+            last = stage._live_workers == 0
+        if last:
+            for downstream in stage.downstream.values():
+                downstream.inbox.put(_DONE)
+
+
+class TranscriptPipeline:
+    """設定ファイルに基づいて文字起こしパイプラインを構築・実行するクラス"""
+
+    def __init__(self, config: Dict[str, Any]):
+        self.config = config
+        metadata = config["metadata"]
+        if metadata["enabled"]:
+            from video_metadata import MetadataCache, MetadataRefresher
+        self.fetcher = YouTubeTranscriptFetcher(
+            output_dir=config["output_dir"],
+            proxy=config["proxy"],
+            refresher=MetadataRefresher(
+                cache=MetadataCache(os.path.join(config["output_dir"], ".metadata_cache.json"), metadata["ttl"]),
+                max_workers=metadata["workers"]
+            ) if metadata["enabled"] else None,
+            layout=config["export"]["layout"]
+        )
+        self._seen_ids = set()
+        self._selected = defaultdict(int)
+        self._lock = threading.Lock()
+        self._quality_file = None
+
+    # ---- ステージ実装 ----
+
+    def _list(self, channel: Dict, emit):
+        """一覧取得: チャンネル設定から動画一覧を作る"""
+        name = channel["name"]
+        if channel.get("videos"):
+            videos = [
+                VideoInfo(
+                    video_id=v["id"] if isinstance(v, dict) else v,
+                    title=v.get("title", "") if isinstance(v, dict) else "",
+                    channel_name=name,
+                    view_count=v.get("view_count", 0) if isinstance(v, dict) else 0
+                )
+                for v in channel["videos"]
+            ]
+            if self.fetcher.refresher is not None:
+                self.fetcher.refresher.refresh(videos)
+        else:
+            print(f"[list] Fetching video list: {name}")
+            videos = self.fetcher.get_channel_videos(channel["url"], channel.get("max_videos"))
+            for video in videos:
+                video.channel_name = name
+        print(f"[list] {name}: {len(videos)} videos")
+        emit("select", (channel, videos))
+
+    def _select(self, item, emit):
+        """対象選定: 再生回数でフィルタし、チャンネルごとに上位N本を選ぶ"""
+        channel, videos = item
+        select = {**self.config["select"], **channel.get("select", {})}
+        top_n = select.get("top_n")
+        min_views = select.get("min_views") or 0
+
+        # 明示的に指定された動画は指定順を保つ
+        if not channel.get("videos"):
+            videos = sorted(videos, key=lambda v: v.view_count, reverse=True)
+
+        for video in videos:
+            if top_n and self._selected[channel["name"]] >= top_n:
+                break
+            if video.view_count < min_views and not channel.get("videos"):
+                continue
+            with self._lock:
+                if video.video_id in self._seen_ids:
+                    continue
+                self._seen_ids.add(video.video_id)
+                self._selected[channel["name"]] += 1
+            emit("fetch", video)
+
+    def _fetch(self, video: VideoInfo, emit):
+        """文字起こし取得: 失敗したものはASRフォールバックへ回す"""
+        result = self.fetcher.fetch_transcript(video, self.config["languages"])
+        if result.status == "success":
+            print(f"[fetch] ✓ {video.video_id} ({len(result.full_text)} chars)")
+            emit("export", result)
+        elif self.config["asr_fallback"]["enabled"]:
+            print(f"[fetch] ✗ {video.video_id} {result.status} → ASR")
+            emit("asr_fallback", result)
+        else:
+            print(f"[fetch] ✗ {video.video_id} {result.status}: {result.error_message[:100]}")
+            emit("export", result)
+        time.sleep(self.config["delay"])
+
+    def _asr_fallback(self, failed: TranscriptResult, emit):
+        """ASRフォールバック: Gladiaで音声から文字起こしする"""
+        import gladia_transcribe
+
+        options = self.config["asr_fallback"]
+        api_key = os.environ.get(options["api_key_env"]) or gladia_transcribe.GLADIA_API_KEY
+        submitted = gladia_transcribe.submit_transcription_request(failed.video_id, api_key=api_key)
+        if submitted["status"] != "submitted":
+            failed.error_message = f"ASR submit failed: {submitted.get('error', '')}"[:500]
+            emit("export", failed)
+            return
+
+        done = gladia_transcribe.wait_for_transcription(
+            submitted["result_url"], api_key=api_key,
+            poll_interval=options["poll_interval"], timeout=options["timeout"]
+        )
+        if done["status"] != "done":
+            failed.error_message = f"ASR failed: {done.get('error', '')}"[:500]
+            emit("export", failed)
+            return
+
+        segments = [
+            {"text": u.get("text", ""), "start": u.get("start", 0.0),
+             "duration": u.get("end", 0.0) - u.get("start", 0.0)}
+            for u in done["utterances"]
+        ]
+        print(f"[asr] ✓ {failed.video_id} ({len(done['full_text'])} chars)")
+        emit("export", TranscriptResult(
+            video_id=failed.video_id,
+            title=failed.title,
+            channel_name=failed.channel_name,
+            status="success",
+            full_text=done["full_text"],
+            transcript_segments=segments
+        ))
+
+    def _export(self, result: TranscriptResult, emit):
+        """出力: 結果を集約し、成功結果は索引・ストア・個別ファイルに記録する"""
+        with self._lock:
+            # record_result は渡した result の本文を退避で消さないため、そのまま品質検証に渡せる
+            self.fetcher.record_result(result, save_individual=self.config["export"]["save_individual"])
+        if result.status == "success" and self.config["quality_check"]["enabled"]:
+            emit("quality_check", result)
+
+    def _quality_check(self, result: TranscriptResult, emit):
+        """品質検証: 取得した文字起こしをスコアリングしてJSONLに追記する"""
+        import quality_check
+
+        report = quality_check.score_script(result.full_text, result.video_id)
+        line = json.dumps({
+            "video_id": result.video_id,
+            "channel_name": result.channel_name,
+            "total_score": report["total_score"],
+            "checks": report["checks"],
+        }, ensure_ascii=False)
+        with self._lock:
+            self._quality_file.write(line + "\n")
+
+    # ---- 実行 ----
+
+    def build(self) -> StagePipeline:
+        """設定からステージのDAGを組み立てる"""
+        config = self.config
+        pipeline = StagePipeline(queue_size=config["queue_size"])
+
+        pipeline.add_stage("quality_check", self._quality_check)
+        pipeline.add_stage(
+            "export", self._export,
+            downstream=["quality_check"]
+        )
+        pipeline.add_stage(
+            "asr_fallback", self._asr_fallback,
+            workers=config["asr_fallback"]["workers"],
+            downstream=["export"]
+        )
+        pipeline.add_stage(
+            "fetch", self._fetch,
+            workers=config["fetch"]["workers"],
+            downstream=["export", "asr_fallback"]
+        )
+        pipeline.add_stage("select", self._select, downstream=["fetch"])
+        pipeline.add_stage(
+            "list", self._list,
+            workers=min(4, max(1, len(config["channels"]))),
+            downstream=["select"]
+        )
+        return pipeline
+
+    def run(self) -> StagePipeline:
+        """パイプラインを実行し、結果を保存する"""
+        config = self.config
+        pipeline = self.build()
+
+        report_path = os.path.join(config["output_dir"], config["quality_check"]["report"])
+        start = time.time()
+        with open(report_path, "w", encoding="utf-8") as self._quality_file:
+            pipeline.run("list", config["channels"])
+        elapsed = time.time() - start
+
+        self.fetcher.save_all_results(config["export"]["prefix"])
+        self.fetcher.print_summary()
+
+        print(f"\nPipeline finished in {elapsed:.1f}s")
+        for stage in reversed(list(pipeline.stages.values())):
+            print(f"  {stage.name}: {stage.processed} processed, {stage.failed} failed")
+        return pipeline
+
+
+def main():
+    parser = argparse.ArgumentParser(description="設定ファイルに基づいて文字起こしパイプラインを実行する")
+    parser.add_argument("config", help="パイプライン設定ファイル（.json / .yaml）")
+    args = parser.parse_args()
+
+    TranscriptPipeline(load_config(args.config)).run()
+
+
+if __name__ == "__main__":
+    main()
@@ -4,8 +4,13 @@
 生成された台本が元の台本のスタイルを再現できているか検証する
 """
 
-import re
+import argparse
+import glob
 import json
+import os
+from collections import Counter
+
+from phrase_matcher import PhraseMatcher
 
 # 検証項目
 REQUIRED_PHRASES = [
@@ -43,6 +48,26 @@ STRUCTURE_MARKERS = [
     "エンディング",
 ]
 
+# 台本全体の文字数目標
+CHAR_COUNT_TARGET = (6000, 8000)
+
+# セクションごとの文字数目安（generate_test_script.SYSTEM_PROMPT の【台本構成】と同じ）
+SECTION_BUDGETS = [
+    ("オープニング", 700),
+    ("問題提起", 980),
+    ("宇宙的背景", 980),
+    ("歴史的根拠", 980),
+    ("変化の説明", 980),
+    ("行動指針", 980),
+    ("エンディング", 1400),
+]
+
+# 目安に対して満点とする文字数の比率の範囲
+SECTION_TOLERANCE = (0.7, 1.3)
+
+# この範囲を外れるセクションがあれば不合格（早期に破棄）とする
+SECTION_REJECT_RANGE = (0.4, 2.0)
+
 ENDING_PHRASES = [
     "ノア",
     "愛と祝福",
@@ -50,22 +75,101 @@ ENDING_PHRASES = [
     "光",
 ]
 
+# 語尾パターン（「のです」には「なのです」も含まれる）
+TONE_PATTERNS = {
+    "のです": ["のです。", "のです、"],
+    "なのです": ["なのです。", "なのです、"],
+    "ください": ["ください。", "ください、"],
+}
+SENTENCE_END = "。"
+
+# カテゴリ名（走査結果のキー）
+_TONE_CATEGORY = "語尾"
+
+# 外部ファイル（phrase_miner.py の出力など）で置き換えられるフレーズ一覧
+PHRASE_LIST_NAMES = ("REQUIRED_PHRASES", "SYMPTOM_KEYWORDS", "ENDING_PHRASES", "STRUCTURE_MARKERS")
+
+_matcher_cache = {}
+
+def phrase_lists():
+    """現在のフレーズ一覧を返す"""
+    return {name: list(globals()[name]) for name in PHRASE_LIST_NAMES}
+
+def set_phrase_lists(lists):
+    """フレーズ一覧を置き換える（指定のない一覧はそのまま。プロセスプールの初期化にも使う）"""
+    for name, phrases in lists.items():
+        if name not in PHRASE_LIST_NAMES:
+            raise ValueError(f"unknown phrase list: {name}")
+        globals()[name][:] = phrases
+
+def load_phrase_lists(path):
+    """JSONファイルからフレーズ一覧を読み込んで置き換える（未知のキーは無視する）"""
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    set_phrase_lists({name: data[name] for name in PHRASE_LIST_NAMES if name in data})
+
+# 採点の処理を変えたら上げる（run_batch の前回の結果を使わずに採点し直す）
+SCORER_VERSION = 2
+
+def _scorer_hash(sections=False):
+    """採点結果を左右する入力（フレーズ一覧・目安・語尾パターン・処理の版・オプション）のハッシュ"""
+    import hashlib
+    
+    payload = json.dumps({
+        "version": SCORER_VERSION,
+        "phrase_lists": phrase_lists(),
+        "char_count_target": CHAR_COUNT_TARGET,
+        "section_budgets": SECTION_BUDGETS,
+        "section_tolerance": SECTION_TOLERANCE,
+        "section_reject_range": SECTION_REJECT_RANGE,
+        "tone_patterns": TONE_PATTERNS,
+        "sentence_end": SENTENCE_END,
+        "sections": sections,
+    }, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+def get_matcher():
+    """全カテゴリのフレーズと語尾パターンをまとめたオートマトンを返す（一覧が変わったときだけ再構築）"""
+    categories = {
+        "必須フレーズ": REQUIRED_PHRASES,
+        "症状キーワード": SYMPTOM_KEYWORDS,
+        "エンディングフレーズ": ENDING_PHRASES,
+        "台本構造": STRUCTURE_MARKERS,
+        _TONE_CATEGORY: [p for patterns in TONE_PATTERNS.values() for p in patterns] + [SENTENCE_END],
+    }
+    key = tuple((name, tuple(phrases)) for name, phrases in categories.items())
+    matcher = _matcher_cache.get(key)
+    if matcher is None:
+        _matcher_cache.clear()
+        matcher = _matcher_cache[key] = PhraseMatcher(categories)
+    return matcher
+
+def scan_script(script):
+    """台本を1回走査し、全カテゴリの出現位置を返す"""
+    return get_matcher().scan(script)
+
 def load_script(filepath):
     """台本を読み込む"""
     with open(filepath, "r", encoding="utf-8") as f:
         return f.read()
 
-def check_phrases(script, phrases, category_name):
-    """フレーズの存在を確認する"""
+def check_phrases(script, phrases, category_name, hits=None):
+    """フレーズの存在を確認する（hits: scan_script の該当カテゴリ）"""
+    if hits is None:
+        hits = PhraseMatcher({category_name: phrases}).scan(script)[category_name]
+    
     results = []
     found_count = 0
     for phrase in phrases:
-        found = phrase in script
+        positions = hits.get(phrase, [])
+        found = bool(positions)
         if found:
             found_count += 1
         results.append({
             "phrase": phrase,
-            "found": found
+            "found": found,
+            "count": len(positions),
+            "positions": positions
         })
     
     score = (found_count / len(phrases)) * 100 if phrases else 0
@@ -77,17 +181,22 @@ def check_phrases(script, phrases, category_name):
         "details": results
     }
 
-def check_structure(script):
+def check_structure(script, hits=None):
     """台本構造を確認する"""
+    if hits is None:
+        hits = PhraseMatcher({"台本構造": STRUCTURE_MARKERS}).scan(script)["台本構造"]
+    
     results = []
     found_count = 0
     for marker in STRUCTURE_MARKERS:
-        found = marker in script
+        positions = hits.get(marker, [])
+        found = bool(positions)
         if found:
             found_count += 1
         results.append({
             "marker": marker,
-            "found": found
+            "found": found,
+            "positions": positions
         })
     
     score = (found_count / len(STRUCTURE_MARKERS)) * 100
@@ -99,11 +208,120 @@ def check_structure(script):
         "details": results
     }
 
+def _is_heading(script, pos):
+    """pos を含む行がセクション見出し（【…】・#・■・番号で始まる短い行）かどうか"""
+    line_start = script.rfind("\n", 0, pos) + 1
+    line_end = script.find("\n", pos)
+    if line_end == -1:
+        line_end = len(script)
+    line = script[line_start:line_end].strip()
+    return len(line) <= 40 and (line[:1] in "【[#■●" or line[:1].isdigit())
+
+def find_sections(script, hits=None):
+    """
+    見出し行の位置からセクションの境界を求める
+    
+    Returns:
+        (セクション名, 本文開始位置, 本文終了位置) のリスト（見つかった順）
+    """
+    if hits is None:
+        hits = scan_script(script)["台本構造"]
+    
+    headings = []
+    last = -1
+    for name, _ in SECTION_BUDGETS:
+        for pos in hits.get(name, []):
+            if pos > last and _is_heading(script, pos):
+                headings.append((name, pos))
+                last = pos
+                break
+    
+    sections = []
+    for i, (name, pos) in enumerate(headings):
+        body_start = script.find("\n", pos)
+        body_start = len(script) if body_start == -1 else body_start + 1
+        if i + 1 < len(headings):
+            body_end = script.rfind("\n", 0, headings[i + 1][1]) + 1
+        else:
+            body_end = len(script)
+        sections.append((name, body_start, max(body_start, body_end)))
+    return sections
+
+def _budget_score(char_count, budget):
+    """文字数の目安に対するスコア"""
+    ratio = char_count / budget
+    low, high = SECTION_TOLERANCE
+    if low <= ratio <= high:
+        return 100.0
+    if ratio < low:
+        return ratio / low * 100
+    return high / ratio * 100
+
+def check_sections(script, hits=None):
+    """セクションごとの文字数・語尾・フレーズを確認する（走査結果を位置で振り分けるだけで再走査しない）"""
+    if hits is None:
+        hits = scan_script(script)
+    
+    sections = {name: (start, end) for name, start, end in find_sections(script, hits["台本構造"])}
+    
+    def in_section(positions, start, end):
+        return [p for p in positions if start <= p < end]
+    
+    tone_patterns = [p for patterns in TONE_PATTERNS.values() for p in patterns]
+    phrase_categories = ["必須フレーズ", "症状キーワード", "エンディングフレーズ"]
+    
+    details = []
+    reject_reasons = []
+    for name, budget in SECTION_BUDGETS:
+        if name not in sections:
+            details.append({"section": name, "found": False, "budget": budget, "score": 0})
+            reject_reasons.append(f"{name}: 見出しなし")
+            continue
+        
+        start, end = sections[name]
+        body = script[start:end]
+        char_count = len("".join(body.split()))
+        
+        sentences = len(in_section(hits[_TONE_CATEGORY].get(SENTENCE_END, []), start, end))
+        tone_count = sum(
+            len(in_section(hits[_TONE_CATEGORY].get(p, []), start, end)) for p in tone_patterns
+        )
+        tone_ratio = (tone_count / sentences) * 100 if sentences else 0
+        
+        phrases = sorted({
+            phrase
+            for category in phrase_categories
+            for phrase, positions in hits[category].items()
+            if in_section(positions, start, end)
+        })
+        
+        ratio = char_count / budget
+        if not SECTION_REJECT_RANGE[0] <= ratio <= SECTION_REJECT_RANGE[1]:
+            reject_reasons.append(f"{name}: {char_count}字（目安{budget}字）")
+        
+        details.append({
+            "section": name,
+            "found": True,
+            "budget": budget,
+            "char_count": char_count,
+            "score": _budget_score(char_count, budget),
+            "tone_ratio": f"{tone_ratio:.1f}%",
+            "phrases": phrases,
+        })
+    
+    score = sum(d["score"] for d in details) / len(details)
+    return {
+        "category": "セクション構成",
+        "score": score,
+        "sections": details,
+        "reject": bool(reject_reasons),
+        "reject_reasons": reject_reasons,
+    }
+
 def check_character_count(script):
     """文字数を確認する"""
     char_count = len(script)
-    target_min = 6000
-    target_max = 8000
+    target_min, target_max = CHAR_COUNT_TARGET
     
     if target_min <= char_count <= target_max:
         score = 100
@@ -123,14 +341,21 @@ def check_character_count(script):
         "status": status
     }
 
-def check_tone(script):
+def check_tone(script, hits=None):
     """トーンを確認する（語尾パターン）"""
+    if hits is None:
+        hits = scan_script(script)[_TONE_CATEGORY]
+    
     # 「〜のです」「〜なのです」の出現回数
-    pattern1 = len(re.findall(r'のです[。、]', script))
-    pattern2 = len(re.findall(r'なのです[。、]', script))
-    pattern3 = len(re.findall(r'ください[。、]', script))
+    counts = {
+        name: sum(len(hits.get(p, [])) for p in patterns)
+        for name, patterns in TONE_PATTERNS.items()
+    }
+    pattern1 = counts["のです"]
+    pattern2 = counts["なのです"]
+    pattern3 = counts["ください"]
     
-    total_sentences = len(re.findall(r'[。]', script))
+    total_sentences = len(hits.get(SENTENCE_END, []))
     target_patterns = pattern1 + pattern2 + pattern3
     
     # 目標: 文末の30%以上がこれらのパターン
@@ -147,22 +372,100 @@ def check_tone(script):
         "ratio": f"{ratio:.1f}%"
     }
 
-def run_quality_check(filepath):
+# ストリーミング生成の早期打ち切り条件
+OPENING_PHRASES = ["偶然ではありません", "偶然ではない"]
+OPENING_WINDOW = 1500          # この文字数までにオープニングのフレーズが必要
+MAX_LENGTH_RATIO = 1.25        # 目標上限のこの倍率を超えたら打ち切り
+TONE_MIN_SENTENCES = 30        # 語尾の判定を始める文数
+TONE_MIN_RATIO = 5.0           # 語尾パターン使用率（%）がこれ未満なら打ち切り
+
+class IncrementalQualityChecker:
+    """
+    生成中のテキストを少しずつ受け取り、明らかに合格できない台本を早期に検出する
+    
+    フレーズの走査はオートマトンの状態を引き継いで差分だけ行うため、
+    チャンクごとのコストはチャンク長に比例する。
+    """
+    
+    def __init__(self):
+        self._tone_patterns = {p for patterns in TONE_PATTERNS.values() for p in patterns}
+        self._stream = PhraseMatcher({
+            "opening": OPENING_PHRASES,
+            "tone": list(self._tone_patterns) + [SENTENCE_END],
+        }).stream()
+        self._chunks = []
+        self.char_count = 0
+        self.opening_found = False
+        self.sentences = 0
+        self.tone_count = 0
+        self.abort_reason = None
+    
+    def feed(self, chunk):
+        """チャンクを追加し、打ち切るべきなら理由を返す（続行可能ならNone）"""
+        if self.abort_reason or not chunk:
+            return self.abort_reason
+        self._chunks.append(chunk)
+        self.char_count += len(chunk)
+        
+        for _, phrase in self._stream.feed(chunk):
+            if phrase == SENTENCE_END:
+                self.sentences += 1
+            elif phrase in self._tone_patterns:
+                self.tone_count += 1
+            else:
+                self.opening_found = True
+        
+        self.abort_reason = self._check()
+        return self.abort_reason
+    
+    def _check(self):
+        if not self.opening_found and self.char_count > OPENING_WINDOW:
+            return f"冒頭{OPENING_WINDOW}字以内にオープニングのフレーズがありません"
+        limit = int(CHAR_COUNT_TARGET[1] * MAX_LENGTH_RATIO)
+        if self.char_count > limit:
+            return f"文字数が上限（{limit}字）を超えました"
+        if self.sentences >= TONE_MIN_SENTENCES:
+            ratio = self.tone_count / self.sentences * 100
+            if ratio < TONE_MIN_RATIO:
+                return f"語尾パターン使用率が{ratio:.1f}%しかありません"
+        return None
+    
+    @property
+    def text(self):
+        return "".join(self._chunks)
+    
+    def finish(self, label="<stream>", sections=False):
+        """生成完了後に全項目の検証を行う"""
+        return score_script(self.text, label, sections)
+
+def run_quality_check(filepath, sections=False):
     """品質検証を実行する"""
-    script = load_script(filepath)
+    return score_script(load_script(filepath), filepath, sections)
+
+def score_script(script, label="<text>", sections=False):
+    """
+    台本テキストに対して品質検証を実行する
     
+    sections=True の場合はセクションごとの文字数の検証（check_sections）も総合スコアに含める。
+    見出しのない文字起こしなどでは0点になるため、既定では行わない。
+    """
     results = {
-        "file": filepath,
+        "file": label,
         "checks": []
     }
     
+    # 全カテゴリのフレーズを1回の走査で検出
+    hits = scan_script(script)
+    
     # 各検証を実行
-    results["checks"].append(check_phrases(script, REQUIRED_PHRASES, "必須フレーズ"))
-    results["checks"].append(check_phrases(script, SYMPTOM_KEYWORDS, "症状キーワード"))
-    results["checks"].append(check_phrases(script, ENDING_PHRASES, "エンディングフレーズ"))
-    results["checks"].append(check_structure(script))
+    results["checks"].append(check_phrases(script, REQUIRED_PHRASES, "必須フレーズ", hits["必須フレーズ"]))
+    results["checks"].append(check_phrases(script, SYMPTOM_KEYWORDS, "症状キーワード", hits["症状キーワード"]))
+    results["checks"].append(check_phrases(script, ENDING_PHRASES, "エンディングフレーズ", hits["エンディングフレーズ"]))
+    results["checks"].append(check_structure(script, hits["台本構造"]))
     results["checks"].append(check_character_count(script))
-    results["checks"].append(check_tone(script))
+    results["checks"].append(check_tone(script, hits[_TONE_CATEGORY]))
+    if sections:
+        results["checks"].append(check_sections(script, hits))
     
     # 総合スコア計算
     total_score = sum(check["score"] for check in results["checks"]) / len(results["checks"])
@@ -197,6 +500,16 @@ def print_results(results):
         
         if "ratio" in check:
             print(f"  語尾パターン使用率: {check['ratio']}")
+        
+        if "sections" in check:
+            for d in check["sections"]:
+                if not d["found"]:
+                    print(f"  ✗ {d['section']}: 見出しなし")
+                    continue
+                print(f"  {d['section']}: {d['char_count']}字/{d['budget']}字 "
+                      f"語尾{d['tone_ratio']} フレーズ{len(d['phrases'])}件 ({d['score']:.0f}点)")
+            if check["reject"]:
+                print(f"  ✗ 不合格: {check['reject_reasons']}")
     
     print("\n" + "=" * 60)
     
@@ -213,9 +526,195 @@ def print_results(results):
     else:
         print("✗ 大幅な改善が必要です")
 
+def summarize_results(results, sha256=""):
+    """検証結果をバッチ出力用の1行分の記録に要約する"""
+    missing = []
+    for check in results["checks"]:
+        for d in check.get("details", []):
+            if not d.get("found"):
+                missing.append(d.get("phrase") or d.get("marker"))
+    return {
+        "file": results["file"],
+        "sha256": sha256,
+        "total_score": results["total_score"],
+        "scores": {check["category"]: check["score"] for check in results["checks"]},
+        "missing": missing,
+    }
+
+def _score_file(filepath, previous_hash=None, sections=False):
+    """1ファイルを検証する（内容のハッシュが前回と同じなら None を返す）"""
+    import hashlib
+    
+    with open(filepath, "rb") as f:
+        data = f.read()
+    sha256 = hashlib.sha256(data).hexdigest()
+    if sha256 == previous_hash:
+        return None
+    results = score_script(data.decode("utf-8"), filepath, sections)
+    return summarize_results(results, sha256)
+
+def iter_script_paths(patterns):
+    """ディレクトリ（*.txt を再帰的に検索）・globパターン・ファイルパスから台本ファイルを列挙する"""
+    seen = set()
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            paths = glob.glob(os.path.join(pattern, "**", "*.txt"), recursive=True)
+        else:
+            paths = glob.glob(pattern, recursive=True) or [pattern]
+        for path in sorted(paths):
+            if path not in seen and os.path.isfile(path):
+                seen.add(path)
+                yield path
+
+def aggregate_batch(records, top_missing=20):
+    """バッチ結果の集計（スコア分布と未検出フレーズの頻度）"""
+    import statistics
+    
+    scores = [r["total_score"] for r in records]
+    if not scores:
+        return {"files": 0}
+    
+    histogram = [0] * 10
+    for score in scores:
+        histogram[min(int(score // 10), 9)] += 1
+    
+    categories = {}
+    for r in records:
+        for name, score in r["scores"].items():
+            categories.setdefault(name, []).append(score)
+    
+    missing = Counter(phrase for r in records for phrase in r["missing"])
+    return {
+        "files": len(scores),
+        "mean": statistics.mean(scores),
+        "median": statistics.median(scores),
+        "min": min(scores),
+        "max": max(scores),
+        "histogram": {f"{i * 10}-{i * 10 + 10}": count for i, count in enumerate(histogram)},
+        "category_means": {name: statistics.mean(v) for name, v in categories.items()},
+        "most_missing": missing.most_common(top_missing),
+    }
+
+def run_batch(patterns, output_jsonl, state_path=None, workers=None, sections=False):
+    """
+    複数の台本をプロセスプールで検証し、1ファイル1行のJSONLに書き出す
+    
+    Args:
+        patterns: ディレクトリ・globパターン・ファイルパスのリスト
+        output_jsonl: 結果の出力先（完了順に追記）
+        state_path: 前回の結果（内容ハッシュ付き）の保存先。内容と採点の条件（フレーズ一覧・目安・
+            語尾パターンなど）が変わっていないファイルは再検証しない
+        workers: プロセス数（Noneでコア数）
+        sections: セクションごとの文字数の検証も総合スコアに含めるか
+    
+    Returns:
+        集計結果の辞書
+    """
+    state = {}
+    if state_path and os.path.exists(state_path):
+        with open(state_path, "r", encoding="utf-8") as f:
+            state = json.load(f)
+    
+    # multiprocessing の読み込みは重いため使用時に import する
+    from concurrent.futures import ProcessPoolExecutor, as_completed
+    
+    paths = list(iter_script_paths(patterns))
+    scorer_hash = _scorer_hash(sections)
+    records = []
+    scored = skipped = failed = 0
+    
+    def previous_hash(path):
+        previous = state.get(path, {})
+        return previous.get("sha256") if previous.get("scorer") == scorer_hash else None
+    
+    with open(output_jsonl, "w", encoding="utf-8") as out, \
+            ProcessPoolExecutor(max_workers=workers, initializer=set_phrase_lists,
+                                initargs=(phrase_lists(),)) as executor:
+        futures = {
+            executor.submit(_score_file, path, previous_hash(path), sections): path
+            for path in paths
+        }
+        for future in as_completed(futures):
+            path = futures[future]
+            try:
+                record = future.result()
+            except Exception as e:
+                failed += 1
+                print(f"  ✗ {path}: {e}")
+                continue
+            
+            if record is None:
+                record = dict(state[path], cached=True)
+                skipped += 1
+            else:
+                record["scorer"] = scorer_hash
+                state[path] = record
+                scored += 1
+            records.append(record)
+            out.write(json.dumps(record, ensure_ascii=False) + "\n")
+    
+    if state_path:
+        # 存在しなくなったファイルは状態から除く
+        state = {path: state[path] for path in paths if path in state}
+        with open(state_path, "w", encoding="utf-8") as f:
+            json.dump(state, f, ensure_ascii=False)
+    
+    summary = aggregate_batch(records)
+    summary.update({"scored": scored, "skipped": skipped, "failed": failed})
+    return summary
+
+def print_batch_summary(summary):
+    """バッチ集計結果を表示する"""
+    print("=" * 60)
+    print("台本品質検証 バッチレポート")
+    print("=" * 60)
+    print(f"ファイル数: {summary['files']}（検証 {summary['scored']} / 変更なし {summary['skipped']} / 失敗 {summary['failed']}）")
+    if not summary["files"]:
+        return
+    print(f"平均スコア: {summary['mean']:.1f}  中央値: {summary['median']:.1f}  "
+          f"最小: {summary['min']:.1f}  最大: {summary['max']:.1f}")
+    
+    print("\n【スコア分布】")
+    for label, count in summary["histogram"].items():
+        print(f"  {label:>7}: {count}")
+    
+    print("\n【カテゴリ別平均】")
+    for name, score in summary["category_means"].items():
+        print(f"  {name}: {score:.1f}")
+    
+    print("\n【未検出の多いフレーズ】")
+    for phrase, count in summary["most_missing"]:
+        print(f"  {phrase}: {count}件")
+
 def main():
+    parser = argparse.ArgumentParser(description="生成された台本の品質を検証する")
+    parser.add_argument("paths", nargs="*",
+                        help="台本ファイル・ディレクトリ・globパターン（省略時は test_script.txt のみ）")
+    parser.add_argument("--jsonl", default="quality_results.jsonl", help="バッチ結果の出力先")
+    parser.add_argument("--summary", default="quality_summary.json", help="バッチ集計の出力先")
+    parser.add_argument("--state", default=".quality_state.json",
+                        help="前回の結果の保存先（変更のないファイルは再検証しない）")
+    parser.add_argument("--workers", type=int, default=None, help="プロセス数")
+    parser.add_argument("--phrases", default=None,
+                        help="フレーズ一覧のJSON（phrase_miner.py の出力など）")
+    parser.add_argument("--sections", action="store_true",
+                        help="セクションごとの文字数の検証も総合スコアに含める（見出しのある台本向け）")
+    args = parser.parse_args()
+    
+    if args.phrases:
+        load_phrase_lists(args.phrases)
+    
+    if args.paths:
+        summary = run_batch(args.paths, args.jsonl, state_path=args.state, workers=args.workers,
+                            sections=args.sections)
+        print_batch_summary(summary)
+        with open(args.summary, "w", encoding="utf-8") as f:
+            json.dump(summary, f, ensure_ascii=False, indent=2)
+        print(f"\n集計を保存しました: {args.summary}")
+        return
+    
     filepath = "/home/ubuntu/youtube_analysis/test_script.txt"
-    results = run_quality_check(filepath)
+    results = run_quality_check(filepath, sections=args.sections)
     print_results(results)
     
     # JSON形式でも保存
@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+"""
+文体類似度スコアリングスクリプト
+
+取得済みの文字起こしコーパス（gladia_transcripts/ など）から文字n-gramのTF-IDFモデルを一度だけ構築し、
+新しい台本をコーパス全体およびチャンネルごとの重心ベクトルとのコサイン類似度で評価する。
+
+n-gramは特徴ハッシュで固定次元に写像し、台本は出現した特徴だけの疎ベクトルとしてnumpyで計算するため、
+語彙表は不要で1台本あたりの計算は数百マイクロ秒程度に収まる。
+モデルは IDF とチャンネル重心だけを .npz に保存するコンパクトな形式。
+
+使用方法:
+    python style_similarity.py build gladia_transcripts/ --model style_model.npz
+    python style_similarity.py score test_script.txt generated/*.txt --model style_model.npz
+"""
+
+import argparse
+import importlib.util
+import json
+from typing import Dict, Iterable, List, Sequence
+
+# numpy は初回使用時に import する
+NUMPY_AVAILABLE = importlib.util.find_spec("numpy") is not None
+np = None
+
+# コーパス全体の重心を表すラベル
+CORPUS_LABEL = "__corpus__"
+
+# 文字n-gramのハッシュに使う乗数
+_HASH_MULTIPLIER = 1000003
+
+
+def _require_numpy():
+    global np
+    if not NUMPY_AVAILABLE:
+        raise ImportError("numpy is not installed. Run: pip install numpy")
+    if np is None:
+        import numpy
+        np = numpy
+
+
+class StyleModel:
+    """文字n-gram TF-IDF による文体モデル"""
+
+    def __init__(self, idf, centroids, labels: List[str],
+                 ngram_range=(2, 3), n_features: int = 2 ** 16):
+        """
+        Args:
+            idf: 各特徴のIDF（n_features 次元）
+            centroids: ラベルごとの正規化済み重心ベクトル（ラベル数 × n_features）
+            labels: 重心のラベル（CORPUS_LABEL とチャンネル名）
+            ngram_range: 文字n-gramの長さの範囲
+            n_features: ハッシュ空間の次元数
+        """
+        _require_numpy()
+        self.idf = idf
+        self.centroids = centroids
+        self.labels = list(labels)
+        self.ngram_range = tuple(ngram_range)
+        self.n_features = n_features
+        # 特徴番号で行を引けるよう転置しておく（特徴 × ラベル）
+        self._centroids_t = np.ascontiguousarray(centroids.T)
+
+    # ---- 特徴抽出 ----
+
+    @staticmethod
+    def _hash_ngrams(text: str, ngram_range, n_features: int):
+        """テキストの全文字n-gramをハッシュした特徴番号の配列を返す"""
+        codes = np.frombuffer(text.encode("utf-32-le"), dtype=np.uint32).astype(np.uint64)
+        parts = []
+        low, high = ngram_range
+        for n in range(low, high + 1):
+            if len(codes) < n:
+                break
+            width = len(codes) - n + 1
+            hashes = np.full(width, n, dtype=np.uint64)
+            for k in range(n):
+                hashes = hashes * np.uint64(_HASH_MULTIPLIER) + codes[k:k + width]
+            parts.append(hashes % np.uint64(n_features))
+        if not parts:
+            return np.empty(0, dtype=np.uint64)
+        return np.concatenate(parts)
+
+    @classmethod
+    def _sparse_tf(cls, text: str, ngram_range, n_features: int):
+        """(特徴番号, サブリニアTF = log(1 + tf)) の疎ベクトルを返す"""
+        features, counts = np.unique(cls._hash_ngrams(text, ngram_range, n_features), return_counts=True)
+        return features, np.log1p(counts.astype(np.float32))
+
+    def vectorize(self, text: str):
+        """テキストを正規化済みTF-IDFの疎ベクトル (特徴番号, 重み) に変換する"""
+        _require_numpy()
+        features, tf = self._sparse_tf(text, self.ngram_range, self.n_features)
+        weights = tf * self.idf[features]
+        norm = np.linalg.norm(weights)
+        if norm:
+            weights /= norm
+        return features, weights
+
+    # ---- 構築・保存 ----
+
+    @classmethod
+    def fit(cls, texts: Sequence[str], channels: Sequence[str],
+            ngram_range=(2, 3), n_features: int = 2 ** 16) -> "StyleModel":
+        """
+        コーパスからモデルを構築する
+
+        Args:
+            texts: 文字起こしテキスト
+            channels: 各テキストのチャンネル名（空文字または CORPUS_LABEL はチャンネルなし）
+            ngram_range: 文字n-gramの長さの範囲
+            n_features: ハッシュ空間の次元数
+        """
+        _require_numpy()
+        if not texts:
+            raise ValueError("corpus is empty")
+
+        # 文書ごとの疎TFは1度だけ計算し、文書頻度と重心の両方に使う
+        sparse = [cls._sparse_tf(text, ngram_range, n_features) for text in texts]
+        df = np.zeros(n_features, dtype=np.float32)
+        for features, _ in sparse:
+            df[features] += 1
+        idf = (np.log((1.0 + len(texts)) / (1.0 + df)) + 1.0).astype(np.float32)
+
+        # チャンネルなしの文書はコーパス全体の重心にだけ加える（全体の重心には各文書を1回だけ数える）
+        labels = [CORPUS_LABEL] + sorted(set(channels) - {CORPUS_LABEL, ""})
+        index = {label: i for i, label in enumerate(labels) if label != CORPUS_LABEL}
+        sums = np.zeros((len(labels), n_features), dtype=np.float32)
+        for (features, tf), channel in zip(sparse, channels):
+            weights = tf * idf[features]
+            weights /= np.linalg.norm(weights) or 1.0
+            sums[0, features] += weights
+            if channel in index:
+                sums[index[channel], features] += weights
+
+        norms = np.linalg.norm(sums, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return cls(idf, sums / norms, labels, ngram_range, n_features)
+
+    @classmethod
+    def fit_corpus(cls, paths: Iterable[str], **kwargs) -> "StyleModel":
+        """文字起こしファイル（individual/ や *_combined.txt）からモデルを構築する"""
+        from transcript_corpus import load_corpus
+
+        results = [r for r in load_corpus(paths) if r.full_text]
+        return cls.fit(
+            [r.full_text for r in results],
+            [r.channel_name for r in results],
+            **kwargs
+        )
+
+    def save(self, path: str):
+        """モデルを .npz で保存する"""
+        np.savez_compressed(
+            path,
+            idf=self.idf,
+            centroids=self.centroids,
+            labels=np.array(self.labels),
+            ngram_range=np.array(self.ngram_range),
+            n_features=np.array(self.n_features)
+        )
+
+    @classmethod
+    def load(cls, path: str) -> "StyleModel":
+        """保存したモデルを読み込む"""
+        _require_numpy()
+        data = np.load(path)
+        return cls(
+            data["idf"],
+            data["centroids"],
+            [str(label) for label in data["labels"]],
+            tuple(int(n) for n in data["ngram_range"]),
+            int(data["n_features"])
+        )
+
+    # ---- スコアリング ----
+
+    def similarities(self, text: str):
+        """ラベルごとのコサイン類似度（self.labels の順）を返す"""
+        features, weights = self.vectorize(text)
+        return weights @ self._centroids_t[features]
+
+    def score(self, texts: Iterable[str]) -> List[Dict]:
+        """
+        台本ごとにコーパス・各チャンネルとの類似度を返す
+
+        Returns:
+            {"corpus_similarity", "channel_similarity": {チャンネル: 類似度}, "best_channel"} のリスト
+        """
+        channel_labels = self.labels[1:]
+        scores = []
+        for text in texts:
+            row = self.similarities(text)
+            channel_sims = {label: float(s) for label, s in zip(channel_labels, row[1:])}
+            scores.append({
+                "corpus_similarity": float(row[0]),
+                "channel_similarity": channel_sims,
+                "best_channel": max(channel_sims, key=channel_sims.get) if channel_sims else None,
+            })
+        return scores
+
+
+def main():
+    parser = argparse.ArgumentParser(description="コーパスとの文体類似度で台本を評価する")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    build = sub.add_parser("build", help="文字起こしコーパスからモデルを構築する")
+    build.add_argument("paths", nargs="+", help="individual/ ディレクトリや *_combined.txt")
+    build.add_argument("--model", default="style_model.npz", help="モデルの保存先")
+    build.add_argument("--features", type=int, default=2 ** 16, help="ハッシュ空間の次元数")
+
+    score = sub.add_parser("score", help="台本をスコアリングする")
+    score.add_argument("scripts", nargs="+", help="台本ファイル")
+    score.add_argument("--model", default="style_model.npz", help="モデルのパス")
+
+    args = parser.parse_args()
+
+    if args.command == "build":
+        model = StyleModel.fit_corpus(args.paths, n_features=args.features)
+        model.save(args.model)
+        print(f"Saved model: {args.model} ({len(model.labels) - 1} channels)")
+        return
+
+    model = StyleModel.load(args.model)
+    texts = []
+    for path in args.scripts:
+        with open(path, "r", encoding="utf-8") as f:
+            texts.append(f.read())
+    for path, result in zip(args.scripts, model.score(texts)):
+        print(json.dumps({"file": path, **result}, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
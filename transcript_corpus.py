@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+既存の文字起こしコーパス読み込みスクリプト
+
+`individual/*.txt`（ヘッダー + `====` 区切り）と `*_combined.txt`
+（個別ファイルの連結、または save_all_results の `####` 見出し形式）を
+mmap で読み込み、TranscriptResult に復元する。
+ファイルはプロセスプールで並列に解析するため、数十万ファイル規模のコーパスにも対応する。
+
+使用方法:
+    python transcript_corpus.py gladia_transcripts/
+"""
+
+import argparse
+import mmap
+import os
+import re
+from typing import Iterable, Iterator, List
+
+from youtube_transcript_fetcher import TranscriptResult, YouTubeTranscriptFetcher
+
+# 個別ファイル形式（「タイトル: 」〜「====」）と結合ファイル形式（「# タイトル: 」〜「####」）の両方に一致する見出し
+# 個別ファイルを単純に連結したファイルでは見出しが行頭に来ないため、行頭には固定しない
+_HEADER_RE = re.compile(
+    (
+        r'(?:#{10,}\n)?'
+        r'(?:# )?タイトル: (?P<title>[^\n]*)\n'
+        r'(?:# )?動画ID: (?P<video_id>[^\n]*)\n'
+        r'(?:(?:# )?チャンネル: (?P<channel>[^\n]*)\n)?'
+        r'(?:# )?URL: [^\n]*\n'
+        r'(?:(?:# )?取得日時: (?P<fetched_at>[^\n]*)\n)?'
+        r'(?:={10,}|#{10,})\n\n?'
+    ).encode("utf-8")
+)
+
+# 読み込み対象の拡張子
+_TRANSCRIPT_SUFFIX = ".txt"
+
+
+def _decode(value: bytes) -> str:
+    return value.decode("utf-8", errors="replace").strip() if value else ""
+
+
+def parse_transcript_file(path: str) -> List[TranscriptResult]:
+    """
+    1ファイルを解析し、含まれる全ての文字起こしを返す
+
+    個別ファイルなら1件、結合ファイルなら複数件になる。
+    見出しが見つからないファイルは空リストを返す。
+    """
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return []
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            headers = list(_HEADER_RE.finditer(mm))
+            results = []
+            for i, header in enumerate(headers):
+                end = headers[i + 1].start() if i + 1 < len(headers) else len(mm)
+                results.append(TranscriptResult(
+                    video_id=_decode(header.group("video_id")),
+                    title=_decode(header.group("title")),
+                    channel_name=_decode(header.group("channel")),
+                    status="success",
+                    full_text=_decode(mm[header.end():end]),
+                    fetched_at=_decode(header.group("fetched_at"))
+                ))
+            return results
+
+
+def iter_corpus_files(paths: Iterable[str]) -> Iterator[str]:
+    """ファイル・ディレクトリの指定から文字起こしファイルのパスを列挙する（ディレクトリは再帰的に走査）"""
+    for path in paths:
+        if os.path.isdir(path):
+            for root, dirs, files in os.walk(path):
+                # macOSのリソースフォーク（__MACOSX/._*）は除外
+                dirs[:] = [d for d in dirs if d != "__MACOSX"]
+                for name in files:
+                    if name.endswith(_TRANSCRIPT_SUFFIX) and not name.startswith("._"):
+                        yield os.path.join(root, name)
+        else:
+            yield path
+
+
+def load_corpus(paths: Iterable[str], workers: int = None, chunksize: int = 256) -> List[TranscriptResult]:
+    """
+    コーパスを並列に読み込み、動画IDで重複を除いた結果を返す
+
+    Args:
+        paths: ファイルまたはディレクトリのパス
+        workers: プロセス数（Noneでコア数、1で逐次実行）
+        chunksize: 1プロセスにまとめて渡すファイル数
+
+    Returns:
+        TranscriptResult のリスト（最初に見つかったものを優先）
+    """
+    files = list(iter_corpus_files(paths))
+    if workers == 1 or len(files) <= 1:
+        parsed = map(parse_transcript_file, files)
+        return _dedupe(parsed)
+
+    # multiprocessing の読み込みは重いため使用時に import する
+    from concurrent.futures import ProcessPoolExecutor
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return _dedupe(executor.map(parse_transcript_file, files, chunksize=chunksize))
+
+
+def _dedupe(parsed: Iterable[List[TranscriptResult]]) -> List[TranscriptResult]:
+    seen = set()
+    results = []
+    for file_results in parsed:
+        for result in file_results:
+            if result.video_id in seen:
+                continue
+            seen.add(result.video_id)
+            results.append(result)
+    return results
+
+
+def seed_fetcher(fetcher: YouTubeTranscriptFetcher, paths: Iterable[str], workers: int = None) -> int:
+    """コーパスを読み込んでフェッチャーの取得済み索引に登録する（取り込んだ件数を返す）"""
+    return fetcher.seed_results(load_corpus(paths, workers=workers))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="既存の文字起こしファイルを読み込んでJSON/CSVに再出力する")
+    parser.add_argument("paths", nargs="+", help="individual/ ディレクトリや *_combined.txt")
+    parser.add_argument("--output-dir", default="./transcripts", help="出力ディレクトリ")
+    parser.add_argument("--prefix", default="corpus", help="出力ファイル名の接頭辞")
+    parser.add_argument("--workers", type=int, default=None, help="プロセス数")
+    args = parser.parse_args()
+
+    fetcher = YouTubeTranscriptFetcher(output_dir=args.output_dir)
+    count = seed_fetcher(fetcher, args.paths, workers=args.workers)
+    print(f"Loaded {count} transcripts")
+    fetcher.save_all_results(args.prefix)
+
+
+if __name__ == "__main__":
+    main()
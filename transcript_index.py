@@ -0,0 +1,318 @@
+#!/usr/bin/env python3
+"""
+文字起こしの時刻インデックス
+
+動画ごとに字幕セグメントの開始時刻・終了時刻と、全文中での文字位置を昇順の配列として持ち、
+二分探索で「3:10〜4:00 に話された内容」や「フレーズXが話された時刻」を求める。
+フレーズ検索は全文の文字2-gramの転置インデックス（初回の検索時に構築）で候補位置を絞ってから照合する。
+インデックスは save_all_results() で {prefix}_index.json として結果と一緒に保存される。
+
+使用方法:
+    python transcript_index.py transcripts/transcripts_index.json --range VIDEO_ID 3:10 4:00
+    python transcript_index.py transcripts/transcripts_index.json --find "プレアデス"
+"""
+
+import argparse
+import json
+from array import array
+from bisect import bisect_left, bisect_right
+from dataclasses import dataclass
+from typing import Dict, Iterable, Iterator, List, Optional
+
+INDEX_VERSION = 1
+
+# 全文を作るときのセグメント間の区切り（fetch_transcript の full_text と同じ）
+SEGMENT_JOINER = " "
+
+
+@dataclass
+class PhraseHit:
+    """フレーズの出現箇所"""
+    video_id: str
+    title: str
+    start: float
+    end: float
+    offset: int
+    context: str
+
+
+class SegmentIndex:
+    """1動画分のセグメントの時刻インデックス"""
+
+    def __init__(self, texts: List[str], starts: List[float], ends: List[float]):
+        """
+        Args:
+            texts: セグメントのテキスト（開始時刻順）
+            starts: 開始時刻（秒、昇順）
+            ends: 終了時刻（秒）
+        """
+        self.texts = texts
+        self.starts = starts
+        self.ends = ends
+        # 各セグメントの全文中での開始位置
+        self.offsets = []
+        pos = 0
+        for text in texts:
+            self.offsets.append(pos)
+            pos += len(text) + len(SEGMENT_JOINER)
+        self.text = SEGMENT_JOINER.join(texts)
+        # 範囲検索で「開始は範囲より前だが終了が範囲内」のセグメントを拾うための、先頭からの終了時刻の累積最大
+        self.max_ends = []
+        latest = float("-inf")
+        for e in ends:
+            latest = max(latest, e)
+            self.max_ends.append(latest)
+        # 文字2-gram → 全文中の出現位置（昇順）。find() の初回に構築する
+        self._grams: Optional[Dict[str, array]] = None
+
+    @classmethod
+    def from_segments(cls, segments: Iterable[Dict]) -> "SegmentIndex":
+        """transcript_segments（{"text", "start", "duration"} のリスト）から構築する"""
+        ordered = sorted(segments, key=lambda s: s["start"])
+        return cls(
+            [s["text"] for s in ordered],
+            [float(s["start"]) for s in ordered],
+            [float(s["start"]) + float(s.get("duration", 0.0)) for s in ordered]
+        )
+
+    def __len__(self):
+        return len(self.starts)
+
+    def range_indices(self, start: float, end: float) -> range:
+        """[start, end) と重なるセグメントの候補の添字範囲"""
+        # 終了時刻の累積最大が start を超える最初のセグメントまで lo を戻す（lo より前はすべて start までに終わる）。
+        # 長い字幕があるとその位置まで戻るため、その字幕が終わるまでの検索では候補が広がる
+        # （判定は segments_between で行う）。開始が start 以降の長さ0のセグメントも含める
+        lo = min(bisect_right(self.max_ends, start), bisect_left(self.starts, start))
+        hi = bisect_left(self.starts, end)
+        return range(lo, hi)
+
+    def segments_between(self, start: float, end: float) -> List[Dict]:
+        """[start, end) と重なるセグメントを返す"""
+        return [
+            {"text": self.texts[i], "start": self.starts[i], "duration": self.ends[i] - self.starts[i]}
+            for i in self.range_indices(start, end)
+            if self.ends[i] > start or self.starts[i] >= start
+        ]
+
+    def text_between(self, start: float, end: float) -> str:
+        """[start, end) に話された内容を返す"""
+        return SEGMENT_JOINER.join(s["text"] for s in self.segments_between(start, end))
+
+    def segment_at_offset(self, offset: int) -> int:
+        """全文中の文字位置を含むセグメントの添字"""
+        return max(bisect_right(self.offsets, offset) - 1, 0)
+
+    def gram_index(self) -> Dict[str, array]:
+        """全文の文字2-gramの転置インデックス"""
+        if self._grams is None:
+            grams: Dict[str, array] = {}
+            text = self.text
+            for i in range(len(text) - 1):
+                positions = grams.get(text[i:i + 2])
+                if positions is None:
+                    positions = grams[text[i:i + 2]] = array("i")
+                positions.append(i)
+            self._grams = grams
+        return self._grams
+
+    def find(self, phrase: str) -> Iterator[int]:
+        """全文中のフレーズの出現位置を昇順に返す"""
+        if len(phrase) < 2:
+            pos = self.text.find(phrase) if phrase else -1
+            while pos >= 0:
+                yield pos
+                pos = self.text.find(phrase, pos + 1)
+            return
+        grams = self.gram_index()
+        # 最も出現の少ない2-gramの位置だけを候補にして照合する
+        rarest, shift = None, 0
+        for k in range(len(phrase) - 1):
+            positions = grams.get(phrase[k:k + 2])
+            if positions is None:
+                return
+            if rarest is None or len(positions) < len(rarest):
+                rarest, shift = positions, k
+        for p in rarest:
+            pos = p - shift
+            if pos >= 0 and self.text.startswith(phrase, pos):
+                yield pos
+
+    def to_dict(self) -> Dict:
+        return {"starts": self.starts, "ends": self.ends}
+
+
+class TimeIndex:
+    """コーパス全体の時刻インデックス"""
+
+    def __init__(self):
+        self.videos: Dict[str, SegmentIndex] = {}
+        self.titles: Dict[str, str] = {}
+        self.channels: Dict[str, str] = {}
+
+    @classmethod
+    def from_results(cls, results: Iterable) -> "TimeIndex":
+        """TranscriptResult（またはその辞書）の一覧から構築する（セグメントのない結果は除く）"""
+        index = cls()
+        for data in _iter_indexable(results):
+            index.add(data["video_id"], data["transcript_segments"],
+                      data.get("title", ""), data.get("channel_name", ""))
+        return index
+
+    def add(self, video_id: str, segments: Iterable[Dict], title: str = "", channel_name: str = ""):
+        self.videos[video_id] = SegmentIndex.from_segments(segments)
+        self.titles[video_id] = title
+        self.channels[video_id] = channel_name
+
+    def __len__(self):
+        return len(self.videos)
+
+    def __contains__(self, video_id: str):
+        return video_id in self.videos
+
+    def text_between(self, video_id: str, start: float, end: float) -> str:
+        """動画の [start, end) に話された内容を返す"""
+        return self.videos[video_id].text_between(start, end)
+
+    def segments_between(self, video_id: str, start: float, end: float) -> List[Dict]:
+        """動画の [start, end) と重なるセグメントを返す"""
+        return self.videos[video_id].segments_between(start, end)
+
+    def find_phrase(self, phrase: str, video_ids: Iterable[str] = None,
+                    context: int = 20) -> Iterator[PhraseHit]:
+        """
+        フレーズが話された時刻を探す
+
+        Args:
+            phrase: 検索するフレーズ
+            video_ids: 対象の動画（Noneで全動画）
+            context: 前後に付ける文字数
+        """
+        for video_id in video_ids if video_ids is not None else self.videos:
+            index = self.videos[video_id]
+            for pos in index.find(phrase):
+                first = index.segment_at_offset(pos)
+                last = index.segment_at_offset(pos + len(phrase) - 1)
+                yield PhraseHit(
+                    video_id=video_id,
+                    title=self.titles.get(video_id, ""),
+                    start=index.starts[first],
+                    end=index.ends[last],
+                    offset=pos,
+                    context=index.text[max(pos - context, 0):pos + len(phrase) + context]
+                )
+
+    # ---- 保存・読み込み ----
+
+    def save(self, path: str):
+        """
+        時刻配列だけを保存する（テキストは結果のJSONから読み込む）
+        """
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({
+                "version": INDEX_VERSION,
+                "videos": {vid: index.to_dict() for vid, index in self.videos.items()},
+            }, f, ensure_ascii=False)
+
+    @classmethod
+    def load(cls, path: str, results_path: Optional[str] = None) -> "TimeIndex":
+        """
+        保存したインデックスを読み込む
+
+        Args:
+            path: {prefix}_index.json
+            results_path: 対応する結果のJSON（Noneで {prefix}.json）
+        """
+        if results_path is None:
+            if not path.endswith("_index.json"):
+                raise ValueError(f"cannot infer results path from {path}")
+            results_path = path[:-len("_index.json")] + ".json"
+
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        if data.get("version") != INDEX_VERSION:
+            raise ValueError(f"unsupported index version: {data.get('version')}")
+        with open(results_path, "r", encoding="utf-8") as f:
+            results = {r["video_id"]: r for r in json.load(f)}
+
+        index = cls()
+        for video_id, arrays in data["videos"].items():
+            result = results.get(video_id)
+            if result is None:
+                continue
+            texts = [s["text"] for s in sorted(result["transcript_segments"], key=lambda s: s["start"])]
+            index.videos[video_id] = SegmentIndex(texts, arrays["starts"], arrays["ends"])
+            index.titles[video_id] = result.get("title", "")
+            index.channels[video_id] = result.get("channel_name", "")
+        return index
+
+
+def _iter_indexable(results: Iterable) -> Iterator[Dict]:
+    for r in results:
+        data = r if isinstance(r, dict) else vars(r)
+        if data.get("status") == "success" and data.get("transcript_segments"):
+            yield data
+
+
+def write_index(results: Iterable, path: str):
+    """
+    結果から時刻配列だけを取り出して TimeIndex.save と同じ形式で保存する
+
+    1件ずつ書き出してテキストを保持しないため、ディスクから順に読み戻す大量の結果にも使える。
+    """
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(f'{{"version": {INDEX_VERSION}, "videos": {{')
+        for i, data in enumerate(_iter_indexable(results)):
+            ordered = sorted(data["transcript_segments"], key=lambda s: s["start"])
+            arrays = {
+                "starts": [float(s["start"]) for s in ordered],
+                "ends": [float(s["start"]) + float(s.get("duration", 0.0)) for s in ordered],
+            }
+            f.write(", " if i else "")
+            f.write(f"{json.dumps(data['video_id'])}: {json.dumps(arrays)}")
+        f.write("}}")
+
+
+def parse_timestamp(value: str) -> float:
+    """"3:10" / "1:02:03" / "190.5" を秒に変換する"""
+    seconds = 0.0
+    for part in value.split(":"):
+        seconds = seconds * 60 + float(part)
+    return seconds
+
+
+def format_timestamp(seconds: float) -> str:
+    minutes, sec = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}:{minutes:02d}:{sec:02d}" if hours else f"{minutes}:{sec:02d}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="文字起こしを時刻で検索する")
+    parser.add_argument("index", help="{prefix}_index.json")
+    parser.add_argument("--results", default=None, help="結果のJSON（省略時は {prefix}.json）")
+    parser.add_argument("--range", nargs=3, metavar=("VIDEO_ID", "START", "END"),
+                        help="指定範囲に話された内容を表示する")
+    parser.add_argument("--find", default=None, help="フレーズが話された時刻を表示する")
+    args = parser.parse_args()
+
+    index = TimeIndex.load(args.index, args.results)
+
+    if args.range:
+        video_id, start, end = args.range
+        if video_id not in index:
+            print(f"Not indexed: {video_id}")
+            return
+        for segment in index.segments_between(video_id, parse_timestamp(start), parse_timestamp(end)):
+            print(f"[{format_timestamp(segment['start'])}] {segment['text']}")
+
+    if args.find:
+        hits = 0
+        for hit in index.find_phrase(args.find):
+            hits += 1
+            print(f"{hit.video_id} [{format_timestamp(hit.start)}] {hit.title[:30]}  …{hit.context}…")
+        print(f"\n{hits} hits in {len(index)} videos")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+個別ファイルのシャーディング配置とマニフェスト
+
+individual/ に全動画のファイルを平置きすると、数十万ファイル規模で一覧・バックアップ・
+存在確認が遅くなる。layout="sharded" では動画IDの先頭2文字のサブディレクトリ
+（individual/{動画IDの先頭2文字}/{チャンネル}_{動画ID}.txt）に保存し、
+individual/manifest.jsonl に「動画ID → パス・サイズ・ハッシュ」を1行ずつ追記する。
+取得済みかどうかの確認やパスの検索はマニフェストだけで済み、ディレクトリを走査しない。
+
+マニフェストは追記のみで更新し、同じ動画の古い行が溜まったら読み込み時に書き直す。
+
+使用方法:
+    python youtube_transcript_fetcher.py --ids-file target_video_ids.txt --layout sharded
+    python transcript_manifest.py transcripts stats
+    python transcript_manifest.py transcripts lookup VIDEO_ID
+    python transcript_manifest.py transcripts migrate   # 平置きのファイルをシャードへ移動
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import threading
+from datetime import datetime
+from typing import Dict, Iterator, Optional
+
+MANIFEST_NAME = "manifest.jsonl"
+
+# ファイル名に使えない文字（str.isalnum() と "._-" 以外。\w は isalnum() と "_" に一致する）
+_UNSAFE_RE = re.compile(r"[^\w.-]")
+
+# 個別ファイル名の末尾の動画ID（{チャンネル}_{動画ID}.txt）
+_FILENAME_ID_RE = re.compile(r"([A-Za-z0-9_-]{11})\.txt$")
+
+
+def sanitize_filename(name: str) -> str:
+    """ファイル名に使えない文字を "_" に置換する"""
+    return _UNSAFE_RE.sub("_", name)
+
+
+def individual_filename(channel_name: str, video_id: str) -> str:
+    return sanitize_filename(f"{channel_name}_{video_id}.txt")
+
+
+def shard_dir(video_id: str) -> str:
+    """動画IDのシャード（先頭2文字、TranscriptStore と同じ分け方）"""
+    return video_id[:2]
+
+
+class TranscriptManifest:
+    """個別ファイルの 動画ID → {path, size, sha256, written_at} を保持する追記型マニフェスト"""
+
+    def __init__(self, directory: str):
+        """
+        Args:
+            directory: individual/ ディレクトリ（パスはここからの相対パスで記録する）
+        """
+        self.directory = directory
+        self.path = os.path.join(directory, MANIFEST_NAME)
+        self.entries: Dict[str, Dict] = {}
+        lines = 0
+        if os.path.exists(self.path):
+            with open(self.path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        # 書き込み途中で止まった最終行
+                        continue
+                    self.entries[entry["video_id"]] = entry
+                    lines += 1
+        self._lock = threading.Lock()
+        self._file = None
+        if lines > 2 * len(self.entries) + 1000:
+            self.compact()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, video_id: str):
+        return video_id in self.entries
+
+    def __iter__(self) -> Iterator[Dict]:
+        return iter(list(self.entries.values()))
+
+    def get(self, video_id: str) -> Optional[Dict]:
+        return self.entries.get(video_id)
+
+    def locate(self, video_id: str) -> Optional[str]:
+        """動画の個別ファイルのパス（記録がなければNone）"""
+        entry = self.entries.get(video_id)
+        return os.path.join(self.directory, entry["path"]) if entry else None
+
+    def record(self, video_id: str, filepath: str, data: bytes):
+        """書き込んだファイルを記録する（1行追記）"""
+        entry = {
+            "video_id": video_id,
+            "path": os.path.relpath(filepath, self.directory),
+            "size": len(data),
+            "sha256": hashlib.sha256(data).hexdigest(),
+            "written_at": datetime.now().isoformat(),
+        }
+        line = json.dumps(entry, ensure_ascii=False) + "\n"
+        with self._lock:
+            if self._file is None:
+                self._file = open(self.path, "a", encoding="utf-8")
+            self._file.write(line)
+            self._file.flush()
+            self.entries[video_id] = entry
+
+    def compact(self):
+        """動画ごとに最新の1行だけを残して書き直す"""
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                for entry in self.entries.values():
+                    f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            os.replace(tmp_path, self.path)
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+def iter_individual_files(directory: str) -> Iterator[str]:
+    """individual/ 以下（平置き・シャードの両方）の個別ファイルを列挙する"""
+    for root, dirs, files in os.walk(directory):
+        for name in files:
+            if _FILENAME_ID_RE.search(name):
+                yield os.path.join(root, name)
+
+
+def rebuild_manifest(directory: str, migrate: bool = False) -> TranscriptManifest:
+    """
+    既存の個別ファイルからマニフェストを作り直す
+
+    Args:
+        directory: individual/ ディレクトリ
+        migrate: 平置きのファイルを動画IDのシャードへ移動する
+    """
+    if os.path.exists(os.path.join(directory, MANIFEST_NAME)):
+        os.remove(os.path.join(directory, MANIFEST_NAME))
+    manifest = TranscriptManifest(directory)
+    for filepath in iter_individual_files(directory):
+        video_id = _FILENAME_ID_RE.search(os.path.basename(filepath)).group(1)
+        if migrate and os.path.dirname(filepath) == directory.rstrip(os.sep):
+            target_dir = os.path.join(directory, shard_dir(video_id))
+            os.makedirs(target_dir, exist_ok=True)
+            target = os.path.join(target_dir, os.path.basename(filepath))
+            os.replace(filepath, target)
+            filepath = target
+        with open(filepath, "rb") as f:
+            manifest.record(video_id, filepath, f.read())
+    manifest.compact()
+    return manifest
+
+
+def main():
+    parser = argparse.ArgumentParser(description="個別ファイルのマニフェストを表示・再構築する")
+    parser.add_argument("output_dir", help="出力ディレクトリ（individual/ を含む）")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("stats", help="記録されたファイル数と合計サイズを表示する")
+    lookup = sub.add_parser("lookup", help="動画の個別ファイルのパスを表示する")
+    lookup.add_argument("video_id")
+    sub.add_parser("rebuild", help="既存のファイルからマニフェストを作り直す")
+    sub.add_parser("migrate", help="平置きのファイルをシャードへ移動してマニフェストを作り直す")
+    args = parser.parse_args()
+
+    directory = os.path.join(args.output_dir, "individual")
+    if args.command in ("rebuild", "migrate"):
+        manifest = rebuild_manifest(directory, migrate=args.command == "migrate")
+        print(f"Indexed {len(manifest)} files ({manifest.path})")
+        return
+
+    manifest = TranscriptManifest(directory)
+    if args.command == "stats":
+        size = sum(entry["size"] for entry in manifest)
+        shards = len({os.path.dirname(entry["path"]) for entry in manifest})
+        print(f"Files: {len(manifest)}  Size: {size / 1024 / 1024:.1f} MB  Directories: {shards}")
+    else:
+        path = manifest.locate(args.video_id)
+        print(path if path else f"Not found: {args.video_id}")
+
+
+if __name__ == "__main__":
+    main()
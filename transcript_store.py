@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+"""
+文字起こしの差分保存ストア
+
+動画ごとに最新の字幕セグメントと内容ハッシュを保存し、再取得時はハッシュを比較する。
+
+- 変化なし: 索引（index.json）の確認日時を更新するだけで、動画ファイルは書き換えない
+- 変化あり: 最新のセグメントで上書きし、1つ前の版へ戻すためのセグメント単位の差分（difflib）を履歴に追加する
+
+自動字幕の改善や字幕の編集に追従するための定期的な再取得でも、ディスク使用量と書き込みは
+変化した動画の差分の分だけで済む。
+
+使用方法:
+    python youtube_transcript_fetcher.py --ids-file target_video_ids.txt --store transcript_store
+    python transcript_store.py transcript_store stats
+    python transcript_store.py transcript_store history VIDEO_ID
+    python transcript_store.py transcript_store show VIDEO_ID --version 1
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import threading
+from datetime import datetime
+from difflib import SequenceMatcher
+from typing import Dict, List, Optional
+
+# 保存するセグメントのキー（ハッシュと差分の対象）
+SEGMENT_KEYS = ("text", "start", "duration")
+
+
+def _normalize(segments: List[Dict]) -> List[Dict]:
+    return [{key: segment.get(key) for key in SEGMENT_KEYS} for segment in segments]
+
+
+def content_hash(segments: List[Dict]) -> str:
+    """セグメントの内容ハッシュ（テキストとタイミングが同じなら同じ値）"""
+    payload = json.dumps(_normalize(segments), ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def segment_delta(old: List[Dict], new: List[Dict]) -> List[list]:
+    """
+    new から old を復元するための差分
+
+    Returns:
+        [new の開始位置, new の終了位置, 置き換える old のセグメント] のリスト
+    """
+    key = lambda s: (s["text"], s["start"], s["duration"])
+    matcher = SequenceMatcher(None, [key(s) for s in old], [key(s) for s in new], autojunk=False)
+    return [
+        [j1, j2, old[i1:i2]]
+        for tag, i1, i2, j1, j2 in matcher.get_opcodes()
+        if tag != "equal"
+    ]
+
+
+def apply_delta(segments: List[Dict], delta: List[list]) -> List[Dict]:
+    """segment_delta の差分を適用して1つ前の版を復元する"""
+    restored = list(segments)
+    # 後ろから置き換えれば前方の位置はずれない
+    for j1, j2, old in reversed(delta):
+        restored[j1:j2] = old
+    return restored
+
+
+def _write_json(path: str, data, indent=None):
+    tmp_path = f"{path}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=indent)
+    os.replace(tmp_path, path)
+
+
+class TranscriptStore:
+    """内容ハッシュで変化を検出し、変化した動画だけを差分付きで保存するストア"""
+
+    def __init__(self, root: str):
+        """
+        Args:
+            root: 保存先ディレクトリ（index.json と {動画IDの先頭2文字}/{動画ID}.json）
+        """
+        self.root = root
+        self.index_path = os.path.join(root, "index.json")
+        os.makedirs(root, exist_ok=True)
+        # 動画ID → {content_hash, fetched_at, checked_at, versions}
+        self.index: Dict[str, Dict] = {}
+        if os.path.exists(self.index_path):
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                self.index = json.load(f)
+        self._dirty = False
+        self._lock = threading.Lock()
+        self.counts = {"new": 0, "unchanged": 0, "changed": 0}
+
+    def _path(self, video_id: str) -> str:
+        return os.path.join(self.root, video_id[:2], f"{video_id}.json")
+
+    def __contains__(self, video_id: str):
+        return video_id in self.index
+
+    def __len__(self):
+        return len(self.index)
+
+    def put(self, result) -> str:
+        """
+        取得結果を保存する
+
+        Args:
+            result: 成功した TranscriptResult
+
+        Returns:
+            "new" / "unchanged" / "changed"
+        """
+        segments = _normalize(result.transcript_segments)
+        digest = content_hash(segments)
+        now = result.fetched_at or datetime.now().isoformat()
+
+        with self._lock:
+            entry = self.index.get(result.video_id)
+            if entry is not None and entry["content_hash"] == digest:
+                entry["checked_at"] = now
+                self._dirty = True
+                self.counts["unchanged"] += 1
+                return "unchanged"
+
+            path = self._path(result.video_id)
+            history = []
+            status = "new"
+            if entry is not None:
+                with open(path, "r", encoding="utf-8") as f:
+                    record = json.load(f)
+                history = record["history"] + [{
+                    "content_hash": record["content_hash"],
+                    "fetched_at": record["fetched_at"],
+                    "delta": segment_delta(record["segments"], segments),
+                }]
+                status = "changed"
+
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            _write_json(path, {
+                "video_id": result.video_id,
+                "title": result.title,
+                "channel_name": result.channel_name,
+                "content_hash": digest,
+                "fetched_at": now,
+                "segments": segments,
+                "history": history,
+            })
+            self.index[result.video_id] = {
+                "content_hash": digest,
+                "fetched_at": now,
+                "checked_at": now,
+                "versions": len(history) + 1,
+            }
+            self._dirty = True
+            self.counts[status] += 1
+            return status
+
+    def flush(self):
+        """索引を書き出す（変化のない動画の確認日時はここでまとめて保存される）"""
+        with self._lock:
+            if self._dirty:
+                _write_json(self.index_path, self.index)
+                self._dirty = False
+
+    def load(self, video_id: str) -> Dict:
+        with open(self._path(video_id), "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def get(self, video_id: str, version: Optional[int] = None) -> List[Dict]:
+        """
+        セグメントを返す
+
+        Args:
+            video_id: 動画ID
+            version: 版番号（1が最初の取得、Noneで最新）
+        """
+        record = self.load(video_id)
+        latest = len(record["history"]) + 1
+        version = latest if version is None else version
+        if not 1 <= version <= latest:
+            raise ValueError(f"{video_id} has versions 1-{latest}")
+
+        segments = record["segments"]
+        for change in reversed(record["history"][version - 1:]):
+            segments = apply_delta(segments, change["delta"])
+        return segments
+
+    def history(self, video_id: str) -> List[Dict]:
+        """版ごとの {version, content_hash, fetched_at, changed_segments}"""
+        record = self.load(video_id)
+        versions = [
+            {
+                "version": i + 1,
+                "content_hash": change["content_hash"],
+                "fetched_at": change["fetched_at"],
+                "changed_segments": sum(len(old) for _, _, old in change["delta"]),
+            }
+            for i, change in enumerate(record["history"])
+        ]
+        versions.append({
+            "version": len(versions) + 1,
+            "content_hash": record["content_hash"],
+            "fetched_at": record["fetched_at"],
+            "changed_segments": 0,
+        })
+        return versions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="差分保存ストアの内容を表示する")
+    parser.add_argument("root", help="ストアのディレクトリ")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("stats", help="保存件数と版数を表示する")
+    history = sub.add_parser("history", help="動画の版の履歴を表示する")
+    history.add_argument("video_id")
+    show = sub.add_parser("show", help="指定した版の文字起こしを表示する")
+    show.add_argument("video_id")
+    show.add_argument("--version", type=int, default=None, help="版番号（省略時は最新）")
+    args = parser.parse_args()
+
+    store = TranscriptStore(args.root)
+
+    if args.command == "stats":
+        versions = sum(entry["versions"] for entry in store.index.values())
+        changed = sum(1 for entry in store.index.values() if entry["versions"] > 1)
+        print(f"Videos: {len(store)}  Versions: {versions}  Changed at least once: {changed}")
+    elif args.command == "history":
+        for version in store.history(args.video_id):
+            print(f"v{version['version']}  {version['fetched_at']}  {version['content_hash'][:12]}"
+                  f"  {version['changed_segments']} segments replaced")
+    else:
+        print(" ".join(segment["text"] for segment in store.get(args.video_id, args.version)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+"""
+字幕トラックの一覧キャッシュと複数トラックの取得結果
+
+fetch_transcript は指定言語から1トラックだけを選ぶため、日英の対訳分析のように複数言語が
+必要な場合は言語ごとに字幕リストの取得からやり直すことになる。
+YouTubeTranscriptFetcher.fetch_tracks は1回の一覧取得から指定言語の手動字幕・自動生成字幕を
+すべて選び、並列に取得して MultiTrackResult にまとめる。
+
+- TrackListCache: 動画ごとのトラック一覧（言語・手動/自動生成）を TTL 付きで保持する。
+  一覧そのもの（字幕の取得に使うオブジェクト）はプロセス内だけ、メタデータは
+  output_dir/.track_cache.json に保存して次回の実行でも使う
+- select_tracks: トラック一覧から取得対象を言語の優先順に選ぶ
+
+使用方法:
+    python youtube_transcript_fetcher.py --ids-file target_video_ids.txt --languages ja,en --all-tracks
+"""
+
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+
+
+@dataclass
+class TrackInfo:
+    """字幕トラックのメタデータ"""
+    language_code: str
+    language: str = ""
+    is_generated: bool = False
+    is_translatable: bool = False
+
+    @property
+    def key(self) -> str:
+        """トラックの識別子（"ja" / 自動生成は "ja:auto"）"""
+        return f"{self.language_code}:auto" if self.is_generated else self.language_code
+
+
+def track_info(track) -> TrackInfo:
+    """youtube-transcript-api の Transcript からメタデータを取り出す"""
+    return TrackInfo(
+        language_code=track.language_code,
+        language=getattr(track, "language", "") or "",
+        is_generated=bool(getattr(track, "is_generated", False)),
+        is_translatable=bool(getattr(track, "is_translatable", False))
+    )
+
+
+def select_tracks(tracks: Iterable, languages: List[str], include_generated: bool = True) -> List:
+    """
+    取得するトラックを選ぶ
+
+    言語の優先順に、各言語の手動字幕・自動生成字幕の順で並べる。
+    TrackInfo と youtube-transcript-api の Transcript のどちらの一覧にも使える。
+    """
+    tracks = list(tracks)
+    selected = []
+    for lang in languages:
+        for generated in (False, True) if include_generated else (False,):
+            selected.extend(
+                t for t in tracks
+                if t.language_code == lang and bool(t.is_generated) == generated
+            )
+    return selected
+
+
+@dataclass
+class TrackTranscript:
+    """1トラック分の文字起こし"""
+    language_code: str
+    language: str
+    is_generated: bool
+    status: str  # success, error
+    full_text: str = ""
+    transcript_segments: List[Dict] = None
+    error_message: str = ""
+
+    def __post_init__(self):
+        if self.transcript_segments is None:
+            self.transcript_segments = []
+
+    @property
+    def key(self) -> str:
+        return f"{self.language_code}:auto" if self.is_generated else self.language_code
+
+
+@dataclass
+class MultiTrackResult:
+    """複数トラックの文字起こし結果を格納するデータクラス"""
+    video_id: str
+    title: str
+    channel_name: str
+    status: str  # success（1トラック以上取得）, error, no_transcript, disabled
+    tracks: List[TrackTranscript] = field(default_factory=list)
+    available: List[Dict] = field(default_factory=list)  # 動画にあるトラックのメタデータ
+    error_message: str = ""
+    fetched_at: str = ""
+
+    def __post_init__(self):
+        if not self.fetched_at:
+            self.fetched_at = datetime.now().isoformat()
+
+    def track(self, language_code: str, generated: Optional[bool] = None) -> Optional[TrackTranscript]:
+        """
+        取得に成功したトラックを返す
+
+        Args:
+            language_code: 言語コード
+            generated: True/False で自動生成・手動を限定（Noneなら手動を優先）
+        """
+        for want in ((False, True) if generated is None else (generated,)):
+            for t in self.tracks:
+                if t.status == "success" and t.language_code == language_code and t.is_generated == want:
+                    return t
+        return None
+
+    def primary(self, languages: List[str]) -> Optional[TrackTranscript]:
+        """言語の優先順で最初に取得できたトラック（手動字幕を優先）"""
+        for lang in languages:
+            t = self.track(lang)
+            if t is not None:
+                return t
+        return None
+
+
+class TrackListCache:
+    """
+    動画ごとの字幕トラック一覧のキャッシュ（TTL付き）
+
+    一覧オブジェクトは字幕の取得に使うためプロセス内にだけ保持し（件数の上限付き）、
+    メタデータは path に保存して次回の実行でも「指定言語のトラックがない」動画の一覧取得を省く。
+    """
+
+    def __init__(self, ttl: float = 6 * 3600, path: Optional[str] = None, max_listings: int = 1024):
+        """
+        Args:
+            ttl: キャッシュの有効期間（秒）
+            path: メタデータの保存先（Noneで保存しない）
+            max_listings: プロセス内に保持する一覧オブジェクトの上限
+        """
+        self.ttl = ttl
+        self.path = path
+        self.max_listings = max_listings
+        # 動画ID → (一覧取得時刻, 一覧オブジェクト)
+        self._listings: "OrderedDict[str, tuple]" = OrderedDict()
+        # 動画ID → {listed_at, status, tracks}
+        self._metadata: Dict[str, Dict] = {}
+        if path and os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                self._metadata = json.load(f)
+        self._dirty = False
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._metadata)
+
+    def _fresh(self, listed_at: float) -> bool:
+        return time.time() - listed_at < self.ttl
+
+    def get_listing(self, video_id: str):
+        """有効期間内の一覧オブジェクトを返す（なければNone）"""
+        with self._lock:
+            entry = self._listings.get(video_id)
+            if entry is not None and self._fresh(entry[0]):
+                self._listings.move_to_end(video_id)
+                self.hits += 1
+                return entry[1]
+            self._listings.pop(video_id, None)
+            self.misses += 1
+            return None
+
+    def lookup(self, video_id: str) -> Optional[Dict]:
+        """
+        有効期間内のメタデータを返す（なければNone）
+
+        Returns:
+            {"listed_at", "status", "tracks": [TrackInfo]}。status は一覧を取得できた場合 "listed"、
+            字幕が無効・存在しない場合は fetch_transcript と同じステータス
+        """
+        with self._lock:
+            entry = self._metadata.get(video_id)
+        if entry is None or not self._fresh(entry["listed_at"]):
+            return None
+        return dict(entry, tracks=[TrackInfo(**t) for t in entry["tracks"]])
+
+    def put(self, video_id: str, listing) -> List[TrackInfo]:
+        """一覧オブジェクトを登録し、そのメタデータを返す"""
+        tracks = [track_info(t) for t in listing]
+        now = time.time()
+        with self._lock:
+            self._listings[video_id] = (now, listing)
+            self._listings.move_to_end(video_id)
+            while len(self._listings) > self.max_listings:
+                self._listings.popitem(last=False)
+            self._metadata[video_id] = {
+                "listed_at": now,
+                "status": "listed",
+                "tracks": [vars(t) for t in tracks],
+            }
+            self._dirty = True
+        return tracks
+
+    def put_unavailable(self, video_id: str, status: str):
+        """字幕が無効・存在しない動画を記録する（有効期間内は一覧を取得しない）"""
+        with self._lock:
+            self._metadata[video_id] = {"listed_at": time.time(), "status": status, "tracks": []}
+            self._dirty = True
+
+    def flush(self):
+        """期限切れのエントリを除いてメタデータを保存する"""
+        if not self.path:
+            return
+        with self._lock:
+            if not self._dirty:
+                return
+            self._metadata = {
+                vid: entry for vid, entry in self._metadata.items() if self._fresh(entry["listed_at"])
+            }
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self._metadata, f, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+            self._dirty = False
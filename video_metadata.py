@@ -0,0 +1,348 @@
+#!/usr/bin/env python3
+"""
+動画メタデータ（再生回数・長さ・投稿日）の一括更新
+
+--flat-playlist の一覧は再生回数が欠けていたり古かったりし、長さが0のことも多い。
+MetadataRefresher は動画ごとのメタデータを並列に取得して VideoInfo を更新し、
+結果を TTL 付きのキャッシュ（既定で output_dir/.metadata_cache.json）に保存する。
+有効期間内の動画はリクエストせずキャッシュの値を使う。取得できなかった動画も failure_ttl の間は
+リクエストしない（削除・非公開の動画を毎回取得し直さない）。
+
+チャンネル一覧から上位 N 本を選ぶ場合は、全動画ではなく select_candidates で選んだ候補
+（一覧の再生回数の上位 candidate_factor × N 本と、再生回数のない動画）だけを更新する。
+
+メタデータの取得方法は extractor として差し替えられる:
+- YtDlpExtractor: yt_dlp ライブラリで1本ずつ抽出する（スレッドごとにインスタンスを使い回す）
+- SubprocessExtractor: yt-dlp コマンド1回でバッチ内の動画をまとめて抽出する
+- DictExtractor: 辞書や yt-dlp のダンプから返す（オフライン・テスト用）
+
+使用方法:
+    python video_metadata.py target_video_ids.txt --workers 8 --ttl 86400
+    python youtube_transcript_fetcher.py --refresh-metadata
+"""
+
+import argparse
+import importlib.util
+import json
+import os
+import subprocess
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional
+
+YT_DLP_AVAILABLE = importlib.util.find_spec("yt_dlp") is not None
+
+# キャッシュに保存するメタデータのキー（yt-dlp の info の一部）
+METADATA_KEYS = ("title", "view_count", "duration", "upload_date", "timestamp")
+
+
+def _pick(info: Dict) -> Dict:
+    return {key: info.get(key) for key in METADATA_KEYS if info.get(key) is not None}
+
+
+class YtDlpExtractor:
+    """yt_dlp ライブラリで動画ごとにメタデータを抽出する"""
+
+    def __init__(self, proxy: Optional[str] = None):
+        if not YT_DLP_AVAILABLE:
+            raise ImportError("yt-dlp is not installed. Run: pip install yt-dlp")
+        self.proxy = proxy
+        self._local = threading.local()
+
+    def _get_ydl(self):
+        ydl = getattr(self._local, "ydl", None)
+        if ydl is None:
+            options = {"skip_download": True, "quiet": True, "no_warnings": True}
+            if self.proxy:
+                options["proxy"] = self.proxy
+            import yt_dlp
+            ydl = self._local.ydl = yt_dlp.YoutubeDL(options)
+        return ydl
+
+    def extract_batch(self, video_ids: List[str]) -> Dict[str, Dict]:
+        """動画ID → メタデータ（取得できなかった動画は含めない）"""
+        ydl = self._get_ydl()
+        results = {}
+        for video_id in video_ids:
+            try:
+                info = ydl.extract_info(f"https://www.youtube.com/watch?v={video_id}",
+                                        download=False, process=False)
+            except Exception as e:
+                print(f"  ✗ metadata {video_id}: {str(e)[:100]}")
+                continue
+            results[video_id] = _pick(info)
+        return results
+
+
+class SubprocessExtractor:
+    """yt-dlp コマンド1回でバッチ内の動画のメタデータをまとめて抽出する"""
+
+    def __init__(self, proxy: Optional[str] = None, timeout: float = 300):
+        self.proxy = proxy
+        self.timeout = timeout
+
+    def extract_batch(self, video_ids: List[str]) -> Dict[str, Dict]:
+        cmd = ["yt-dlp", "-j", "--skip-download", "--ignore-errors", "--no-warnings"]
+        if self.proxy:
+            cmd += ["--proxy", self.proxy]
+        cmd += [f"https://www.youtube.com/watch?v={video_id}" for video_id in video_ids]
+        result = subprocess.run(cmd, capture_output=True, text=True, timeout=self.timeout)
+
+        results = {}
+        for line in result.stdout.splitlines():
+            try:
+                info = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if info.get("id") in video_ids:
+                results[info["id"]] = _pick(info)
+        return results
+
+
+class DictExtractor:
+    """辞書（動画ID → yt-dlp 形式のメタデータ）から返す抽出器（オフライン・テスト用）"""
+
+    def __init__(self, records: Dict[str, Dict], latency: float = 0.0):
+        """
+        Args:
+            records: 動画ID → メタデータ
+            latency: バッチごとに待つ秒数（並列動作の確認用）
+        """
+        self.records = records
+        self.latency = latency
+        self.requested: List[str] = []
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_dump(cls, paths: Iterable[str]) -> "DictExtractor":
+        """yt-dlp -j の出力（parse_videos.py と同じ形式、.gz可）から作る"""
+        from parse_videos import iter_dump_records
+
+        return cls({data["id"]: _pick(data) for _, data in iter_dump_records(paths) if data.get("id")})
+
+    def extract_batch(self, video_ids: List[str]) -> Dict[str, Dict]:
+        with self._lock:
+            self.requested.extend(video_ids)
+        if self.latency:
+            time.sleep(self.latency)
+        return {vid: _pick(self.records[vid]) for vid in video_ids if vid in self.records}
+
+
+class MetadataCache:
+    """動画メタデータのキャッシュ（TTL付き、JSONファイルに保存）"""
+
+    def __init__(self, path: Optional[str] = None, ttl: float = 24 * 3600, failure_ttl: float = 6 * 3600):
+        """
+        Args:
+            path: 保存先（Noneで保存しない）
+            ttl: 有効期間（秒）
+            failure_ttl: 取得できなかった動画を再び取得するまでの秒数
+        """
+        self.path = path
+        self.ttl = ttl
+        self.failure_ttl = failure_ttl
+        # 動画ID → {"refreshed_at": UNIX時刻, "metadata": {...}}（取得できなかった動画は "failed": true）
+        self.entries: Dict[str, Dict] = {}
+        if path and os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                self.entries = json.load(f)
+        self._dirty = False
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def _fresh(self, entry: Dict, now: float) -> bool:
+        ttl = self.failure_ttl if entry.get("failed") else self.ttl
+        return now - entry["refreshed_at"] < ttl
+
+    def get(self, video_id: str) -> Optional[Dict]:
+        """有効期間内のメタデータを返す（なければNone。取得できなかった動画は空の辞書）"""
+        entry = self.entries.get(video_id)
+        if entry is None or not self._fresh(entry, time.time()):
+            return None
+        return entry["metadata"]
+
+    def put(self, video_id: str, metadata: Dict):
+        with self._lock:
+            self.entries[video_id] = {"refreshed_at": time.time(), "metadata": metadata}
+            self._dirty = True
+
+    def put_failed(self, video_id: str):
+        """取得できなかった動画を記録する（failure_ttl の間は取得しない）"""
+        with self._lock:
+            self.entries[video_id] = {"refreshed_at": time.time(), "metadata": {}, "failed": True}
+            self._dirty = True
+
+    def flush(self):
+        """期限切れのエントリを除いて保存する"""
+        if not self.path:
+            return
+        with self._lock:
+            if not self._dirty:
+                return
+            now = time.time()
+            self.entries = {vid: entry for vid, entry in self.entries.items() if self._fresh(entry, now)}
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self.entries, f, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+            self._dirty = False
+
+
+@dataclass
+class RefreshReport:
+    """メタデータ更新の結果を格納するデータクラス"""
+    cached: int = 0
+    refreshed: int = 0
+    failed: int = 0
+    skipped: int = 0  # 前回取得できず failure_ttl 内のためリクエストしなかった動画
+    elapsed: float = 0.0
+
+
+def apply_metadata(video, metadata: Dict):
+    """メタデータで VideoInfo を更新する（値のない項目は元の値を残す）"""
+    from youtube_transcript_fetcher import _entry_upload_date
+
+    if metadata.get("view_count") is not None:
+        video.view_count = int(metadata["view_count"])
+    if metadata.get("duration"):
+        video.duration = int(metadata["duration"])
+    upload_date = _entry_upload_date(metadata)
+    if upload_date:
+        video.upload_date = upload_date
+    if not video.title and metadata.get("title"):
+        video.title = metadata["title"]
+
+
+def select_candidates(videos: List, limit: int) -> List:
+    """
+    上位 N 本を選ぶ前にメタデータを更新する候補を選ぶ
+
+    一覧の再生回数の上位 limit 本と、一覧に再生回数がない動画（順位を判断できない）を返す。
+    """
+    missing = [v for v in videos if not v.view_count]
+    counted = sorted((v for v in videos if v.view_count), key=lambda v: v.view_count, reverse=True)
+    return counted[:limit] + missing
+
+
+class MetadataRefresher:
+    """VideoInfo のメタデータをキャッシュ付きで並列に更新するクラス"""
+
+    def __init__(self, extractor=None, cache: MetadataCache = None,
+                 max_workers: int = 4, batch_size: int = 10, candidate_factor: int = 3):
+        """
+        Args:
+            extractor: extract_batch(動画IDのリスト) → {動画ID: メタデータ} を持つ抽出器
+                （Noneで yt_dlp ライブラリ、なければ yt-dlp コマンド）
+            cache: メタデータのキャッシュ（Noneで保存しないキャッシュ）
+            max_workers: 並列に抽出するワーカー数
+            batch_size: 1回の抽出にまとめる動画数
+            candidate_factor: 上位 N 本を選ぶ場合に更新する候補の倍率（refresh_top を参照）
+        """
+        if extractor is None:
+            extractor = YtDlpExtractor() if YT_DLP_AVAILABLE else SubprocessExtractor()
+        self.extractor = extractor
+        self.cache = cache if cache is not None else MetadataCache()
+        self.max_workers = max_workers
+        self.batch_size = batch_size
+        self.candidate_factor = candidate_factor
+
+    def refresh(self, videos: Iterable, force: bool = False) -> RefreshReport:
+        """
+        動画のメタデータを更新する（VideoInfo をその場で書き換える）
+
+        Args:
+            videos: VideoInfo のリスト
+            force: キャッシュの有効期間内でも取得し直すか
+        """
+        start = time.monotonic()
+        report = RefreshReport()
+        stale: Dict[str, List] = {}
+        for video in videos:
+            metadata = None if force else self.cache.get(video.video_id)
+            if metadata:
+                apply_metadata(video, metadata)
+                report.cached += 1
+            elif metadata is not None:
+                report.skipped += 1
+            else:
+                stale.setdefault(video.video_id, []).append(video)
+
+        ids = list(stale)
+        batches = [ids[i:i + self.batch_size] for i in range(0, len(ids), self.batch_size)]
+        if batches:
+            from concurrent.futures import ThreadPoolExecutor, as_completed
+
+            with ThreadPoolExecutor(max_workers=min(self.max_workers, len(batches))) as executor:
+                futures = {executor.submit(self.extractor.extract_batch, batch): batch for batch in batches}
+                for future in as_completed(futures):
+                    try:
+                        extracted = future.result()
+                    except Exception as e:
+                        # バッチ全体の失敗は一時的なエラーとみなし、次回も取得する
+                        print(f"  ✗ metadata batch failed: {str(e)[:100]}")
+                        report.failed += len(futures[future])
+                        continue
+                    for video_id in futures[future]:
+                        metadata = extracted.get(video_id)
+                        if metadata is None:
+                            self.cache.put_failed(video_id)
+                            report.failed += 1
+                            continue
+                        self.cache.put(video_id, metadata)
+                        for video in stale[video_id]:
+                            apply_metadata(video, metadata)
+                        report.refreshed += 1
+
+        self.cache.flush()
+        report.elapsed = time.monotonic() - start
+        return report
+
+    def refresh_top(self, videos: List, top_n: Optional[int], force: bool = False) -> RefreshReport:
+        """
+        上位 top_n 本を選ぶために必要な動画だけを更新する
+
+        一覧の再生回数の上位 candidate_factor × top_n 本と、再生回数のない動画だけを更新し、
+        数千本のチャンネルでも全動画の抽出は行わない。top_n が None なら全動画を更新する。
+        """
+        if top_n is None:
+            return self.refresh(videos, force)
+        return self.refresh(select_candidates(videos, self.candidate_factor * top_n), force)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="動画の再生回数・長さ・投稿日を一括で更新する")
+    parser.add_argument("ids_files", nargs="+", help="動画IDファイル")
+    parser.add_argument("--cache", default="./transcripts/.metadata_cache.json", help="キャッシュのパス")
+    parser.add_argument("--ttl", type=float, default=86400, help="キャッシュの有効期間（秒）")
+    parser.add_argument("--workers", type=int, default=4, help="並列数")
+    parser.add_argument("--batch-size", type=int, default=10, help="1回の抽出にまとめる動画数")
+    parser.add_argument("--dump", action="append", default=[],
+                        help="yt-dlp -j のダンプから読み込む（ネットワークアクセスなし）")
+    parser.add_argument("--force", action="store_true", help="キャッシュを使わずに取得し直す")
+    args = parser.parse_args()
+
+    from youtube_transcript_fetcher import iter_video_id_files
+
+    os.makedirs(os.path.dirname(args.cache) or ".", exist_ok=True)
+    refresher = MetadataRefresher(
+        extractor=DictExtractor.from_dump(args.dump) if args.dump else None,
+        cache=MetadataCache(args.cache, args.ttl),
+        max_workers=args.workers,
+        batch_size=args.batch_size
+    )
+    videos = list(iter_video_id_files(args.ids_files))
+    report = refresher.refresh(videos, force=args.force)
+
+    for video in sorted(videos, key=lambda v: v.view_count, reverse=True):
+        print(f"{video.video_id}\t{video.view_count:>10,}\t{video.duration:>6}s\t{video.upload_date or '-':>8}"
+              f"\t{video.title[:40]}")
+    print(f"\nCached: {report.cached}  Refreshed: {report.refreshed}  Failed: {report.failed}"
+          f"  Skipped: {report.skipped}"
+          f"  ({report.elapsed:.1f}s)")
+
+
+if __name__ == "__main__":
+    main()
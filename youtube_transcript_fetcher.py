@@ -14,22 +14,44 @@ YouTube Transcript Fetcher
     - その場合はプロキシを使用するか、ローカル環境で実行してください
 """
 
+import importlib.util
 import json
 import os
+import queue
+import re
 import time
 import csv
 from datetime import datetime
-from typing import List, Dict, Optional, Tuple
-from dataclasses import dataclass, asdict
+from typing import TYPE_CHECKING, AsyncIterator, Callable, Iterable, Iterator, List, Dict, Optional, Tuple
+from dataclasses import dataclass, asdict, replace
 import subprocess
+import threading
+from contextlib import nullcontext
 
+# ストア・ヘッジ・メモリ上限・シャーディング・複数トラック・メタデータ更新の各モジュールは
+# concurrent.futures / tracemalloc / hashlib / difflib などを読み込むため、その機能を使うときに import する
+if TYPE_CHECKING:
+    from crawl_memory import MemoryProfiler, ResultSpool
+    from hedging import HedgeConfig
+    from transcript_store import TranscriptStore
+    from transcript_tracks import MultiTrackResult, TrackListCache
+    from video_metadata import MetadataRefresher
+
+# 依存ライブラリは読み込みに時間がかかるため、有無だけ確認して初回使用時に import する
 # YouTube Transcript API
-try:
-    from youtube_transcript_api import YouTubeTranscriptApi
-    TRANSCRIPT_API_AVAILABLE = True
-except ImportError:
-    TRANSCRIPT_API_AVAILABLE = False
-    print("Warning: youtube-transcript-api not installed. Run: pip install youtube-transcript-api")
+TRANSCRIPT_API_AVAILABLE = importlib.util.find_spec("youtube_transcript_api") is not None
+TRANSCRIPT_API_WARNING = "Warning: youtube-transcript-api not installed. Run: pip install youtube-transcript-api"
+
+# yt-dlp（ライブラリとして使えない場合はコマンドを実行する）
+YT_DLP_AVAILABLE = importlib.util.find_spec("yt_dlp") is not None
+
+# 一覧取得の通信が応答しなくなった場合に打ち切るまでの秒数（yt_dlpライブラリの socket_timeout）
+# yt-dlpコマンドを実行する場合は全体で LISTING_SUBPROCESS_TIMEOUT 秒まで待つ
+LISTING_SOCKET_TIMEOUT = 30
+LISTING_SUBPROCESS_TIMEOUT = 120
+
+# _iter_fetch_concurrent の投入スレッドの終了を伝える番兵
+_FEED_DONE = object()
 
 
 @dataclass
@@ -41,6 +63,7 @@ class VideoInfo:
     view_count: int = 0
     duration: int = 0
     url: str = ""
+    upload_date: str = ""  # YYYYMMDD（不明な場合は空）
     
     def __post_init__(self):
         if not self.url:
@@ -69,21 +92,93 @@ class TranscriptResult:
 class YouTubeTranscriptFetcher:
     """YouTube動画の文字起こしを取得するクラス"""
     
-    def __init__(self, output_dir: str = "./transcripts", proxy: str = None):
+    def __init__(self, output_dir: str = "./transcripts", proxy: str = None,
+                 listing_backend: str = "auto", memory_budget_mb: float = None,
+                 profiler: "MemoryProfiler" = None, store: "TranscriptStore" = None,
+                 track_cache_ttl: float = 6 * 3600, refresher: "MetadataRefresher" = None,
+                 layout: str = "flat", hedge: "HedgeConfig" = None):
         """
         初期化
         
         Args:
             output_dir: 出力ディレクトリ
             proxy: プロキシURL（例: "http://proxy:8080"）
+            listing_backend: 動画一覧の取得方法
+                "auto"（yt_dlpライブラリがあれば使用）/ "library" / "subprocess"
+            memory_budget_mb: メモリに保持する本文・セグメントの上限（MB、Noneで無制限）。
+                超えた分は output_dir/.spool/ に退避し、results には本文を除いた要約だけを残す
+                （呼び出し側に返した結果は退避の対象にならない）
+            profiler: 処理段階ごとのメモリ使用量を計測する MemoryProfiler
+            store: 取得結果を内容ハッシュ付きで保存する TranscriptStore。
+                内容が前回と同じ動画は個別ファイルを書き換えない
+            track_cache_ttl: 字幕トラック一覧のキャッシュの有効期間（秒）。
+                メタデータは output_dir/.track_cache.json に保存される
+            refresher: 動画一覧の再生回数・長さ・投稿日を更新してから並べ替える MetadataRefresher
+            layout: 個別ファイルの配置
+                "flat"（individual/ に平置き）/ "sharded"（動画IDの先頭2文字のサブディレクトリに置き、
+                individual/manifest.jsonl に記録する）
+            hedge: 文字起こしの取得をヘッジする設定。所要時間が直近の分布のパーセンタイルを超えたら
+                別の接続（HedgeConfig.proxies のプロキシ）で同じリクエストを送り、先に成功した方を使う
         """
+        if listing_backend not in ("auto", "library", "subprocess"):
+            raise ValueError(f"Unknown listing_backend: {listing_backend}")
+        if layout not in ("flat", "sharded"):
+            raise ValueError(f"Unknown layout: {layout}")
+        if listing_backend == "library" and not YT_DLP_AVAILABLE:
+            raise ImportError("yt-dlp is not installed. Run: pip install yt-dlp")
+        
         self.output_dir = output_dir
         self.proxy = proxy
+        self.listing_backend = listing_backend
+        self.refresher = refresher
         self.results: List[TranscriptResult] = []
+        # 取得済み（または既存コーパスから読み込んだ）成功結果の索引
+        self._result_index: Dict[str, TranscriptResult] = {}
+        # スレッドごとに使い回す YoutubeDL インスタンス
+        self._ydl_local = threading.local()
+        self._ydl_instances = []
+        # メモリ上限とディスクへの退避
+        self.memory_budget = memory_budget_mb * 1024 * 1024 if memory_budget_mb else None
+        self.profiler = profiler
+        self.store = store
+        self._spool: Optional["ResultSpool"] = None
+        self._spilled: Dict[str, int] = {}  # 退避した動画ID → 本文の文字数
+        self._retained: List[TranscriptResult] = []
+        self._retained_bytes = 0
+        self._retain_lock = threading.Lock()
+        # 字幕トラック一覧のキャッシュと複数トラックの取得結果（全トラックの本文はメモリに溜めず
+        # output_dir/.spool/ に書き出し、save_all_results で {prefix}_tracks.json にまとめる）
+        self.track_cache_ttl = track_cache_ttl
+        self._track_cache: Optional["TrackListCache"] = None
+        self._track_spool: Optional["ResultSpool"] = None
         
         # 出力ディレクトリを作成
         os.makedirs(output_dir, exist_ok=True)
         os.makedirs(os.path.join(output_dir, "individual"), exist_ok=True)
+        
+        # 個別ファイルの配置（シャーディング時はマニフェストで取得済みの確認とパスの検索を行う）
+        self.layout = layout
+        self.manifest = None
+        if layout == "sharded":
+            from transcript_manifest import TranscriptManifest
+            self.manifest = TranscriptManifest(os.path.join(output_dir, "individual"))
+        self._shards_created = set()
+        
+        # ヘッジリクエスト
+        self.hedger = None
+        if hedge is not None:
+            from hedging import Hedger
+            self.hedger = Hedger(hedge)
+    
+    @property
+    def track_cache(self) -> "TrackListCache":
+        """字幕トラック一覧のキャッシュ（複数トラックの取得を初めて使うときに読み込む）"""
+        if self._track_cache is None:
+            from transcript_tracks import TrackListCache
+            self._track_cache = TrackListCache(
+                self.track_cache_ttl, os.path.join(self.output_dir, ".track_cache.json")
+            )
+        return self._track_cache
     
     def get_channel_videos(self, channel_url: str, max_videos: int = None) -> List[VideoInfo]:
         """
@@ -99,31 +194,16 @@ class YouTubeTranscriptFetcher:
         videos = []
         
         try:
-            # yt-dlpを使用してチャンネルの動画一覧を取得
-            cmd = [
-                "yt-dlp",
-                "--flat-playlist",
-                "-j",
-                f"{channel_url}/videos"
-            ]
-            
-            result = subprocess.run(cmd, capture_output=True, text=True, timeout=120)
+            with self.stage("listing"):
+                videos = list(self.iter_channel_videos(channel_url))
             
-            for line in result.stdout.strip().split('\n'):
-                if not line:
-                    continue
-                try:
-                    data = json.loads(line)
-                    video = VideoInfo(
-                        video_id=data.get('id', ''),
-                        title=data.get('title', ''),
-                        channel_name=data.get('channel', '') or data.get('playlist_uploader', ''),
-                        view_count=data.get('view_count', 0) or 0,
-                        duration=int(data.get('duration', 0) or 0)
-                    )
-                    videos.append(video)
-                except json.JSONDecodeError:
-                    continue
+            # 一覧の再生回数は欠けていたり古かったりするため、設定されていれば更新する
+            # （上位 max_videos 本を選ぶのに必要な候補だけ）
+            if self.refresher is not None:
+                with self.stage("metadata"):
+                    report = self.refresher.refresh_top(videos, max_videos or None)
+                print(f"Metadata: {report.refreshed} refreshed, {report.cached} cached, "
+                      f"{report.failed} failed, {report.skipped} skipped")
             
             # 再生回数でソート（降順）
             videos.sort(key=lambda x: x.view_count, reverse=True)
@@ -139,10 +219,122 @@ class YouTubeTranscriptFetcher:
         
         return videos
     
+    def iter_channel_videos(self, channel_url: str) -> Iterator[VideoInfo]:
+        """チャンネルの動画を一覧の順に1本ずつ返す（ソートしない）"""
+        for data in self.iter_channel_entries(channel_url):
+            yield VideoInfo(
+                video_id=data.get('id', ''),
+                title=data.get('title', '') or '',
+                channel_name=data.get('channel', '') or data.get('playlist_uploader', '') or '',
+                view_count=data.get('view_count', 0) or 0,
+                duration=int(data.get('duration', 0) or 0),
+                upload_date=_entry_upload_date(data)
+            )
+    
+    def iter_channel_entries(self, channel_url: str) -> Iterator[Dict]:
+        """
+        チャンネルの動画エントリ（yt-dlpのflat-playlist形式の辞書）を返す
+        
+        yt_dlpライブラリが使える場合はプロセス内で抽出し、使えない場合は
+        yt-dlpコマンドを実行する。listing_backend="auto" では、ライブラリでの抽出が
+        最初のエントリを返す前に失敗した場合（抽出エラーやバージョンの不整合）もコマンドで取り直す。
+        """
+        if self.listing_backend == "subprocess" or not YT_DLP_AVAILABLE:
+            yield from self._iter_entries_subprocess(channel_url)
+            return
+        
+        yielded = False
+        try:
+            for entry in self._iter_entries_library(channel_url):
+                yielded = True
+                yield entry
+        except Exception as e:
+            # 途中まで返した一覧を取り直すと重複するため、最初のエントリより前の失敗だけを扱う
+            if yielded or self.listing_backend == "library":
+                raise
+            print(f"Warning: yt_dlp listing failed for {channel_url}: {e}; falling back to yt-dlp command")
+            yield from self._iter_entries_subprocess(channel_url)
+    
+    def _get_ydl(self):
+        """このスレッド用の YoutubeDL インスタンスを返す（初回のみ作成）"""
+        ydl = getattr(self._ydl_local, "ydl", None)
+        if ydl is None:
+            options = {
+                "extract_flat": "in_playlist",
+                "skip_download": True,
+                "quiet": True,
+                "no_warnings": True,
+                "socket_timeout": LISTING_SOCKET_TIMEOUT,
+            }
+            if self.proxy:
+                options["proxy"] = self.proxy
+            import yt_dlp
+            ydl = yt_dlp.YoutubeDL(options)
+            self._ydl_local.ydl = ydl
+            self._ydl_instances.append(ydl)
+        return ydl
+    
+    def _iter_entries_library(self, channel_url: str) -> Iterator[Dict]:
+        """yt_dlpライブラリで一覧を抽出する（ページ単位で遅延取得される）"""
+        info = self._get_ydl().extract_info(f"{channel_url}/videos", download=False, process=False)
+        channel = info.get('channel') or info.get('uploader') or ''
+        for entry in info.get('entries') or []:
+            if not entry:
+                continue
+            if channel and not entry.get('channel'):
+                entry['playlist_uploader'] = channel
+            yield entry
+    
+    def _iter_entries_subprocess(self, channel_url: str) -> Iterator[Dict]:
+        """yt-dlpコマンドで一覧を抽出する"""
+        cmd = [
+            "yt-dlp",
+            "--flat-playlist",
+            "-j",
+            f"{channel_url}/videos"
+        ]
+        
+        result = subprocess.run(cmd, capture_output=True, text=True, timeout=LISTING_SUBPROCESS_TIMEOUT)
+        
+        for line in result.stdout.strip().split('\n'):
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                continue
+    
+    def close(self):
+        """保持している YoutubeDL インスタンスを閉じる"""
+        for ydl in self._ydl_instances:
+            close = getattr(ydl, "close", None)
+            if close:
+                close()
+        self._ydl_instances.clear()
+        self._ydl_local = threading.local()
+        for spool in (self._spool, self._track_spool):
+            if spool is not None:
+                spool.close()
+        self._spool = self._track_spool = None
+        if self.store is not None:
+            self.store.flush()
+        if self._track_cache is not None:
+            self._track_cache.flush()
+        if self.manifest is not None:
+            self.manifest.close()
+        if self.hedger is not None:
+            self.hedger.close()
+    
+    def stage(self, name: str):
+        """profiler が設定されていれば name の段階として計測する"""
+        return self.profiler.stage(name) if self.profiler else nullcontext()
+    
     def fetch_transcript(self, video: VideoInfo, languages: List[str] = ['ja']) -> TranscriptResult:
         """
         単一動画の文字起こしを取得
         
+        hedge を設定している場合、遅い取得は別の接続で再送し、先に成功した結果を返す。
+        
         Args:
             video: 動画情報
             languages: 取得する言語のリスト（優先順）
@@ -150,6 +342,23 @@ class YouTubeTranscriptFetcher:
         Returns:
             文字起こし結果
         """
+        if self.hedger is not None:
+            return self.hedger.run(
+                lambda proxy, cancel, hedged: self._fetch_transcript_once(video, languages, proxy, cancel, hedged),
+                accept=lambda result: result.status != "error"
+            )
+        return self._fetch_transcript_once(video, languages)
+    
+    def _fetch_transcript_once(self, video: VideoInfo, languages: List[str], proxy: str = None,
+                               cancel: threading.Event = None, hedged: bool = False) -> TranscriptResult:
+        """
+        fetch_transcript の1回分の試行
+        
+        Args:
+            proxy: 字幕の取得に使うプロキシ（Noneで直接接続）
+            cancel: ヘッジで負けた場合に設定される Event（字幕リストの取得後に確認する）
+            hedged: ヘッジとして送られた試行か（遅い接続を避けるため、キャッシュした字幕リストを使わない）
+        """
         if not TRANSCRIPT_API_AVAILABLE:
             return TranscriptResult(
                 video_id=video.video_id,
@@ -160,39 +369,57 @@ class YouTubeTranscriptFetcher:
             )
         
         try:
-            api = YouTubeTranscriptApi()
-            
-            # 字幕リストを取得
-            transcript_list = api.list(video.video_id)
-            
-            # 指定言語の字幕を探す
-            transcript = None
-            for lang in languages:
-                for t in transcript_list:
-                    if t.language_code == lang:
-                        transcript = api.fetch(t)
-                        break
-                if transcript:
-                    break
-            
-            # 見つからなければ自動生成字幕を取得
-            if transcript is None:
-                try:
-                    generated = transcript_list.find_generated_transcript(languages)
-                    transcript = api.fetch(generated)
-                except:
-                    # 最初の字幕を取得
+            with self.stage("fetch"):
+                from youtube_transcript_api import YouTubeTranscriptApi
+                if proxy:
+                    from youtube_transcript_api.proxies import GenericProxyConfig
+                    api = YouTubeTranscriptApi(proxy_config=GenericProxyConfig(http_url=proxy, https_url=proxy))
+                else:
+                    api = YouTubeTranscriptApi()
+                
+                # 字幕リストを取得（キャッシュがあれば使い回す）
+                if hedged:
+                    transcript_list = api.list(video.video_id)
+                else:
+                    transcript_list = self._list_tracks(api, video.video_id)
+                if cancel is not None and cancel.is_set():
+                    return TranscriptResult(
+                        video_id=video.video_id,
+                        title=video.title,
+                        channel_name=video.channel_name,
+                        status="error",
+                        error_message="Cancelled (hedged request won)"
+                    )
+                
+                # 指定言語の字幕を探す
+                transcript = None
+                for lang in languages:
                     for t in transcript_list:
-                        transcript = api.fetch(t)
+                        if t.language_code == lang:
+                            transcript = api.fetch(t)
+                            break
+                    if transcript:
                         break
+                
+                # 見つからなければ自動生成字幕を取得
+                if transcript is None:
+                    try:
+                        generated = transcript_list.find_generated_transcript(languages)
+                        transcript = api.fetch(generated)
+                    except:
+                        # 最初の字幕を取得
+                        for t in transcript_list:
+                            transcript = api.fetch(t)
+                            break
             
             if transcript:
-                # テキストを結合
-                full_text = " ".join([entry.text for entry in transcript])
-                segments = [
-                    {"text": entry.text, "start": entry.start, "duration": entry.duration}
-                    for entry in transcript
-                ]
+                with self.stage("segments"):
+                    # テキストを結合
+                    full_text = " ".join([entry.text for entry in transcript])
+                    segments = [
+                        {"text": entry.text, "start": entry.start, "duration": entry.duration}
+                        for entry in transcript
+                    ]
                 
                 return TranscriptResult(
                     video_id=video.video_id,
@@ -213,40 +440,231 @@ class YouTubeTranscriptFetcher:
                 
         except Exception as e:
             error_msg = str(e)
-            status = "error"
-            
-            if "disabled" in error_msg.lower():
-                status = "disabled"
-            elif "not found" in error_msg.lower():
-                status = "no_transcript"
             
             return TranscriptResult(
                 video_id=video.video_id,
                 title=video.title,
                 channel_name=video.channel_name,
-                status=status,
+                status=_error_status(error_msg),
                 error_message=error_msg[:500]  # エラーメッセージを短縮
             )
     
+    def _list_tracks(self, api, video_id: str):
+        """字幕トラック一覧を返す（有効期間内に取得済みならキャッシュから）"""
+        listing = self.track_cache.get_listing(video_id)
+        if listing is None:
+            listing = api.list(video_id)
+            self.track_cache.put(video_id, listing)
+        return listing
+    
+    def fetch_tracks(
+        self,
+        video: VideoInfo,
+        languages: List[str] = ['ja'],
+        include_generated: bool = True,
+        max_workers: int = 4
+    ) -> "MultiTrackResult":
+        """
+        指定言語のトラックをすべて取得
+        
+        1回の字幕リスト取得（キャッシュ済みなら0回）から手動字幕・自動生成字幕を選び、
+        トラックごとの取得を並列に行う。
+        
+        Args:
+            video: 動画情報
+            languages: 取得する言語のリスト（優先順）
+            include_generated: 自動生成字幕も取得するか
+            max_workers: トラックを並列に取得するワーカー数
+        
+        Returns:
+            複数トラックの文字起こし結果
+        """
+        from transcript_tracks import MultiTrackResult, TrackTranscript, select_tracks, track_info
+        
+        def make_result(status: str, **kwargs) -> MultiTrackResult:
+            return MultiTrackResult(
+                video_id=video.video_id,
+                title=video.title,
+                channel_name=video.channel_name,
+                status=status,
+                **kwargs
+            )
+        
+        if not TRANSCRIPT_API_AVAILABLE:
+            return make_result("error", error_message="youtube-transcript-api not installed")
+        
+        # 前回の一覧で対象言語のトラックがなかった動画はリクエストしない
+        cached = self.track_cache.lookup(video.video_id)
+        if cached is not None:
+            if cached["status"] != "listed":
+                return make_result(cached["status"], error_message="Transcript unavailable (cached)")
+            if not select_tracks(cached["tracks"], languages, include_generated):
+                return make_result("no_transcript", available=[vars(t) for t in cached["tracks"]],
+                                   error_message="No transcript found (cached)")
+        
+        try:
+            with self.stage("fetch"):
+                from youtube_transcript_api import YouTubeTranscriptApi
+                listing = self._list_tracks(YouTubeTranscriptApi(), video.video_id)
+        except Exception as e:
+            error_msg = str(e)
+            status = _error_status(error_msg)
+            if status != "error":
+                self.track_cache.put_unavailable(video.video_id, status)
+            return make_result(status, error_message=error_msg[:500])
+        
+        available = [vars(track_info(t)) for t in listing]
+        selected = select_tracks(listing, languages, include_generated)
+        if not selected:
+            return make_result("no_transcript", available=available, error_message="No transcript found")
+        
+        def fetch_track(track) -> TrackTranscript:
+            meta = dict(
+                language_code=track.language_code,
+                language=getattr(track, "language", "") or "",
+                is_generated=bool(track.is_generated)
+            )
+            try:
+                with self.stage("fetch"):
+                    fetched = track.fetch()
+                with self.stage("segments"):
+                    segments = [
+                        {"text": entry.text, "start": entry.start, "duration": entry.duration}
+                        for entry in fetched
+                    ]
+                return TrackTranscript(
+                    status="success",
+                    full_text=" ".join(s["text"] for s in segments),
+                    transcript_segments=segments,
+                    **meta
+                )
+            except Exception as e:
+                return TrackTranscript(status="error", error_message=str(e)[:500], **meta)
+        
+        from concurrent.futures import ThreadPoolExecutor
+        
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(selected)))) as executor:
+            tracks = list(executor.map(fetch_track, selected))
+        
+        succeeded = [t for t in tracks if t.status == "success"]
+        return make_result(
+            "success" if succeeded else "error",
+            tracks=tracks,
+            available=available,
+            error_message="" if succeeded else tracks[0].error_message
+        )
+    
+    def fetch_multiple_tracks(
+        self,
+        videos: Iterable[VideoInfo],
+        languages: List[str] = ['ja'],
+        delay: float = 1.0,
+        save_individual: bool = True,
+        include_generated: bool = True,
+        track_workers: int = 4,
+        max_workers: int = 1
+    ) -> List["MultiTrackResult"]:
+        """
+        複数動画の全トラックを取得
+        
+        優先順で最初に取得できたトラックは TranscriptResult として results にも追加するため、
+        save_all_results の出力や差分保存ストアはこれまでどおり使える。
+        全トラックは取得ごとに output_dir/.spool/ に書き出され（メモリには溜めない）、
+        save_all_results で {prefix}_tracks.json に保存される。
+        
+        Args:
+            videos: 動画情報のリスト（イテレータも可）
+            languages: 取得する言語のリスト（優先順）
+            delay: リクエスト間の遅延（秒）。並列時はワーカーごとの遅延
+            save_individual: 優先トラックを個別ファイルに保存するか
+            include_generated: 自動生成字幕も取得するか
+            track_workers: 1動画のトラックを並列に取得するワーカー数
+            max_workers: 並列に取得する動画数（1で逐次実行）
+        
+        Returns:
+            複数トラックの文字起こし結果のリスト（完了順）
+        """
+        results = []
+        total = len(videos) if hasattr(videos, '__len__') else "?"
+        fetch = lambda video, languages: self.fetch_tracks(video, languages, include_generated, track_workers)
+        
+        for i, multi in enumerate(
+            self._iter_fetch_concurrent(videos, languages, delay, max_workers, fetch=fetch), 1
+        ):
+            results.append(multi)
+            self._record_tracks(multi)
+            
+            primary = multi.primary(languages)
+            if primary is not None:
+                result = TranscriptResult(
+                    video_id=multi.video_id,
+                    title=multi.title,
+                    channel_name=multi.channel_name,
+                    status="success",
+                    full_text=primary.full_text,
+                    transcript_segments=primary.transcript_segments,
+                    fetched_at=multi.fetched_at
+                )
+                keys = ", ".join(t.key for t in multi.tracks if t.status == "success")
+                print(f"  [{i}/{total}] ✓ {multi.video_id} ({keys})")
+            else:
+                result = TranscriptResult(
+                    video_id=multi.video_id,
+                    title=multi.title,
+                    channel_name=multi.channel_name,
+                    status=multi.status,
+                    error_message=multi.error_message,
+                    fetched_at=multi.fetched_at
+                )
+                print(f"  [{i}/{total}] ✗ {multi.video_id} {multi.status}: {multi.error_message[:100]}")
+            self.record_result(result, save_individual)
+        
+        return results
+    
+    def _record_tracks(self, multi: "MultiTrackResult"):
+        """全トラックの結果をディスクに書き出す（{prefix}_tracks.json の元になる）"""
+        with self._retain_lock:
+            if self._track_spool is None:
+                from crawl_memory import ResultSpool
+
+                self._track_spool = ResultSpool(os.path.join(self.output_dir, ".spool"), prefix="tracks-")
+        self._track_spool.write(multi)
+    
     def fetch_multiple_videos(
         self,
-        videos: List[VideoInfo],
+        videos: Iterable[VideoInfo],
         languages: List[str] = ['ja'],
         delay: float = 1.0,
-        save_individual: bool = True
+        save_individual: bool = True,
+        max_workers: int = 1,
+        skip_cached: bool = False,
+        skip_saved: bool = False
     ) -> List[TranscriptResult]:
         """
         複数動画の文字起こしを取得
         
         Args:
-            videos: 動画情報のリスト
+            videos: 動画情報のリスト（イテレータも可）
             languages: 取得する言語のリスト
-            delay: リクエスト間の遅延（秒）
+            delay: リクエスト間の遅延（秒）。並列時はワーカーごとの遅延
             save_individual: 個別ファイルに保存するか
+            max_workers: 並列に取得するワーカー数（1で逐次実行）
+            skip_cached: 取得済み（このプロセスで取得・取り込みした）動画を読み飛ばすか
+            skip_saved: 以前の実行で個別ファイルを保存済み（layout="sharded" のマニフェストに記録済み）の
+                動画も読み飛ばすか。読み飛ばした動画は results と出力ファイルに含まれず、
+                store を使った内容の変化の検出も行われない
         
         Returns:
-            文字起こし結果のリスト
+            新たに取得した文字起こし結果のリスト（並列時は完了順）
         """
+        videos = self._skip_fetched(videos, skip_cached, skip_saved)
+        
+        if max_workers > 1:
+            return self._fetch_multiple_concurrent(
+                videos, languages, delay, save_individual, max_workers
+            )
+        
+        videos = list(videos)
         results = []
         total = len(videos)
         
@@ -258,19 +676,305 @@ class YouTubeTranscriptFetcher:
             
             if result.status == "success":
                 print(f"    ✓ Success ({len(result.full_text)} chars)")
-                
-                if save_individual:
-                    self._save_individual_transcript(result)
             else:
                 print(f"    ✗ {result.status}: {result.error_message[:100]}")
+            self.record_result(result, save_individual)
             
             # レート制限対策
             if i < total:
                 time.sleep(delay)
         
-        self.results.extend(results)
         return results
     
+    def _skip_fetched(self, videos: Iterable[VideoInfo], skip_cached: bool, skip_saved: bool) -> Iterable[VideoInfo]:
+        """skip_cached / skip_saved の対象を除いた動画を返す"""
+        if skip_saved and self.manifest is not None:
+            return (v for v in videos if not self.is_saved(v.video_id))
+        if (skip_cached or skip_saved) and self._result_index:
+            return (v for v in videos if v.video_id not in self._result_index)
+        return videos
+    
+    def _fetch_multiple_concurrent(
+        self,
+        videos: Iterable[VideoInfo],
+        languages: List[str],
+        delay: float,
+        save_individual: bool,
+        max_workers: int
+    ) -> List[TranscriptResult]:
+        """fetch_multiple_videos の並列版（完了順に結果を処理する）"""
+        results = []
+        total = len(videos) if hasattr(videos, '__len__') else "?"
+        
+        for i, result in enumerate(self._iter_fetch_concurrent(videos, languages, delay, max_workers), 1):
+            results.append(result)
+            
+            if result.status == "success":
+                print(f"  [{i}/{total}] ✓ {result.video_id} ({len(result.full_text)} chars)")
+            else:
+                print(f"  [{i}/{total}] ✗ {result.video_id} {result.status}: {result.error_message[:100]}")
+            self.record_result(result, save_individual)
+        
+        return results
+    
+    def record_result(self, result: TranscriptResult, save_individual: bool = True, keep: bool = True):
+        """
+        取得した結果を results に追加し、成功結果は索引・ストア・個別ファイルに記録する
+        
+        メモリ上限を設定している場合、results には別のオブジェクトを保持して退避の対象にするため、
+        渡した result の本文は退避されても消えない。
+        
+        Args:
+            keep: False の場合は results・索引に保持せず、ストアと個別ファイルにだけ記録する
+                （結果を自分で書き出す常駐プロセス向け。メモリが増え続けない）
+        """
+        if not keep:
+            if result.status == "success":
+                self._persist_success(result, save_individual)
+            return
+        kept = self._keep(result)
+        self.results.append(kept)
+        if kept.status == "success":
+            self._record_success(kept, save_individual)
+    
+    def _keep(self, result: TranscriptResult) -> TranscriptResult:
+        """results に保持するオブジェクト（メモリ上限があれば退避しても呼び出し側に影響しない複製）"""
+        return replace(result) if self.memory_budget is not None else result
+    
+    def _record_success(self, result: TranscriptResult, save_individual: bool = True):
+        """成功結果を索引に登録し、必要なら個別ファイルに保存する"""
+        self._result_index[result.video_id] = result
+        self._persist_success(result, save_individual)
+        self._retain(result)
+    
+    def _persist_success(self, result: TranscriptResult, save_individual: bool):
+        """成功結果をストアと個別ファイルに保存する（内容が前回と同じなら個別ファイルは書き換えない）"""
+        change = self.store.put(result) if self.store is not None else None
+        if save_individual and change != "unchanged":
+            self._save_individual_transcript(result)
+    
+    def _retain(self, result: TranscriptResult):
+        """メモリ上限を設定している場合、保持量を数えて超えたら退避する"""
+        if self.memory_budget is None:
+            return
+        from crawl_memory import estimate_result_size
+        
+        with self._retain_lock:
+            self._retained.append(result)
+            self._retained_bytes += estimate_result_size(result)
+            if self._retained_bytes > self.memory_budget:
+                self._spill()
+    
+    def _spill(self):
+        """保持中の結果をディスクに書き出し、本文とセグメントをメモリから外す"""
+        with self.stage("spill"):
+            if self._spool is None:
+                from crawl_memory import ResultSpool
+                self._spool = ResultSpool(os.path.join(self.output_dir, ".spool"))
+            for result in self._retained:
+                self._spool.write(result)
+                self._spilled[result.video_id] = len(result.full_text)
+                # results と索引が参照する保持用のオブジェクトだけから本文を外す
+                result.full_text = ""
+                result.transcript_segments = []
+            print(f"  ↓ Spilled {len(self._retained)} results to disk "
+                  f"({self._retained_bytes / 1024 / 1024:.1f} MB, total {len(self._spool)})")
+            self._retained = []
+            self._retained_bytes = 0
+    
+    def load_result(self, result: TranscriptResult) -> TranscriptResult:
+        """
+        本文付きの結果を返す（退避した結果はディスクから読み戻す）
+        
+        メモリ上限を設定している場合は、後で退避されても本文が消えない複製を返す。
+        """
+        if self._spool is not None and result.video_id in self._spool and not result.full_text:
+            return TranscriptResult(**self._spool.read(result.video_id))
+        return self._keep(result)
+    
+    def iter_results(self) -> Iterator[TranscriptResult]:
+        """全結果を本文付きで1件ずつ返す（退避した結果はディスクから読み戻す）"""
+        for result in self.results:
+            yield self.load_result(result)
+    
+    def _text_length(self, result: TranscriptResult) -> int:
+        return len(result.full_text) or self._spilled.get(result.video_id, 0)
+    
+    def iter_transcripts(
+        self,
+        videos: Iterable[VideoInfo],
+        languages: List[str] = ['ja'],
+        delay: float = 1.0,
+        max_workers: int = 4,
+        buffer_size: int = None,
+        save_individual: bool = True,
+        skip_cached: bool = False,
+        skip_saved: bool = False
+    ) -> Iterator[TranscriptResult]:
+        """
+        文字起こしを取得し、完了したものから1件ずつ返す
+        
+        fetch_multiple_videos と違い全件の完了を待たないため、最初の結果をすぐに索引付け・採点・
+        アップロードなどの後段に渡せる。途中で反復をやめた場合も、その時点で実行中・完了済みだった
+        取得の結果は受け取らなかった分も含めて results・個別ファイル・ストアに記録される。
+        
+        Args:
+            videos: 動画情報のリスト（イテレータも可。別スレッドで少しずつ読まれる）
+            languages: 取得する言語のリスト
+            delay: ワーカーごとのリクエスト間の遅延（秒）
+            max_workers: 並列に取得するワーカー数
+            buffer_size: 消費されずに溜めておく結果の上限（Noneで max_workers）。
+                溜まると新しい取得を始めないため、消費側が遅ければ取得も遅くなる
+            save_individual: 個別ファイルに保存するか
+            skip_cached: 取得済み（このプロセスで取得・取り込みした）動画を読み飛ばすか
+            skip_saved: 以前の実行で個別ファイルを保存済み（layout="sharded" のマニフェストに記録済み）の
+                動画も読み飛ばすか。読み飛ばした動画は results と出力ファイルに含まれず、
+                store を使った内容の変化の検出も行われない
+        """
+        videos = self._skip_fetched(videos, skip_cached, skip_saved)
+        
+        record = lambda result: self.record_result(result, save_individual)
+        for result in self._iter_fetch_concurrent(videos, languages, delay, max_workers, buffer_size,
+                                                  abandoned=record):
+            # results には別のオブジェクトを保持するため、渡した結果は後の退避で本文が消えない
+            record(result)
+            yield result
+    
+    async def aiter_transcripts(self, videos: Iterable[VideoInfo], **kwargs) -> AsyncIterator[TranscriptResult]:
+        """
+        iter_transcripts の非同期版（引数は同じ）
+        
+        取得はスレッドプールで行い、次の結果を待つ間もイベントループをブロックしない。
+        async for を抜けると未開始の取得を取り消す。
+        """
+        # asyncio は読み込みに時間がかかるため、使うときに import する
+        import asyncio
+        from concurrent.futures import ThreadPoolExecutor
+        
+        iterator = self.iter_transcripts(videos, **kwargs)
+        # next() と close() を同じ1スレッドで順に実行する（取り消された場合も、
+        # 実行中の next() が終わってから閉じられる）
+        stepper = ThreadPoolExecutor(max_workers=1)
+        try:
+            while True:
+                result = await asyncio.wrap_future(stepper.submit(next, iterator, _FEED_DONE))
+                if result is _FEED_DONE:
+                    return
+                yield result
+        finally:
+            closing = stepper.submit(iterator.close)
+            stepper.shutdown(wait=False)
+            await asyncio.wrap_future(closing)
+    
+    def _iter_fetch_concurrent(
+        self,
+        videos: Iterable[VideoInfo],
+        languages: List[str],
+        delay: float,
+        max_workers: int,
+        buffer_size: int = None,
+        abandoned: Callable[[TranscriptResult], None] = None,
+        fetch: Callable = None
+    ) -> Iterator[TranscriptResult]:
+        """
+        スレッドプールで文字起こしを取得し、完了したものから返す
+        
+        動画の投入は別スレッドで行い、「実行中 + 未消費の結果」を max_workers + buffer_size 件までに抑える。
+        消費側が遅いと空きがなくなり新しい取得が始まらない（バックプレッシャー）ため、
+        巨大なイテレータを渡しても全件がキューに積まれることはない。
+        途中で反復をやめた場合は未開始の取得を取り消し、実行中の取得が終わるのを待ってから、
+        返さなかった結果（完了済み・実行中だった分）を abandoned に渡して戻る。
+        
+        fetch(video, languages) を渡すと fetch_transcript の代わりに使う（fetch_tracks など）。
+        """
+        fetch = fetch or self.fetch_transcript
+        buffer_size = max_workers if buffer_size is None else buffer_size
+        slots = threading.Semaphore(max_workers + buffer_size)
+        completed = queue.Queue()
+        stop = threading.Event()
+        
+        def task(video: VideoInfo):
+            try:
+                completed.put(fetch(video, languages))
+            except BaseException as e:
+                completed.put(e)
+            # レート制限対策（ワーカーごと。結果は先に渡す）
+            if delay:
+                time.sleep(delay)
+        
+        def feed():
+            from concurrent.futures import ThreadPoolExecutor
+            
+            executor = ThreadPoolExecutor(max_workers=max_workers)
+            try:
+                for video in videos:
+                    while not slots.acquire(timeout=0.1):
+                        if stop.is_set():
+                            return
+                    if stop.is_set():
+                        return
+                    executor.submit(task, video)
+            except BaseException as e:
+                completed.put(e)
+            finally:
+                executor.shutdown(wait=True, cancel_futures=stop.is_set())
+                completed.put(_FEED_DONE)
+        
+        feeder = threading.Thread(target=feed, daemon=True)
+        feeder.start()
+        try:
+            while True:
+                item = completed.get()
+                if item is _FEED_DONE:
+                    break
+                if isinstance(item, BaseException):
+                    raise item
+                slots.release()
+                yield item
+        finally:
+            stop.set()
+            feeder.join()
+            # 受け取られなかった結果も、リクエストは済んでいるので捨てずに記録する
+            while abandoned is not None:
+                try:
+                    item = completed.get_nowait()
+                except queue.Empty:
+                    break
+                if item is not _FEED_DONE and not isinstance(item, BaseException):
+                    abandoned(item)
+    
+    def fetch_from_id_files(
+        self,
+        paths: List[str],
+        languages: List[str] = ['ja'],
+        delay: float = 1.0,
+        max_workers: int = 4,
+        save_individual: bool = True,
+        skip_saved: bool = False
+    ) -> List[TranscriptResult]:
+        """
+        動画IDファイルから文字起こしを取得
+        
+        Args:
+            paths: target_video_ids.txt / target_videos_for_gladia.txt 形式のファイル
+            languages: 取得する言語のリスト
+            delay: ワーカーごとのリクエスト間の遅延（秒）
+            max_workers: 並列に取得するワーカー数
+            save_individual: 個別ファイルに保存するか
+            skip_saved: マニフェストに記録済みの動画を読み飛ばすか（fetch_multiple_videos を参照）
+        
+        Returns:
+            文字起こし結果のリスト
+        """
+        return self.fetch_multiple_videos(
+            iter_video_id_files(paths),
+            languages=languages,
+            delay=delay,
+            save_individual=save_individual,
+            max_workers=max_workers,
+            skip_saved=skip_saved
+        )
+    
     def fetch_from_channels(
         self,
         channels: List[Tuple[str, str]],
@@ -319,64 +1023,117 @@ class YouTubeTranscriptFetcher:
         
         return all_results
     
+    def seed_results(self, results: Iterable[TranscriptResult]) -> int:
+        """
+        既存の文字起こし結果を取り込む（ネットワークアクセスなし）
+        
+        取り込んだ成功結果は索引に登録され、以降の fetch_multiple_videos(skip_cached=True) で
+        読み飛ばされる。
+        
+        Returns:
+            取り込んだ件数
+        """
+        count = 0
+        for result in results:
+            kept = self._keep(result)
+            self.results.append(kept)
+            if kept.status == "success":
+                self._result_index[kept.video_id] = kept
+                self._retain(kept)
+            count += 1
+        return count
+    
+    def get_cached_result(self, video_id: str) -> Optional[TranscriptResult]:
+        """取得済みの成功結果を返す（なければNone）"""
+        result = self._result_index.get(video_id)
+        return self.load_result(result) if result is not None else None
+    
+    def is_saved(self, video_id: str) -> bool:
+        """取得済みか（このプロセスで取得・取り込みした結果、またはマニフェストに記録された個別ファイル）"""
+        if video_id in self._result_index:
+            return True
+        return self.manifest is not None and video_id in self.manifest
+    
+    def individual_path(self, result: TranscriptResult) -> str:
+        """個別の文字起こしファイルのパス"""
+        from transcript_manifest import individual_filename, shard_dir
+        
+        # ファイル名に使えない文字を置換
+        filename = individual_filename(result.channel_name, result.video_id)
+        if self.layout == "flat":
+            return os.path.join(self.output_dir, "individual", filename)
+        directory = os.path.join(self.output_dir, "individual", shard_dir(result.video_id))
+        if directory not in self._shards_created:
+            os.makedirs(directory, exist_ok=True)
+            self._shards_created.add(directory)
+        return os.path.join(directory, filename)
+    
     def _save_individual_transcript(self, result: TranscriptResult):
         """個別の文字起こしファイルを保存"""
-        filename = f"{result.channel_name}_{result.video_id}.txt"
-        # ファイル名に使えない文字を置換
-        filename = "".join(c if c.isalnum() or c in "._-" else "_" for c in filename)
-        filepath = os.path.join(self.output_dir, "individual", filename)
-        
-        with open(filepath, 'w', encoding='utf-8') as f:
-            f.write(f"タイトル: {result.title}\n")
-            f.write(f"動画ID: {result.video_id}\n")
-            f.write(f"チャンネル: {result.channel_name}\n")
-            f.write(f"URL: https://www.youtube.com/watch?v={result.video_id}\n")
-            f.write(f"取得日時: {result.fetched_at}\n")
-            f.write("=" * 60 + "\n\n")
-            f.write(result.full_text)
+        filepath = self.individual_path(result)
+        content = (
+            f"タイトル: {result.title}\n"
+            f"動画ID: {result.video_id}\n"
+            f"チャンネル: {result.channel_name}\n"
+            f"URL: https://www.youtube.com/watch?v={result.video_id}\n"
+            f"取得日時: {result.fetched_at}\n"
+            + "=" * 60 + "\n\n"
+            + result.full_text
+        ).encode('utf-8')
+        
+        with open(filepath, 'wb') as f:
+            f.write(content)
+        if self.manifest is not None:
+            self.manifest.record(result.video_id, filepath, content)
     
     def save_all_results(self, filename_prefix: str = "transcripts"):
         """全結果を保存"""
-        # JSON形式で保存
+        with self.stage("export"):
+            self._save_all_results(filename_prefix)
+    
+    def _save_all_results(self, filename_prefix: str):
+        # JSON形式で保存（退避した結果も含めて1件ずつ書き出す。json.dump(..., indent=2) と同じ形式）
         json_path = os.path.join(self.output_dir, f"{filename_prefix}.json")
-        with open(json_path, 'w', encoding='utf-8') as f:
-            json.dump(
-                [asdict(r) for r in self.results],
-                f,
-                ensure_ascii=False,
-                indent=2
-            )
+        _write_json_array((asdict(r) for r in self.iter_results()), json_path)
         print(f"Saved JSON: {json_path}")
         
         # CSV形式で保存（サマリー）
         csv_path = os.path.join(self.output_dir, f"{filename_prefix}_summary.csv")
         with open(csv_path, 'w', encoding='utf-8', newline='') as f:
             writer = csv.writer(f)
-            writer.writerow([
-                'video_id', 'title', 'channel_name', 'status',
-                'text_length', 'error_message', 'fetched_at'
-            ])
+            writer.writerow(SUMMARY_HEADER)
             for r in self.results:
-                writer.writerow([
-                    r.video_id, r.title, r.channel_name, r.status,
-                    len(r.full_text), r.error_message[:100], r.fetched_at
-                ])
+                writer.writerow(summary_row(r, self._text_length(r)))
         print(f"Saved CSV: {csv_path}")
         
         # 成功した文字起こしを1つのファイルにまとめる
         combined_path = os.path.join(self.output_dir, f"{filename_prefix}_combined.txt")
         with open(combined_path, 'w', encoding='utf-8') as f:
-            for r in self.results:
+            for r in self.iter_results():
                 if r.status == "success":
-                    f.write(f"\n{'#'*60}\n")
-                    f.write(f"# タイトル: {r.title}\n")
-                    f.write(f"# 動画ID: {r.video_id}\n")
-                    f.write(f"# チャンネル: {r.channel_name}\n")
-                    f.write(f"# URL: https://www.youtube.com/watch?v={r.video_id}\n")
-                    f.write(f"{'#'*60}\n\n")
-                    f.write(r.full_text)
-                    f.write("\n\n")
+                    f.write(combined_entry(r))
         print(f"Saved Combined: {combined_path}")
+        
+        # セグメントの時刻インデックス（transcript_index.TimeIndex.load で読み込む）
+        from transcript_index import write_index
+        
+        index_path = os.path.join(self.output_dir, f"{filename_prefix}_index.json")
+        write_index(self.iter_results(), index_path)
+        print(f"Saved Index: {index_path}")
+        
+        # 全トラックの文字起こし（fetch_multiple_tracks を使った場合のみ。退避先から1件ずつ書き出す）
+        if self._track_spool is not None:
+            tracks_path = os.path.join(self.output_dir, f"{filename_prefix}_tracks.json")
+            _write_json_array(self._track_spool, tracks_path)
+            print(f"Saved Tracks: {tracks_path}")
+        if self._track_cache is not None:
+            self._track_cache.flush()
+        
+        if self.store is not None:
+            self.store.flush()
+            counts = self.store.counts
+            print(f"Store: {counts['new']} new, {counts['changed']} changed, "
+                  f"{counts['unchanged']} unchanged ({self.store.root})")
     
     def print_summary(self):
         """結果のサマリーを表示"""
@@ -395,41 +1152,242 @@ class YouTubeTranscriptFetcher:
         print(f"  - No transcript: {no_transcript}")
         print(f"  - Disabled: {disabled}")
         print(f"Success rate: {success/total*100:.1f}%" if total > 0 else "N/A")
+        if self.hedger is not None:
+            self.hedger.print_stats()
+
+
+def _write_json_array(items: Iterable[Dict], path: str):
+    """辞書を1件ずつJSON配列として書き出す（json.dump(..., indent=2) と同じ形式）"""
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write("[")
+        count = 0
+        for item in items:
+            f.write(",\n  " if count else "\n  ")
+            f.write(json.dumps(item, ensure_ascii=False, indent=2).replace("\n", "\n  "))
+            count += 1
+        f.write("\n]" if count else "]")
+
+
+# {prefix}_summary.csv の列
+SUMMARY_HEADER = ['video_id', 'title', 'channel_name', 'status', 'text_length', 'error_message', 'fetched_at']
+
+
+def summary_row(r: TranscriptResult, text_length: int = None) -> List:
+    """{prefix}_summary.csv の1行"""
+    return [
+        r.video_id, r.title, r.channel_name, r.status,
+        len(r.full_text) if text_length is None else text_length, r.error_message[:100], r.fetched_at
+    ]
+
+
+def combined_entry(r: TranscriptResult) -> str:
+    """{prefix}_combined.txt の1動画分（transcript_corpus.py で読み戻せる形式）"""
+    return (
+        f"\n{'#'*60}\n"
+        f"# タイトル: {r.title}\n"
+        f"# 動画ID: {r.video_id}\n"
+        f"# チャンネル: {r.channel_name}\n"
+        f"# URL: https://www.youtube.com/watch?v={r.video_id}\n"
+        f"{'#'*60}\n\n"
+        + r.full_text
+        + "\n\n"
+    )
+
+
+def _error_status(error_msg: str) -> str:
+    """youtube-transcript-api の例外メッセージを結果のステータスに変換する"""
+    if "disabled" in error_msg.lower():
+        return "disabled"
+    if "not found" in error_msg.lower():
+        return "no_transcript"
+    return "error"
+
+
+def _entry_upload_date(data: Dict) -> str:
+    """yt-dlpのエントリから投稿日（YYYYMMDD）を取り出す（flat-playlistでは timestamp のみの場合がある）"""
+    if data.get('upload_date'):
+        return str(data['upload_date'])
+    timestamp = data.get('timestamp') or data.get('release_timestamp')
+    if timestamp:
+        return datetime.fromtimestamp(timestamp).strftime("%Y%m%d")
+    return ""
+
+
+# 動画IDファイルの書式
+_VIDEO_ID_RE = re.compile(r'^[A-Za-z0-9_-]{11}$')
+_CHANNEL_HEADER_RE = re.compile(r'^#\s*チャンネル\d*\s*[:：]\s*(.+?)(?:\s+-\s+上位\d+本)?\s*$')
+_NUMBERED_LINE_RE = re.compile(
+    r'^\d+\.\s+([A-Za-z0-9_-]{11})(?:\s+-\s+(.*?))?(?:\s*\(([\d,]+)回\))?\s*$'
+)
+
+
+def iter_video_id_file(path: str, channel_name: str = "") -> Iterator[VideoInfo]:
+    """
+    動画IDファイルを1行ずつ読み込み、VideoInfoを返す
+    
+    次の2つの書式に対応する:
+        - target_video_ids.txt: 1行1ID、「# チャンネル1: 名前」でチャンネルを切り替え
+        - target_videos_for_gladia.txt: 「1. ID - タイトル (81,679回)」形式の番号付きリスト
+    
+    Args:
+        path: 動画IDファイルのパス
+        channel_name: チャンネル見出しがない場合のチャンネル名
+    """
+    current_channel = channel_name
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            
+            if line.startswith('#'):
+                header = _CHANNEL_HEADER_RE.match(line)
+                if header:
+                    current_channel = header.group(1)
+                continue
+            
+            if _VIDEO_ID_RE.match(line):
+                yield VideoInfo(video_id=line, title="", channel_name=current_channel)
+                continue
+            
+            numbered = _NUMBERED_LINE_RE.match(line)
+            if numbered:
+                video_id, title, views = numbered.groups()
+                yield VideoInfo(
+                    video_id=video_id,
+                    title=title or "",
+                    channel_name=current_channel,
+                    view_count=int(views.replace(',', '')) if views else 0
+                )
+
+
+def iter_video_id_files(paths: Iterable[str]) -> Iterator[VideoInfo]:
+    """複数の動画IDファイルを順に読み込み、重複する動画IDを除いて返す"""
+    seen = set()
+    for path in paths:
+        for video in iter_video_id_file(path):
+            if video.video_id in seen:
+                continue
+            seen.add(video.video_id)
+            yield video
 
 
 def main():
     """メイン関数 - 使用例"""
+    # 他のスクリプトから import したときに読み込まないよう、CLIでだけ使う
+    import argparse
     
-    # 対象チャンネルの設定
-    channels = [
-        (
-            "https://www.youtube.com/@プレアデスの光アセンションガイド",
-            "プレアデスの光〜アセンション・ガイド〜"
-        ),
-        (
-            "https://www.youtube.com/@プレアデスの真理アセンションゲート",
-            "プレアデスの真理~アセンションゲート~"
-        )
-    ]
+    parser = argparse.ArgumentParser(description="YouTube動画の文字起こしを取得する")
+    parser.add_argument("--ids-file", action="append", default=[],
+                        help="動画IDファイル（複数指定可）。省略時は既定のチャンネルから取得")
+    parser.add_argument("--output-dir", default="/home/ubuntu/youtube_analysis/transcripts",
+                        help="出力ディレクトリ")
+    parser.add_argument("--languages", default="ja", help="取得する言語（カンマ区切り、優先順）")
+    parser.add_argument("--delay", type=float, default=1.5, help="リクエスト間の遅延（秒）")
+    parser.add_argument("--workers", type=int, default=4, help="IDファイル取得時の並列数")
+    parser.add_argument("--prefix", default="pleiades_transcripts", help="出力ファイル名の接頭辞")
+    parser.add_argument("--memory-budget-mb", type=float, default=None,
+                        help="メモリに保持する本文の上限（MB）。超えた分はディスクに退避する")
+    parser.add_argument("--store", default=None,
+                        help="内容ハッシュ付きで保存するストアのディレクトリ（再取得時は変化した動画だけ差分を保存）")
+    parser.add_argument("--refresh-metadata", action="store_true",
+                        help="チャンネル一覧の再生回数・長さ・投稿日を取得し直してから上位を選ぶ（キャッシュ付き）")
+    parser.add_argument("--metadata-ttl", type=float, default=86400,
+                        help="メタデータのキャッシュの有効期間（秒）")
+    parser.add_argument("--layout", choices=["flat", "sharded"], default="flat",
+                        help="個別ファイルの配置（sharded: 動画IDの先頭2文字で分け、manifest.jsonl に記録する）")
+    parser.add_argument("--skip-saved", action="store_true",
+                        help="マニフェストに記録済みの動画を取得しない（--layout sharded。今回の出力ファイルにも含まれない）")
+    parser.add_argument("--hedge", action="store_true",
+                        help="直近の所要時間のパーセンタイルを超えた取得を別の接続で再送する（ヘッジリクエスト）")
+    parser.add_argument("--hedge-percentile", type=float, default=95.0, help="ヘッジを送る所要時間のパーセンタイル")
+    parser.add_argument("--hedge-max-ratio", type=float, default=0.1, help="ヘッジ数の上限（全リクエストに対する割合）")
+    parser.add_argument("--hedge-proxy", action="append", default=[],
+                        help="ヘッジに使うプロキシ（複数指定可、順に使う）")
+    parser.add_argument("--all-tracks", action="store_true",
+                        help="指定言語の手動字幕・自動生成字幕をすべて取得する（--ids-file が必要）")
+    parser.add_argument("--profile-memory", action="store_true",
+                        help="処理段階ごとのピークメモリを計測する（tracemalloc を使用）")
+    args = parser.parse_args()
+    languages = args.languages.split(",")
+    if args.all_tracks and not args.ids_file:
+        parser.error("--all-tracks requires --ids-file")
+    
+    if not TRANSCRIPT_API_AVAILABLE:
+        print(TRANSCRIPT_API_WARNING)
+    
+    from crawl_memory import MemoryProfiler
+    from hedging import HedgeConfig
+    from transcript_store import TranscriptStore
+    from video_metadata import MetadataCache, MetadataRefresher
     
     # フェッチャーを初期化
+    profiler = MemoryProfiler(trace=True).start() if args.profile_memory else None
     fetcher = YouTubeTranscriptFetcher(
-        output_dir="/home/ubuntu/youtube_analysis/transcripts"
+        output_dir=args.output_dir,
+        memory_budget_mb=args.memory_budget_mb,
+        profiler=profiler,
+        store=TranscriptStore(args.store) if args.store else None,
+        refresher=MetadataRefresher(
+            cache=MetadataCache(os.path.join(args.output_dir, ".metadata_cache.json"), args.metadata_ttl),
+            max_workers=args.workers
+        ) if args.refresh_metadata else None,
+        layout=args.layout,
+        hedge=HedgeConfig(
+            percentile=args.hedge_percentile,
+            max_ratio=args.hedge_max_ratio,
+            proxies=args.hedge_proxy
+        ) if args.hedge or args.hedge_proxy else None
     )
     
-    # 各チャンネルから上位10本の動画の文字起こしを取得
-    results = fetcher.fetch_from_channels(
-        channels=channels,
-        videos_per_channel=10,
-        languages=['ja'],
-        delay=1.5  # レート制限対策
-    )
+    if args.all_tracks:
+        # 動画を並列に取得し、各動画の指定言語のトラックも並列に取得
+        fetcher.fetch_multiple_tracks(
+            iter_video_id_files(args.ids_file),
+            languages=languages,
+            delay=args.delay,
+            max_workers=args.workers
+        )
+    elif args.ids_file:
+        # IDファイルに列挙された動画の文字起こしを並列に取得
+        fetcher.fetch_from_id_files(
+            args.ids_file,
+            languages=languages,
+            delay=args.delay,
+            max_workers=args.workers,
+            skip_saved=args.skip_saved
+        )
+    else:
+        # 対象チャンネルの設定
+        channels = [
+            (
+                "https://www.youtube.com/@プレアデスの光アセンションガイド",
+                "プレアデスの光〜アセンション・ガイド〜"
+            ),
+            (
+                "https://www.youtube.com/@プレアデスの真理アセンションゲート",
+                "プレアデスの真理~アセンションゲート~"
+            )
+        ]
+        
+        # 各チャンネルから上位10本の動画の文字起こしを取得
+        fetcher.fetch_from_channels(
+            channels=channels,
+            videos_per_channel=10,
+            languages=languages,
+            delay=args.delay  # レート制限対策
+        )
     
     # 結果を保存
-    fetcher.save_all_results("pleiades_transcripts")
+    fetcher.save_all_results(args.prefix)
     
     # サマリーを表示
     fetcher.print_summary()
+    fetcher.close()
+    
+    if profiler:
+        profiler.stop()
+        profiler.print_report()
 
 
 if __name__ == "__main__":